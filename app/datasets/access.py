@@ -0,0 +1,144 @@
+"""
+Access of a user to a dataset.
+
+DatasetAccess answers whether a user can open a dataset, which mapping
+areas restrict them and whether they may see a given geometry. Sharing
+and mapping area limits are read with a single query using EXISTS and
+array subqueries, so the cost does not depend on how many users or groups
+a dataset is shared with.
+
+Views use get_dataset_access(), which memoizes one DatasetAccess per
+request and dataset, so repeated checks within a request are free.
+"""
+
+from functools import cached_property
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import (
+    DataSet,
+    DatasetGroupMappingArea,
+    DatasetUserMappingArea,
+    MappingArea,
+    MappingAreaMembership,
+)
+
+
+class DatasetAccess:
+    """Access rights of one user to one dataset"""
+
+    def __init__(self, dataset, user):
+        self.dataset = dataset
+        self.user = user
+        self._geometry_access = {}
+
+    @cached_property
+    def _rights(self):
+        user = self.user
+        # Superusers and owners have full access (no restrictions)
+        if user.is_superuser or (user.pk is not None and user.pk == self.dataset.owner_id):
+            return {'can_access': True, 'mapping_area_ids': None}
+
+        row = DataSet.objects.filter(pk=self.dataset.pk).annotate(
+            is_shared=Exists(
+                DataSet.shared_with.through.objects.filter(dataset_id=OuterRef('pk'), user_id=user.pk)
+            ),
+            is_group_shared=Exists(
+                DataSet.shared_with_groups.through.objects.filter(dataset_id=OuterRef('pk'), group__user=user.pk)
+            ),
+            has_mapping_areas=Exists(MappingArea.objects.filter(dataset_id=OuterRef('pk'))),
+            user_area_ids=ArraySubquery(
+                DatasetUserMappingArea.objects.filter(dataset_id=OuterRef('pk'), user_id=user.pk)
+                .values('mapping_area_id')
+            ),
+            group_area_ids=ArraySubquery(
+                DatasetGroupMappingArea.objects.filter(dataset_id=OuterRef('pk'), group__user=user.pk)
+                .values('mapping_area_id')
+            ),
+        ).values(
+            'is_public', 'is_shared', 'is_group_shared', 'has_mapping_areas', 'user_area_ids', 'group_area_ids'
+        ).first()
+
+        if row is None:
+            return {'can_access': False, 'mapping_area_ids': []}
+
+        mapping_area_ids = None
+        if row['has_mapping_areas']:
+            combined = set(row['user_area_ids']) | set(row['group_area_ids'])
+            mapping_area_ids = sorted(combined) if combined else None
+        return {
+            'can_access': row['is_public'] or row['is_shared'] or row['is_group_shared'],
+            'mapping_area_ids': mapping_area_ids,
+        }
+
+    @property
+    def can_access(self):
+        """Whether the user can open the dataset"""
+        return self._rights['can_access']
+
+    @property
+    def mapping_area_ids(self):
+        """
+        IDs of the mapping areas that restrict the user's access, or None if
+        there are no restrictions (full dataset access).
+        """
+        return self._rights['mapping_area_ids']
+
+    def filter_geometries(self, geometries_qs):
+        """Apply the user's mapping area restrictions to a geometry queryset"""
+        allowed_ids = self.mapping_area_ids
+        if allowed_ids is None:
+            return geometries_qs
+        if not allowed_ids:
+            return geometries_qs.none()
+
+        # Indexed join on the precomputed membership table
+        return geometries_qs.filter(Exists(
+            MappingAreaMembership.objects.filter(
+                geometry=OuterRef('pk'),
+                mapping_area_id__in=allowed_ids,
+                mapping_area__dataset_id=self.dataset.pk,
+            )
+        ))
+
+    def has_geometry_access(self, geometry_obj):
+        """Whether the user may access a geometry, considering mapping area limits"""
+        allowed_ids = self.mapping_area_ids
+        if allowed_ids is None:
+            return True
+        if not allowed_ids:
+            return False
+
+        if geometry_obj.pk is None:
+            # Unsaved geometries have no memberships yet
+            return self.dataset.mapping_areas.filter(
+                id__in=allowed_ids,
+                geometry__covers=geometry_obj.geometry
+            ).exists()
+        if geometry_obj.pk not in self._geometry_access:
+            self._geometry_access[geometry_obj.pk] = MappingAreaMembership.objects.filter(
+                geometry_id=geometry_obj.pk,
+                mapping_area_id__in=allowed_ids,
+                mapping_area__dataset_id=self.dataset.pk,
+            ).exists()
+        return self._geometry_access[geometry_obj.pk]
+
+
+def mapping_access_changed(dataset_ids):
+    """
+    Record that the mapping area restrictions of datasets (ids or a queryset
+    of ids) changed, so map clients syncing with an older cursor reload all
+    points instead of receiving a delta.
+    """
+    DataSet.objects.filter(pk__in=dataset_ids).update(access_changed_at=timezone.now())
+
+
+def get_dataset_access(request, dataset):
+    """Return the DatasetAccess of the request's user, computed once per request and dataset"""
+    cache = request.__dict__.setdefault('_dataset_access', {})
+    key = (dataset.pk, request.user.pk)
+    if key not in cache:
+        cache[key] = DatasetAccess(dataset, request.user)
+    return cache[key]
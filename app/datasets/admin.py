@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import AuditLog, DataSet, DataGeometry, DataEntry, DataEntryFile, MappingArea
  
 admin.site.register(AuditLog)
@@ -15,7 +16,13 @@ class MappingAreaAdmin(admin.ModelAdmin):
     search_fields = ['name', 'dataset__name', 'created_by__username']
     readonly_fields = ['created_at', 'updated_at']
     filter_horizontal = ['allocated_users']
+    list_select_related = ['dataset', 'created_by']
+    
+    def get_queryset(self, request):
+        # Count the points of all listed areas in the same query
+        return super().get_queryset(request).annotate(point_count=Count('memberships'))
     
     def get_point_count(self, obj):
-        return obj.get_point_count()
-    get_point_count.short_description = 'Points Inside' 
\ No newline at end of file
+        return obj.point_count
+    get_point_count.short_description = 'Points Inside'
+    get_point_count.admin_order_field = 'point_count'
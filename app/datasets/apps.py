@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class DatasetsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'datasets'
+
+    def ready(self):
+        # Register signal handlers
+        from . import signals  # noqa: F401
+        # Register job handlers for the workers
+        from . import tasks  # noqa: F401
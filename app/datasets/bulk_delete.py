@@ -0,0 +1,63 @@
+"""
+Deleting the points of a dataset in bulk.
+
+Django's collector sends the delete signals of every point, entry and file
+it removes. The receivers in signals.py write tombstones and keep cached
+point counts, file statistics and mapping area progress up to date one
+row at a time, which is fine for single deletions but turns clearing a
+dataset into one query per row. Deletions running inside bulk_delete()
+make those receivers skip their work, and the datasets are updated once
+afterwards.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .file_stats import invalidate_dataset_file_statistics
+from .membership import invalidate_mapping_area_point_counts
+from .models import DataGeometry, DataGeometryTombstone
+from .progress import progress_changed
+from .revision import bump_dataset_revision
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_delete():
+    """Make the delete receivers in signals.py skip their per-row work in this thread."""
+    previous = in_bulk_delete()
+    _state.active = True
+    try:
+        yield
+    finally:
+        _state.active = previous
+
+
+def in_bulk_delete():
+    return getattr(_state, 'active', False)
+
+
+def delete_dataset_geometries(dataset_id):
+    """Delete all points of a dataset with their entries and files; returns the number of points deleted."""
+    deleted_at = timezone.now()
+    with transaction.atomic(), bulk_delete():
+        # Tombstones for incremental map sync, written in one statement
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {DataGeometryTombstone._meta.db_table} (dataset_id, geometry_id, deleted_at) "
+                f"SELECT dataset_id, id, %s FROM {DataGeometry._meta.db_table} WHERE dataset_id = %s",
+                [deleted_at, dataset_id]
+            )
+        # Points added meanwhile have no tombstone and are kept
+        tombstones = DataGeometryTombstone.objects.filter(dataset_id=dataset_id, deleted_at=deleted_at)
+        _, deleted = DataGeometry.objects.filter(
+            dataset_id=dataset_id, pk__in=tombstones.values('geometry_id')
+        ).delete()
+        bump_dataset_revision([dataset_id])
+    invalidate_mapping_area_point_counts(dataset_id)
+    invalidate_dataset_file_statistics(dataset_id)
+    progress_changed(datasets=[dataset_id])
+    return deleted.get(DataGeometry._meta.label, 0)
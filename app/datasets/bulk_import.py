@@ -0,0 +1,198 @@
+"""
+Bulk loaders for CSV geometry imports.
+
+All loaders take validated rows of the form
+``(geometry_id, x, y, [(field_name, field_type, value), ...])`` and create a
+geometry, one entry and the entry's field values per row.
+
+On PostgreSQL the rows are staged with ``COPY`` into temporary tables and
+written with a single set-based INSERT ... SELECT statement; other database
+backends fall back to ``bulk_create``. The ``row`` loader saves one object
+at a time like the import did originally and serves as the baseline of
+``manage.py benchmark_csv_import``.
+"""
+
+import csv
+import io
+
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import DataEntry, DataEntryField, DataGeometry, DatasetField
+from .revision import bump_dataset_revision
+
+
+IMPORT_ENGINES = ('copy', 'orm', 'row')
+
+
+def _copy_rows(cursor, table, columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+def copy_import_rows(dataset, user, srid, rows):
+    """
+    Create geometries, entries and field values with COPY and set-based SQL.
+
+    Returns the number of geometries created.
+    """
+    geometry_field = DataGeometry._meta.get_field('geometry')
+    point_sql = 'ST_SetSRID(ST_MakePoint(g.x, g.y), %(srid)s)'
+    if srid != geometry_field.srid:
+        point_sql = f'ST_Transform({point_sql}, {geometry_field.srid})'
+
+    now = timezone.now()
+    params = {
+        'dataset_id': dataset.pk,
+        'user_id': user.pk if user else None,
+        'srid': srid,
+        'now': now,
+    }
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE import_geometries ('
+            'seq integer PRIMARY KEY, id_kurz varchar(100) NOT NULL, '
+            'x double precision NOT NULL, y double precision NOT NULL)'
+        )
+        cursor.execute(
+            'CREATE TEMPORARY TABLE import_values ('
+            'seq integer NOT NULL, field_name varchar(100) NOT NULL, '
+            'field_type varchar(20) NOT NULL, value text)'
+        )
+
+        _copy_rows(
+            cursor, 'import_geometries', ('seq', 'id_kurz', 'x', 'y'),
+            ((seq, geometry_id, repr(x), repr(y)) for seq, (geometry_id, x, y, _) in enumerate(rows))
+        )
+        _copy_rows(
+            cursor, 'import_values', ('seq', 'field_name', 'field_type', 'value'),
+            (
+                (seq, field_name, field_type, value)
+                for seq, (_, _, _, values) in enumerate(rows)
+                for field_name, field_type, value in values
+            )
+        )
+
+        # Entries are named after their geometry's ID, which is unique within
+        # the staged rows, so field values can be joined back through it
+        cursor.execute(
+            f"""
+            WITH new_geometries AS (
+                INSERT INTO {DataGeometry._meta.db_table}
+                    (dataset_id, id_kurz, address, geometry, user_id, created_at, updated_at)
+                SELECT %(dataset_id)s, g.id_kurz, 'Unknown Address (' || g.id_kurz || ')',
+                       {point_sql}, %(user_id)s, %(now)s, %(now)s
+                FROM import_geometries g
+                ORDER BY g.seq
+                RETURNING id, id_kurz
+            ),
+            new_entries AS (
+                INSERT INTO {DataEntry._meta.db_table}
+                    (geometry_id, name, user_id, created_at, updated_at)
+                SELECT n.id, n.id_kurz, %(user_id)s, %(now)s, %(now)s
+                FROM new_geometries n
+                RETURNING id, name
+            ),
+            new_values AS (
+                INSERT INTO {DataEntryField._meta.db_table}
+                    (entry_id, field_name, field_type, value, created_at, updated_at)
+                SELECT e.id, v.field_name, v.field_type, v.value, %(now)s, %(now)s
+                FROM new_entries e
+                JOIN import_geometries g ON g.id_kurz = e.name
+                JOIN import_values v ON v.seq = g.seq
+                RETURNING 1
+            )
+            SELECT (SELECT count(*) FROM new_geometries), (SELECT count(*) FROM new_values)
+            """,
+            params
+        )
+        created, _ = cursor.fetchone()
+
+        cursor.execute('DROP TABLE import_geometries, import_values')
+
+    return created
+
+
+def orm_import_rows(dataset, user, srid, rows):
+    """
+    Create geometries, entries and field values with bulk_create.
+
+    Returns the number of geometries created.
+    """
+    with transaction.atomic():
+        geometries = DataGeometry.objects.bulk_create([
+            DataGeometry(
+                dataset=dataset,
+                id_kurz=geometry_id,
+                address=f'Unknown Address ({geometry_id})',
+                geometry=Point(x, y, srid=srid),
+                user=user
+            )
+            for geometry_id, x, y, _ in rows
+        ])
+        entries = DataEntry.objects.bulk_create([
+            DataEntry(geometry=geometry, name=geometry.id_kurz, user=user)
+            for geometry in geometries
+        ])
+        DataEntryField.objects.bulk_create([
+            DataEntryField(entry=entry, field_name=field_name, field_type=field_type, value=value)
+            for entry, (_, _, _, values) in zip(entries, rows)
+            for field_name, field_type, value in values
+        ])
+    return len(geometries)
+
+
+def row_import_rows(dataset, user, srid, rows):
+    """
+    Create geometries, entries and field values one object at a time,
+    looking up the dataset field of every value.
+
+    Returns the number of geometries created.
+    """
+    with transaction.atomic():
+        for geometry_id, x, y, values in rows:
+            geometry = DataGeometry.objects.create(
+                dataset=dataset,
+                id_kurz=geometry_id,
+                address=f'Unknown Address ({geometry_id})',
+                geometry=Point(x, y, srid=srid),
+                user=user
+            )
+            entry = DataEntry.objects.create(geometry=geometry, name=geometry_id, user=user)
+            for field_name, field_type, value in values:
+                DatasetField.objects.get_or_create(
+                    dataset=dataset,
+                    field_name=field_name,
+                    defaults={'label': field_name, 'field_type': field_type, 'enabled': True}
+                )
+                DataEntryField.objects.create(entry=entry, field_name=field_name, field_type=field_type, value=value)
+    return len(rows)
+
+
+def import_rows(dataset, user, srid, rows, engine=None):
+    """
+    Create the rows with the configured CSV_IMPORT_ENGINE.
+
+    The COPY engine needs PostgreSQL; other backends always use the ORM.
+    """
+    engine = engine or settings.CSV_IMPORT_ENGINE
+    if engine not in IMPORT_ENGINES:
+        raise ValueError(f'Unknown import engine: {engine}')
+    if engine == 'row':
+        return row_import_rows(dataset, user, srid, rows)
+    if engine == 'copy' and connection.vendor == 'postgresql':
+        imported = copy_import_rows(dataset, user, srid, rows)
+    else:
+        imported = orm_import_rows(dataset, user, srid, rows)
+    # The bulk loaders skip the signal handlers that bump the revision
+    bump_dataset_revision([dataset.pk])
+    return imported
@@ -0,0 +1,373 @@
+"""
+Row generators and file writers for dataset exports (CSV, GeoJSON,
+newline-delimited GeoJSON and GeoPackage).
+
+Rows are read with a server-side cursor, so exports of large datasets keep
+a flat memory profile and can be streamed to the client or written to a
+file as they are produced.
+
+Exports written to disk by background tasks are cached: their cache key
+combines the format, the export options and the revision counter of the
+dataset (see revision.py), and a completed export is served again until the
+dataset changes.
+"""
+
+import csv
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.db import models
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+
+from .models import DataEntry, DataEntryField, DataEntryFile, DataGeometry, ExportTask
+from .revision import get_dataset_revision
+from .schema import get_dataset_schema
+
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_FETCH_SIZE = 2000
+
+# Features sent per chunk of a streamed GeoJSON export
+EXPORT_STREAM_FEATURES = 500
+
+
+class JSONObjectAgg(models.Aggregate):
+    """PostgreSQL jsonb_object_agg(key, value)"""
+    function = 'JSONB_OBJECT_AGG'
+    output_field = models.JSONField()
+
+
+def get_export_field_names(dataset):
+    """Value columns of an export: enabled fields plus all stored field names."""
+    schema = get_dataset_schema(dataset)
+    # Headline fields are display-only and hold no data
+    field_names = {
+        field.field_name for field in schema.enabled_fields if field.field_type != 'headline'
+    }
+    field_names.update(
+        DataEntryField.objects.filter(entry__geometry__dataset=dataset)
+        .order_by().values_list('field_name', flat=True).distinct()
+    )
+    return sorted(field_names)
+
+
+def format_csv_export_value(value, field_type):
+    """Format a stored field value for CSV output."""
+    if not value:
+        return ''
+    if field_type == 'multiple_choice':
+        # Convert JSON lists to comma-separated values
+        try:
+            if value.strip().startswith('['):
+                return ', '.join(str(v) for v in json.loads(value))
+        except (json.JSONDecodeError, TypeError):
+            pass
+        return str(value)
+    return value
+
+
+def _export_entries(dataset):
+    """Entries of a dataset in export order, with their field values pivoted into one JSON object."""
+    field_values = (
+        DataEntryField.objects.filter(entry=OuterRef('pk'))
+        .order_by().values('entry')
+        .annotate(values=JSONObjectAgg('field_name', 'value'))
+        .values('values')
+    )
+    return (
+        DataEntry.objects.filter(geometry__dataset=dataset)
+        .annotate(values=Subquery(field_values, output_field=models.JSONField()))
+        .order_by('-geometry__created_at', 'geometry_id', '-created_at', 'id')
+    )
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_csv_export_rows(dataset, include_coordinates=True, field_names=None):
+    """
+    Yield the header and one row per entry of a dataset's CSV export.
+
+    Each entry's field values are pivoted into a single JSON object in SQL.
+    """
+    if field_names is None:
+        field_names = get_export_field_names(dataset)
+    schema = get_dataset_schema(dataset)
+    field_types = [schema.field_type(field_name) for field_name in field_names]
+
+    header = ['ID', 'Address']
+    if include_coordinates:
+        header.extend(['X', 'Y'])
+    header.extend(['User', 'Entry_Name', 'Year'])
+    header.extend(field_names)
+    yield header
+
+    columns = ['geometry__id_kurz', 'geometry__address', 'geometry__user__username', 'name', 'year', 'values']
+    if include_coordinates:
+        columns.append('geometry__geometry')
+    entries = _export_entries(dataset).values_list(*columns)
+
+    for entry in entries.iterator(chunk_size=EXPORT_FETCH_SIZE):
+        id_kurz, address, username, name, year, values = entry[:6]
+        row = [id_kurz, address]
+        if include_coordinates:
+            point = entry[6]
+            row.extend([point.x, point.y])
+        row.extend([username or 'Unknown', name or '', year or ''])
+        values = values or {}
+        row.extend(
+            format_csv_export_value(values.get(field_name), field_type)
+            for field_name, field_type in zip(field_names, field_types)
+        )
+        yield row
+
+
+def iter_geojson_features(dataset, user):
+    """
+    Yield one serialized GeoJSON Feature per entry visible to the user.
+
+    Geometries are serialized by ST_AsGeoJSON in the database and embedded
+    as-is. Properties use the same names and formatting as the CSV columns.
+    """
+    field_names = get_export_field_names(dataset)
+    schema = get_dataset_schema(dataset)
+    field_types = [schema.field_type(field_name) for field_name in field_names]
+
+    geometries = dataset.filter_geometries_for_user(DataGeometry.objects.filter(dataset=dataset), user)
+    entries = (
+        _export_entries(dataset)
+        .filter(geometry__in=geometries.values('id'))
+        .annotate(geojson=AsGeoJSON('geometry__geometry'))
+        .values_list('geometry__id_kurz', 'geometry__address', 'geometry__user__username', 'name', 'year', 'values', 'geojson')
+    )
+
+    for id_kurz, address, username, name, year, values, geojson in entries.iterator(chunk_size=EXPORT_FETCH_SIZE):
+        values = values or {}
+        properties = {
+            field_name: format_csv_export_value(values.get(field_name), field_type) or None
+            for field_name, field_type in zip(field_names, field_types)
+        }
+        properties.update({
+            'ID': id_kurz,
+            'Address': address,
+            'User': username or 'Unknown',
+            'Entry_Name': name,
+            'Year': year,
+        })
+        yield f'{{"type": "Feature", "geometry": {geojson}, "properties": {json.dumps(properties)}}}'
+
+
+def iter_geojson_export(dataset, user):
+    """Yield a GeoJSON FeatureCollection in chunks of EXPORT_STREAM_FEATURES features."""
+    yield '{"type": "FeatureCollection", "features": ['
+    separator = '\n'
+    for batch in _batched(iter_geojson_features(dataset, user), EXPORT_STREAM_FEATURES):
+        yield separator + ',\n'.join(batch)
+        separator = ',\n'
+    yield '\n]}\n'
+
+
+def iter_ndjson_export(dataset, user):
+    """Yield newline-delimited GeoJSON features in chunks of EXPORT_STREAM_FEATURES features."""
+    for batch in _batched(iter_geojson_features(dataset, user), EXPORT_STREAM_FEATURES):
+        yield ''.join(f'{feature}\n' for feature in batch)
+
+
+def write_csv_export(dataset, path, options, user):
+    """Write a dataset's CSV export to a file."""
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle)
+        for row in iter_csv_export_rows(dataset, include_coordinates=options.get('include_coordinates', True)):
+            writer.writerow(row)
+
+
+def write_geojson_export(dataset, path, options, user):
+    """Write the entries visible to the user as a GeoJSON FeatureCollection to a file."""
+    with open(path, 'w', encoding='utf-8') as handle:
+        for chunk in iter_geojson_export(dataset, user):
+            handle.write(chunk)
+
+
+# OGR field types of dataset field types; everything else is stored as text
+GEOPACKAGE_FIELD_TYPES = {
+    'integer': 'OFTInteger64',
+    'decimal': 'OFTReal',
+    'boolean': 'OFTInteger',
+    'date': 'OFTDate',
+}
+
+# Features written per GeoPackage transaction
+GEOPACKAGE_TRANSACTION_SIZE = 10000
+
+
+def _geopackage_value(value, field_type):
+    """Convert a stored value for a typed GeoPackage column, None if it does not parse."""
+    if not value:
+        return None
+    try:
+        if field_type == 'integer':
+            return int(value)
+        if field_type == 'decimal':
+            return float(value)
+        if field_type == 'boolean':
+            return 1 if value.lower() in ('true', '1', 'yes', 'on') else 0
+        if field_type == 'date':
+            return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+    return format_csv_export_value(value, field_type)
+
+
+def write_geopackage_export(dataset, path, options, user):
+    """
+    Write the entries visible to the user to a GeoPackage point layer.
+
+    Field values become columns typed from their DatasetField, features are
+    written in transactions of GEOPACKAGE_TRANSACTION_SIZE, and the layer
+    gets the driver's R-tree spatial index plus an index on the ID column.
+    """
+    # GDAL's Python bindings are only needed for this export
+    from osgeo import ogr, osr
+    ogr.UseExceptions()
+
+    schema = get_dataset_schema(dataset)
+    field_names = get_export_field_names(dataset)
+
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(DataGeometry._meta.get_field('geometry').srid)
+    srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+    data_source = ogr.GetDriverByName('GPKG').CreateDataSource(str(path))
+    layer = data_source.CreateLayer('entries', srs, ogr.wkbPoint, options=['SPATIAL_INDEX=YES'])
+
+    # Column names are case-insensitive in SQLite; fid and geom are the
+    # driver's feature id and geometry columns
+    used_names = {'fid', 'geom'}
+
+    def add_column(name, ogr_type, subtype=None):
+        column = name
+        suffix = 2
+        while column.lower() in used_names:
+            column = f'{name}_{suffix}'
+            suffix += 1
+        used_names.add(column.lower())
+        definition = ogr.FieldDefn(column, ogr_type)
+        if subtype is not None:
+            definition.SetSubType(subtype)
+        layer.CreateField(definition)
+        return layer.GetLayerDefn().GetFieldIndex(column)
+
+    base_columns = [
+        add_column('ID', ogr.OFTString),
+        add_column('Address', ogr.OFTString),
+        add_column('User', ogr.OFTString),
+        add_column('Entry_Name', ogr.OFTString),
+        add_column('Year', ogr.OFTInteger),
+    ]
+    value_columns = []
+    for field_name in field_names:
+        field_type = schema.field_type(field_name)
+        ogr_type = getattr(ogr, GEOPACKAGE_FIELD_TYPES.get(field_type, 'OFTString'))
+        subtype = ogr.OFSTBoolean if field_type == 'boolean' else None
+        value_columns.append((field_name, field_type, add_column(field_name, ogr_type, subtype)))
+
+    geometries = dataset.filter_geometries_for_user(DataGeometry.objects.filter(dataset=dataset), user)
+    entries = (
+        _export_entries(dataset)
+        .filter(geometry__in=geometries.values('id'))
+        .values_list('geometry__id_kurz', 'geometry__address', 'geometry__user__username', 'name', 'year', 'values', 'geometry__geometry')
+    )
+
+    layer_definition = layer.GetLayerDefn()
+    for batch in _batched(entries.iterator(chunk_size=EXPORT_FETCH_SIZE), GEOPACKAGE_TRANSACTION_SIZE):
+        layer.StartTransaction()
+        for id_kurz, address, username, name, year, values, point in batch:
+            feature = ogr.Feature(layer_definition)
+            for index, value in zip(base_columns, (id_kurz, address, username or 'Unknown', name, year)):
+                if value is not None:
+                    feature.SetField(index, value)
+            values = values or {}
+            for field_name, field_type, index in value_columns:
+                value = _geopackage_value(values.get(field_name), field_type)
+                if value is None:
+                    continue
+                if field_type == 'date':
+                    feature.SetField(index, value.year, value.month, value.day, 0, 0, 0, 0)
+                else:
+                    feature.SetField(index, value)
+            geometry = ogr.Geometry(ogr.wkbPoint)
+            geometry.AddPoint_2D(point.x, point.y)
+            feature.SetGeometry(geometry)
+            layer.CreateFeature(feature)
+        layer.CommitTransaction()
+
+    data_source.ExecuteSQL('CREATE INDEX entries_id_idx ON entries ("ID")')
+    data_source = None  # Closing the data source flushes the file
+
+
+# Export formats produced by background export tasks. Writers are called
+# with (dataset, path, options, user) and create the file at path.
+EXPORT_FORMATS = {
+    'csv': {
+        'extension': 'csv',
+        'content_type': 'text/csv',
+        'writer': write_csv_export,
+    },
+    'geojson': {
+        'extension': 'geojson',
+        'content_type': 'application/geo+json',
+        'writer': write_geojson_export,
+    },
+    'gpkg': {
+        'extension': 'gpkg',
+        'content_type': 'application/geopackage+sqlite3',
+        'writer': write_geopackage_export,
+    },
+}
+
+
+def get_export_cache_key(dataset, export_format, options):
+    """Cache key of an export of the dataset's current revision."""
+    payload = json.dumps({
+        'dataset': dataset.pk,
+        'format': export_format,
+        'options': options,
+        'revision': get_dataset_revision(dataset),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_zip_export_cache_key(dataset, params):
+    """
+    Cache key of a ZIP export of the dataset's current files.
+
+    The file set is fingerprinted by its count, highest id and total size,
+    which change whenever a file is uploaded or deleted.
+    """
+    files = DataEntryFile.objects.filter(entry__geometry__dataset=dataset).order_by().aggregate(
+        count=Count('id'), last=Max('id'), size=Sum('file_size')
+    )
+    return get_export_cache_key(dataset, 'zip', {**params, 'files': [files['count'], files['last'], files['size']]})
+
+
+def find_cached_export(dataset, cache_key):
+    """Return the newest completed export with this cache key whose file still exists."""
+    tasks = ExportTask.objects.filter(
+        dataset=dataset, cache_key=cache_key, status='completed'
+    ).exclude(file_path__isnull=True).order_by('-completed_at')
+    for task in tasks[:5]:
+        if (Path(settings.MEDIA_ROOT) / task.file_path).exists():
+            return task
+    return None
@@ -0,0 +1,84 @@
+"""
+Statistics of the files uploaded to a dataset.
+
+Statistics are computed with aggregate queries instead of loading every
+DataEntryFile into Python. The summary of all files of a dataset is stored
+in Django's cache framework; signal handlers in signals.py invalidate it
+when files are added or removed.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+
+from .models import DataEntryFile
+
+
+def calculate_file_statistics(files_queryset):
+    """
+    Count, size, type, user, geometry and date statistics of a DataEntryFile
+    queryset.
+    """
+    files_queryset = files_queryset.order_by()
+    totals = files_queryset.aggregate(
+        total_files=Count('id'),
+        total_size=Sum('file_size'),
+        earliest=Min('upload_date'),
+        latest=Max('upload_date'),
+    )
+    stats = {
+        'total_files': totals['total_files'],
+        'total_size': totals['total_size'] or 0,
+        'file_types': {},
+        'users': {},
+        'geometries': {},
+        'date_range': {
+            'earliest': totals['earliest'].date() if totals['earliest'] else None,
+            'latest': totals['latest'].date() if totals['latest'] else None,
+        },
+    }
+
+    # Files are grouped by their full MIME type in the database and by its
+    # main type ('image', 'application', ...) here; there are few distinct types
+    by_mime_type = files_queryset.values('file_type').annotate(count=Count('id')).order_by('-count')
+    for row in by_mime_type:
+        file_type = row['file_type'].split('/')[0]
+        stats['file_types'][file_type] = stats['file_types'].get(file_type, 0) + row['count']
+
+    by_user = files_queryset.values('upload_user__username').annotate(count=Count('id')).order_by('-count')
+    for row in by_user:
+        user = row['upload_user__username'] or 'Unknown'
+        stats['users'][user] = stats['users'].get(user, 0) + row['count']
+
+    by_geometry = (
+        files_queryset.values('entry__geometry__id_kurz').annotate(count=Count('id'))
+        .order_by('entry__geometry__id_kurz')
+    )
+    for row in by_geometry:
+        stats['geometries'][row['entry__geometry__id_kurz']] = row['count']
+
+    return stats
+
+
+def _file_stats_cache_key(dataset_id):
+    return f'datasets:file-stats:{dataset_id}'
+
+
+def get_dataset_file_statistics(dataset):
+    """Return the cached statistics of all files of a dataset (instance or id)"""
+    dataset_id = getattr(dataset, 'pk', dataset)
+    key = _file_stats_cache_key(dataset_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = calculate_file_statistics(DataEntryFile.objects.filter(entry__geometry__dataset_id=dataset_id))
+        cache.set(key, stats, settings.DATASET_FILE_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dataset_file_statistics(*dataset_ids):
+    """Drop the cached file statistics of the given datasets"""
+    keys = [_file_stats_cache_key(dataset_id) for dataset_id in dataset_ids]
+    cache.delete_many(keys)
+    # Drop them again once the change is visible to concurrent requests
+    transaction.on_commit(lambda: cache.delete_many(keys))
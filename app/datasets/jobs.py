@@ -0,0 +1,192 @@
+"""
+Database-backed job queue.
+
+Heavy operations (exports, imports) are stored as Job rows and executed by
+``manage.py run_workers`` instead of threads inside the web process. Workers
+claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of
+worker processes can poll the same table without handing out a job twice.
+
+Running jobs send heartbeats. A job whose heartbeat is older than
+JOB_HEARTBEAT_TIMEOUT (its worker crashed or was restarted) is claimed
+again, and failed jobs are retried with an increasing delay until they
+reach JOB_MAX_ATTEMPTS. Handlers must raise to have their job retried.
+Finished jobs are deleted after JOB_RETENTION_DAYS.
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job kind -> handler function, filled by @register_job
+JOB_HANDLERS = {}
+
+# Job kind -> function called once a job of that kind has failed for good
+JOB_FAILURE_HANDLERS = {}
+
+# Seconds between two deletions of old jobs by an idle worker
+JOB_CLEANUP_INTERVAL = 3600
+
+
+def register_job(kind, on_failure=None):
+    """
+    Register a function as the handler of a job kind; it is called with the
+    job's payload. on_failure is called with the error message and the
+    payload when the job is given up, including jobs whose worker was lost
+    on their last attempt.
+    """
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        if on_failure is not None:
+            JOB_FAILURE_HANDLERS[kind] = on_failure
+        return func
+    return decorator
+
+
+def enqueue_job(kind, **payload):
+    """
+    Queue a job. It becomes visible to workers when the current transaction
+    commits.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    return Job.objects.create(kind=kind, payload=payload, max_attempts=settings.JOB_MAX_ATTEMPTS)
+
+
+def claim_job(worker_id):
+    """Claim the next due job for a worker, or return None if there is nothing to do."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT)
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='queued', run_after__lte=now) | Q(status='running', heartbeat_at__lt=stale))
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        if job.status == 'running':
+            logger.warning(f"Job {job.pk} ({job.kind}) lost its worker {job.locked_by}, claiming it again")
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at', 'heartbeat_at', 'updated_at'])
+    return job
+
+
+class _Heartbeat(threading.Thread):
+    """Update a running job's heartbeat until stopped."""
+
+    def __init__(self, job):
+        super().__init__(daemon=True)
+        self.job = job
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.JOB_HEARTBEAT_INTERVAL):
+                Job.objects.filter(pk=self.job.pk, locked_by=self.job.locked_by).update(heartbeat_at=timezone.now())
+        finally:
+            # Threads open their own database connection
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome, scheduling a retry on failure."""
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    try:
+        if job.attempts > job.max_attempts:
+            raise RuntimeError(f'Gave up after {job.max_attempts} attempts')
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise RuntimeError(f'No handler registered for job kind {job.kind}')
+        handler(**job.payload)
+    except Exception as e:
+        logger.error(f"Job {job.pk} ({job.kind}) failed on attempt {job.attempts}: {str(e)}", exc_info=True)
+        job.last_error = str(e)
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = timezone.now() + timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.completed_at = timezone.now()
+    else:
+        job.status = 'completed'
+        job.completed_at = timezone.now()
+    finally:
+        heartbeat.stop()
+
+    # The job may have been claimed again after a missed heartbeat, the
+    # outcome is then up to the worker now holding it
+    updated = Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=job.status,
+        last_error=job.last_error,
+        run_after=job.run_after,
+        completed_at=job.completed_at,
+        locked_by='',
+        updated_at=timezone.now()
+    )
+    if not updated:
+        logger.warning(f"Job {job.pk} ({job.kind}) was claimed by another worker, discarding the result of {job.locked_by}")
+        return job
+    job.locked_by = ''
+
+    on_failure = JOB_FAILURE_HANDLERS.get(job.kind)
+    if job.status == 'failed' and on_failure is not None:
+        try:
+            on_failure(job.last_error, **job.payload)
+        except Exception as e:
+            logger.error(f"Failure handler of job {job.pk} ({job.kind}) failed: {str(e)}", exc_info=True)
+    return job
+
+
+def delete_old_jobs():
+    """Delete jobs that finished more than JOB_RETENTION_DAYS ago; returns the number deleted."""
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    deleted, _ = Job.objects.filter(status__in=['completed', 'failed'], completed_at__lt=cutoff).delete()
+    return deleted
+
+
+def work(worker_id, stop_event=None, once=False):
+    """
+    Claim and run jobs until stop_event is set.
+
+    With once=True the loop returns as soon as no job is due. Idle workers
+    delete old jobs every JOB_CLEANUP_INTERVAL seconds.
+    """
+    next_cleanup = 0
+    while stop_event is None or not stop_event.is_set():
+        close_old_connections()
+        job = claim_job(worker_id)
+        if job is None:
+            if time.monotonic() >= next_cleanup:
+                deleted = delete_old_jobs()
+                if deleted:
+                    logger.info(f"Worker {worker_id} deleted {deleted} old jobs")
+                next_cleanup = time.monotonic() + JOB_CLEANUP_INTERVAL
+            if once:
+                return
+            if stop_event is not None:
+                stop_event.wait(settings.JOB_POLL_INTERVAL)
+            else:
+                time.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        logger.info(f"Worker {worker_id} running job {job.pk} ({job.kind}), attempt {job.attempts}")
+        run_job(job)
@@ -0,0 +1,101 @@
+import os
+import random
+import tempfile
+import uuid
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from datasets.bulk_import import IMPORT_ENGINES
+from datasets.models import DataSet, ImportTask
+from datasets.tasks import run_csv_import
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure CSV import throughput (rows/second) of the available import engines '
+        'against the original per-row import'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Number of CSV rows to import')
+        parser.add_argument('--columns', type=int, default=10, help='Number of value columns per row')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows committed per chunk')
+        parser.add_argument(
+            '--engine', action='append', choices=IMPORT_ENGINES, dest='engines',
+            help='Engine to benchmark (repeatable, default: all)'
+        )
+
+    def handle(self, *args, **options):
+        engines = options['engines'] or list(IMPORT_ENGINES)
+        if 'copy' in engines and connection.vendor != 'postgresql':
+            raise CommandError('The copy engine requires PostgreSQL')
+
+        rows = options['rows']
+        csv_path = self.write_csv(rows, options['columns'])
+        user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex[:12]}')
+        # engine -> (seconds, rows imported)
+        self.results = results = {}
+        try:
+            for engine in engines:
+                results[engine] = self.run_engine(engine, user, csv_path, options['chunk_size'])
+                seconds, imported = results[engine]
+                self.stdout.write(
+                    f'{engine:>5}: {imported} rows in {seconds:.2f}s ({imported / seconds:,.0f} rows/s)'
+                )
+        finally:
+            user.delete()
+            os.remove(csv_path)
+
+        if len(results) > 1:
+            baseline = 'row' if 'row' in results else engines[0]
+            for engine in engines:
+                if engine != baseline:
+                    self.stdout.write(self.style.SUCCESS(
+                        f'{engine} is {results[baseline][0] / results[engine][0]:.1f}x the speed of {baseline}'
+                    ))
+
+    def write_csv(self, rows, columns):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        value_columns = [f'FIELD_{index}' for index in range(columns)]
+        with os.fdopen(handle, 'w', encoding='utf-8') as csv_file:
+            csv_file.write(','.join(['ID', 'X', 'Y'] + value_columns) + '\n')
+            for row in range(rows):
+                values = [f'B{row:07d}', f'{random.uniform(16.2, 16.5):.6f}', f'{random.uniform(48.1, 48.3):.6f}']
+                values += [f'value {row} {index}' for index in range(columns)]
+                csv_file.write(','.join(values) + '\n')
+        return path
+
+    def run_engine(self, engine, user, csv_path, chunk_size):
+        dataset = DataSet.objects.create(name=f'CSV import benchmark ({engine})', owner=user)
+        try:
+            # run_csv_import removes the file it imported, so work on a copy
+            handle, task_path = tempfile.mkstemp(suffix='.csv')
+            with os.fdopen(handle, 'wb') as target, open(csv_path, 'rb') as source:
+                target.write(source.read())
+
+            task = ImportTask.objects.create(
+                dataset=dataset, user=user, task_id=str(uuid.uuid4()),
+                file_path=task_path, file_name='benchmark.csv',
+                file_size=os.path.getsize(task_path), id_column='ID',
+            )
+            with override_settings(CSV_IMPORT_ENGINE=engine, CSV_IMPORT_CHUNK_SIZE=chunk_size):
+                start = perf_counter()
+                try:
+                    run_csv_import(task.task_id)
+                except Exception as e:
+                    # Failed imports keep their file for a retry
+                    if os.path.exists(task_path):
+                        os.remove(task_path)
+                    raise CommandError(f'{engine} import failed: {str(e)}')
+                seconds = perf_counter() - start
+
+            task.refresh_from_db()
+            if task.status != 'completed':
+                raise CommandError(f'{engine} import failed: {task.error_message}')
+            return seconds, task.rows_imported
+        finally:
+            dataset.delete()
@@ -0,0 +1,127 @@
+import itertools
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from datasets.membership import rebuild_dataset_membership
+from datasets.models import DataGeometry, DataSet, DatasetUserMappingArea, MappingArea, MappingAreaMembership
+
+
+class Command(BaseCommand):
+    help = 'Compare mapping area access checks using spatial predicates and the membership table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--areas', type=int, default=50, help='Number of mapping areas')
+        parser.add_argument('--points', type=int, default=100000, help='Number of geometries in the dataset')
+        parser.add_argument('--repeat', type=int, default=20, help='Measurements per query')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:12]
+        owner = User.objects.create_user(username=f'benchmark-owner-{suffix}')
+        member = User.objects.create_user(username=f'benchmark-member-{suffix}')
+        try:
+            dataset = self.create_dataset(owner, member, options['areas'], options['points'])
+            areas = list(dataset.mapping_areas.all())
+            geometries = list(DataGeometry.objects.filter(dataset=dataset).order_by('?')[:options['repeat']])
+            base = DataGeometry.objects.filter(dataset=dataset)
+
+            def spatial_filter():
+                condition = Q()
+                for area in areas:
+                    condition |= Q(geometry__within=area.geometry)
+                return base.filter(condition).count()
+
+            def membership_filter():
+                return dataset.filter_geometries_for_user(base, member).count()
+
+            geometry_iter = itertools.cycle(geometries)
+
+            def spatial_check():
+                geometry = next(geometry_iter)
+                return dataset.mapping_areas.filter(geometry__covers=geometry.geometry).exists()
+
+            def membership_check():
+                return dataset.user_has_geometry_access(member, next(geometry_iter))
+
+            for label, spatial, membership in (
+                ('filter geometries', spatial_filter, membership_filter),
+                ('single access check', spatial_check, membership_check),
+            ):
+                spatial_ms = self.measure(spatial, options['repeat'])
+                membership_ms = self.measure(membership, options['repeat'])
+                self.stdout.write(
+                    f'{label:>20}: spatial {spatial_ms:,.2f} ms, membership {membership_ms:,.2f} ms '
+                    f'({spatial_ms / membership_ms:.1f}x)'
+                )
+            self.stdout.write(self.style.SUCCESS('Benchmark completed'))
+        finally:
+            self.cleanup(owner)
+            owner.delete()
+            member.delete()
+
+    def create_dataset(self, owner, member, area_count, point_count):
+        dataset = DataSet.objects.create(name='Mapping area access benchmark', owner=owner)
+        dataset.shared_with.add(member)
+
+        # Points spread over a 1x1 degree square, areas on a grid covering half of it
+        rng = random.Random(42)
+        batch = []
+        for index in range(point_count):
+            batch.append(DataGeometry(
+                dataset=dataset, id_kurz=f'P{index}', address='Benchmark',
+                geometry=Point(16 + rng.random(), 48 + rng.random(), srid=4326), user=owner,
+            ))
+            if len(batch) == 5000:
+                DataGeometry.objects.bulk_create(batch)
+                batch = []
+        DataGeometry.objects.bulk_create(batch)
+
+        columns = max(1, round(area_count ** 0.5))
+        rows = -(-area_count // columns)
+        areas = []
+        for index in range(area_count):
+            x = 16 + (index % columns) / columns
+            y = 48 + (index // columns) / rows * 0.5
+            areas.append(MappingArea(
+                dataset=dataset, name=f'Area {index}', created_by=owner,
+                geometry=Polygon.from_bbox((x, y, x + 1 / columns, y + 0.5 / rows)),
+            ))
+        areas = MappingArea.objects.bulk_create(areas)
+        DatasetUserMappingArea.objects.bulk_create([
+            DatasetUserMappingArea(dataset=dataset, user=member, mapping_area=area) for area in areas
+        ])
+
+        start = time.perf_counter()
+        rebuild_dataset_membership(dataset.pk)
+        self.stdout.write(
+            f'Membership of {point_count:,} points in {area_count} areas built in '
+            f'{time.perf_counter() - start:.2f}s'
+        )
+        return dataset
+
+    def cleanup(self, owner):
+        # Delete the points in bulk; a cascading delete would send one
+        # post_delete signal (and write one tombstone) per point
+        for dataset in DataSet.objects.filter(owner=owner):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {MappingAreaMembership._meta.db_table} WHERE mapping_area_id IN "
+                    f"(SELECT id FROM {MappingArea._meta.db_table} WHERE dataset_id = %s)",
+                    [dataset.pk]
+                )
+                cursor.execute(f"DELETE FROM {DataGeometry._meta.db_table} WHERE dataset_id = %s", [dataset.pk])
+            dataset.delete()
+
+    def measure(self, func, repeat):
+        """Average milliseconds per call"""
+        func()  # Warm up
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - start) * 1000 / repeat
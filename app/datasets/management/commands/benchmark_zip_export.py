@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from datasets.models import DataEntry, DataEntryFile, DataGeometry, DataSet, ExportTask
+from datasets.tasks import generate_zip_export
+
+
+class Command(BaseCommand):
+    help = 'Measure ZIP export throughput on a photo-heavy dataset with and without adaptive compression'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=100, help='Number of photos in the dataset')
+        parser.add_argument('--size-kb', type=int, default=2048, help='Size of each photo in KiB')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        # Keep completion emails out of the measurement
+        overrides = override_settings(
+            MEDIA_ROOT=media_root,
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        )
+        overrides.enable()
+        user = User.objects.create_user(username=f'benchmark-{uuid.uuid4().hex[:12]}')
+        try:
+            dataset = self.create_dataset(user, options['files'], options['size_kb'] * 1024)
+            total_bytes = options['files'] * options['size_kb'] * 1024
+
+            results = {}
+            for label, store_compressed in (('deflate all', False), ('adaptive', True)):
+                with override_settings(ZIP_EXPORT_STORE_COMPRESSED=store_compressed):
+                    seconds, archive_size = self.run_export(dataset, user)
+                results[label] = seconds
+                self.stdout.write(
+                    f'{label:>11}: {seconds:.2f}s, {total_bytes / seconds / (1024 * 1024):,.1f} MB/s, '
+                    f'archive {archive_size / (1024 * 1024):,.1f} MB'
+                )
+
+            self.stdout.write(self.style.SUCCESS(
+                f"adaptive is {results['deflate all'] / results['adaptive']:.1f}x the speed of deflate all"
+            ))
+        finally:
+            user.delete()
+            overrides.disable()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def create_dataset(self, user, files, size):
+        dataset = DataSet.objects.create(name='ZIP export benchmark', owner=user)
+        geometry = DataGeometry.objects.create(
+            dataset=dataset, id_kurz='BENCH', address='Benchmark', geometry=Point(16.37, 48.21, srid=4326), user=user,
+        )
+        entry = DataEntry.objects.create(geometry=geometry, name='BENCH', user=user)
+        for index in range(files):
+            # Random bytes do not compress, just like JPEG data
+            DataEntryFile.objects.create(
+                entry=entry, file=ContentFile(os.urandom(size), name=f'photo_{index}.jpg'),
+                filename=f'photo_{index}.jpg', file_type='image/jpeg', file_size=size, upload_user=user,
+            )
+        return dataset
+
+    def run_export(self, dataset, user):
+        task = ExportTask.objects.create(task_id=str(uuid.uuid4()), dataset=dataset, user=user)
+        start = time.perf_counter()
+        generate_zip_export(task.task_id, dataset.id, user.id, file_types=['all'])
+        seconds = time.perf_counter() - start
+
+        task.refresh_from_db()
+        if task.status != 'completed':
+            raise CommandError(f'Export failed: {task.error_message}')
+        return seconds, task.file_size
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from datasets.models import DataSet
+from datasets.progress import rebuild_dataset_progress
+
+
+class Command(BaseCommand):
+    help = 'Recompute the mapping area progress tables from the stored entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset_ids', nargs='*', type=int, help='Datasets to rebuild (default: all)')
+
+    def handle(self, *args, **options):
+        datasets = DataSet.objects.order_by('pk')
+        if options['dataset_ids']:
+            datasets = datasets.filter(pk__in=options['dataset_ids'])
+        count = 0
+        for dataset_id in datasets.values_list('pk', flat=True):
+            rebuild_dataset_progress(dataset_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt progress of {count} dataset(s)'))
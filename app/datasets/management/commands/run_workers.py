@@ -0,0 +1,70 @@
+import multiprocessing
+import os
+import signal
+import socket
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from datasets.jobs import work
+
+
+def worker_id():
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def run_worker(stop_event):
+    """Entry point of a worker process."""
+    work(worker_id(), stop_event)
+
+
+class Command(BaseCommand):
+    help = 'Run worker processes that execute queued background jobs (exports, imports)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Number of worker processes (default: JOB_WORKER_PROCESSES)',
+        )
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due and exit')
+
+    def handle(self, *args, **options):
+        processes = options['processes'] or settings.JOB_WORKER_PROCESSES
+        stop_event = multiprocessing.Event()
+
+        def request_stop(signum, frame):
+            # Running jobs are finished before the workers exit
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+
+        if options['once']:
+            work(worker_id(), stop_event, once=True)
+            return
+        if processes <= 1:
+            self.stdout.write(f'Starting 1 worker (pid {os.getpid()})')
+            work(worker_id(), stop_event)
+            self.stdout.write(self.style.SUCCESS('Worker stopped'))
+            return
+
+        # Forked processes must not share the parent's database connections
+        connections.close_all()
+        workers = {}
+        self.stdout.write(f'Starting {processes} workers')
+        while not stop_event.is_set():
+            for index in range(processes):
+                process = workers.get(index)
+                if process is not None and process.is_alive():
+                    continue
+                if process is not None:
+                    self.stderr.write(f'Worker {process.pid} exited with code {process.exitcode}, restarting')
+                process = multiprocessing.Process(target=run_worker, args=(stop_event,), daemon=False)
+                process.start()
+                workers[index] = process
+            stop_event.wait(1)
+
+        for process in workers.values():
+            process.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
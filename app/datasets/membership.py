@@ -0,0 +1,107 @@
+"""
+Precomputed membership of geometries in mapping areas.
+
+Mapping area restrictions used to be evaluated with one spatial predicate
+per allowed area on every request. The MappingAreaMembership table stores
+which points each area covers, so access checks become an indexed join.
+
+Rows are refreshed by the signal handlers in signals.py when a geometry or
+mapping area is saved (deletions cascade), and rebuilt per dataset after
+bulk imports, which bypass the signals.
+
+The number of points in each mapping area of a dataset is counted from the
+same table in one grouped query and kept in Django's cache until points or
+polygons of the dataset change.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import DataGeometry, MappingArea, MappingAreaMembership
+
+
+def _tables():
+    return {
+        'membership': MappingAreaMembership._meta.db_table,
+        'area': MappingArea._meta.db_table,
+        'geometry': DataGeometry._meta.db_table,
+    }
+
+
+def refresh_mapping_area_membership(mapping_area_id):
+    """Recompute the geometries covered by one mapping area."""
+    tables = _tables()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {tables['membership']} WHERE mapping_area_id = %s", [mapping_area_id]
+        )
+        cursor.execute(
+            f"INSERT INTO {tables['membership']} (mapping_area_id, geometry_id) "
+            f"SELECT a.id, g.id FROM {tables['area']} a "
+            f"JOIN {tables['geometry']} g ON g.dataset_id = a.dataset_id AND ST_Covers(a.geometry, g.geometry) "
+            f"WHERE a.id = %s",
+            [mapping_area_id]
+        )
+
+
+def refresh_geometry_membership(geometry_id):
+    """Recompute the mapping areas covering one geometry."""
+    tables = _tables()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {tables['membership']} WHERE geometry_id = %s", [geometry_id]
+        )
+        cursor.execute(
+            f"INSERT INTO {tables['membership']} (mapping_area_id, geometry_id) "
+            f"SELECT a.id, g.id FROM {tables['geometry']} g "
+            f"JOIN {tables['area']} a ON a.dataset_id = g.dataset_id AND ST_Covers(a.geometry, g.geometry) "
+            f"WHERE g.id = %s",
+            [geometry_id]
+        )
+
+
+def rebuild_dataset_membership(dataset_id):
+    """Recompute the memberships of all geometries and mapping areas of a dataset."""
+    tables = _tables()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {tables['membership']} WHERE mapping_area_id IN "
+            f"(SELECT id FROM {tables['area']} WHERE dataset_id = %s)",
+            [dataset_id]
+        )
+        cursor.execute(
+            f"INSERT INTO {tables['membership']} (mapping_area_id, geometry_id) "
+            f"SELECT a.id, g.id FROM {tables['area']} a "
+            f"JOIN {tables['geometry']} g ON g.dataset_id = a.dataset_id AND ST_Covers(a.geometry, g.geometry) "
+            f"WHERE a.dataset_id = %s",
+            [dataset_id]
+        )
+    invalidate_mapping_area_point_counts(dataset_id)
+
+
+def _point_counts_cache_key(dataset_id):
+    return f'datasets:mapping-area-points:{dataset_id}'
+
+
+def get_mapping_area_point_counts(dataset):
+    """Return the cached number of points per mapping area id of a dataset (instance or id)"""
+    dataset_id = getattr(dataset, 'pk', dataset)
+    key = _point_counts_cache_key(dataset_id)
+    counts = cache.get(key)
+    if counts is None:
+        counts = dict(
+            MappingArea.objects.filter(dataset_id=dataset_id).order_by()
+            .annotate(point_count=Count('memberships')).values_list('id', 'point_count')
+        )
+        cache.set(key, counts, settings.MAPPING_AREA_POINT_COUNT_CACHE_TIMEOUT)
+    return counts
+
+
+def invalidate_mapping_area_point_counts(*dataset_ids):
+    """Drop the cached mapping area point counts of the given datasets"""
+    keys = [_point_counts_cache_key(dataset_id) for dataset_id in dataset_ids]
+    cache.delete_many(keys)
+    # Drop them again once the change is visible to concurrent requests
+    transaction.on_commit(lambda: cache.delete_many(keys))
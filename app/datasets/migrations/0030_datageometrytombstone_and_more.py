@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0029_alter_datasetfield_field_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataGeometryTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geometry_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='geometry_tombstones', to='datasets.dataset')),
+            ],
+            options={
+                'verbose_name': 'Data Geometry Tombstone',
+                'verbose_name_plural': 'Data Geometry Tombstones',
+                'ordering': ['-deleted_at'],
+                'indexes': [models.Index(fields=['dataset', 'deleted_at'], name='geomtombstone_dataset_deleted')],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='datageometry',
+            index=models.Index(fields=['dataset', 'updated_at'], name='datageometry_dataset_updated'),
+        ),
+    ]
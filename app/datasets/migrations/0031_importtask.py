@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0030_datageometrytombstone_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.CharField(max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('uploaded', 'Uploaded'), ('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='uploaded', max_length=20)),
+                ('file_path', models.CharField(help_text='Temporary path of the uploaded CSV file', max_length=500)),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('file_size', models.BigIntegerField(default=0)),
+                ('delimiter', models.CharField(default=',', max_length=5)),
+                ('id_column', models.CharField(blank=True, max_length=255)),
+                ('x_column', models.CharField(default='X', max_length=255)),
+                ('y_column', models.CharField(default='Y', max_length=255)),
+                ('srid', models.IntegerField(default=4326)),
+                ('clear_existing', models.BooleanField(default=False)),
+                ('bytes_processed', models.BigIntegerField(default=0)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('rows_imported', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('errors', models.JSONField(blank=True, default=list, help_text='First error messages of the import')),
+                ('error_message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_tasks', to='datasets.dataset')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='import_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Import Task',
+                'verbose_name_plural': 'Import Tasks',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0031_importtask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exporttask',
+            name='export_format',
+            field=models.CharField(choices=[('zip', 'ZIP archive of files'), ('csv', 'CSV')], default='zip', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='exporttask',
+            name='export_options',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='exporttask',
+            name='cache_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0032_exporttask_format_and_cache_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exporttask',
+            name='export_format',
+            field=models.CharField(choices=[('zip', 'ZIP archive of files'), ('csv', 'CSV'), ('gpkg', 'GeoPackage')], default='zip', max_length=20),
+        ),
+    ]
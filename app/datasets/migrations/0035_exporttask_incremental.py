@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0034_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exporttask',
+            name='incremental',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='exporttask',
+            name='previous_export',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='next_exports', to='datasets.exporttask'),
+        ),
+        migrations.AddField(
+            model_name='exporttask',
+            name='watermark_file_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0035_exporttask_incremental'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MappingAreaMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geometry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mapping_area_memberships', to='datasets.datageometry')),
+                ('mapping_area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='datasets.mappingarea')),
+            ],
+            options={
+                'verbose_name': 'Mapping Area Membership',
+                'verbose_name_plural': 'Mapping Area Memberships',
+                'indexes': [models.Index(fields=['geometry', 'mapping_area'], name='areamember_geometry_area')],
+                'unique_together': {('mapping_area', 'geometry')},
+            },
+        ),
+        # Fill the table for existing mapping areas
+        migrations.RunSQL(
+            sql=(
+                "INSERT INTO datasets_mappingareamembership (mapping_area_id, geometry_id) "
+                "SELECT a.id, g.id FROM datasets_mappingarea a "
+                "JOIN datasets_datageometry g ON g.dataset_id = a.dataset_id AND ST_Covers(a.geometry, g.geometry)"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('datasets', '0036_mappingareamembership'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dataset',
+            name='is_public',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.CreateModel(
+            name='DatasetVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility', to='datasets.dataset')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dataset_visibility', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Dataset Visibility',
+                'verbose_name_plural': 'Dataset Visibility',
+                'unique_together': {('user', 'dataset')},
+            },
+        ),
+        # Fill the table for existing datasets
+        migrations.RunSQL(
+            sql=(
+                "INSERT INTO datasets_datasetvisibility (user_id, dataset_id) "
+                "SELECT owner_id, id FROM datasets_dataset "
+                "UNION SELECT user_id, dataset_id FROM datasets_dataset_shared_with "
+                "UNION SELECT ug.user_id, sg.dataset_id FROM datasets_dataset_shared_with_groups sg "
+                "JOIN auth_user_groups ug ON ug.group_id = sg.group_id"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0037_datasetvisibility'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntryProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('required_filled', models.PositiveIntegerField(default=0)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entry_progress', to='datasets.dataset')),
+                ('entry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='datasets.dataentry')),
+                ('geometry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entry_progress', to='datasets.datageometry')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='entry_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Entry Progress',
+                'verbose_name_plural': 'Entry Progress',
+            },
+        ),
+        migrations.CreateModel(
+            name='MappingAreaProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geometries_with_entries', models.PositiveIntegerField(default=0)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('required_filled', models.PositiveIntegerField(default=0)),
+                ('mapping_area', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='datasets.mappingarea')),
+            ],
+            options={
+                'verbose_name': 'Mapping Area Progress',
+                'verbose_name_plural': 'Mapping Area Progress',
+            },
+        ),
+        migrations.CreateModel(
+            name='MappingAreaUserProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geometries_with_entries', models.PositiveIntegerField(default=0)),
+                ('entries', models.PositiveIntegerField(default=0)),
+                ('required_filled', models.PositiveIntegerField(default=0)),
+                ('mapping_area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='datasets.mappingarea')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mapping_area_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Mapping Area User Progress',
+                'verbose_name_plural': 'Mapping Area User Progress',
+            },
+        ),
+        # Fill the tables for existing entries and mapping areas
+        migrations.RunSQL(
+            sql=[
+                "INSERT INTO datasets_entryprogress (entry_id, dataset_id, geometry_id, user_id, required_filled) "
+                "SELECT e.id, g.dataset_id, e.geometry_id, e.user_id, COUNT(df.id) "
+                "FROM datasets_dataentry e JOIN datasets_datageometry g ON g.id = e.geometry_id "
+                "LEFT JOIN datasets_dataentryfield f ON f.entry_id = e.id "
+                "AND BTRIM(COALESCE(f.value, '')) NOT IN ('', '[]') "
+                "LEFT JOIN datasets_datasetfield df ON df.dataset_id = g.dataset_id AND df.field_name = f.field_name "
+                "AND df.required AND df.enabled AND df.field_type <> 'headline' "
+                "GROUP BY e.id, g.dataset_id, e.geometry_id, e.user_id",
+
+                "INSERT INTO datasets_mappingareaprogress "
+                "(mapping_area_id, geometries_with_entries, entries, required_filled) "
+                "SELECT m.mapping_area_id, COUNT(DISTINCT p.geometry_id), COUNT(*), SUM(p.required_filled) "
+                "FROM datasets_mappingareamembership m "
+                "JOIN datasets_entryprogress p ON p.geometry_id = m.geometry_id "
+                "GROUP BY m.mapping_area_id",
+
+                "INSERT INTO datasets_mappingareauserprogress "
+                "(mapping_area_id, user_id, geometries_with_entries, entries, required_filled) "
+                "SELECT m.mapping_area_id, p.user_id, COUNT(DISTINCT p.geometry_id), COUNT(*), SUM(p.required_filled) "
+                "FROM datasets_mappingareamembership m "
+                "JOIN datasets_entryprogress p ON p.geometry_id = m.geometry_id "
+                "GROUP BY m.mapping_area_id, p.user_id",
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
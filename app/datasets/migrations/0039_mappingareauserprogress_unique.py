@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0038_progress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mappingareauserprogress',
+            name='user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mapping_area_progress', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='mappingareauserprogress',
+            constraint=models.UniqueConstraint(fields=('mapping_area', 'user'), name='mapping_area_user_progress_unique', nulls_distinct=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0039_mappingareauserprogress_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0, editable=False, help_text='Incremented whenever exported data changes'),
+        ),
+    ]
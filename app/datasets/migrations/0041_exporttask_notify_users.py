@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0040_dataset_revision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exporttask',
+            name='notify_users',
+            field=models.ManyToManyField(blank=True, related_name='notified_export_tasks', to=settings.AUTH_USER_MODEL),
+        ),
+        # Exports still running were started by users who expect an email
+        migrations.RunSQL(
+            sql="INSERT INTO datasets_exporttask_notify_users (exporttask_id, user_id) "
+                "SELECT id, user_id FROM datasets_exporttask "
+                "WHERE export_format = 'zip' AND status IN ('pending', 'processing')",
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0041_exporttask_notify_users'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exporttask',
+            name='export_format',
+            field=models.CharField(choices=[('zip', 'ZIP archive of files'), ('csv', 'CSV'), ('geojson', 'GeoJSON'), ('gpkg', 'GeoPackage')], default='zip', max_length=20),
+        ),
+    ]
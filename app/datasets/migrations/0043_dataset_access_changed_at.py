@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0042_alter_exporttask_export_format'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='access_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Last change of the mapping area restrictions of this dataset', null=True),
+        ),
+    ]
@@ -1,10 +1,8 @@
-import logging
-
 from django.contrib.auth.models import Group, User
 from django.contrib.gis.db import models as gis_models
 from django.contrib.gis.geos import GEOSException, Point
 from django.db import models
-from django.db.models import Q
+from django.utils import timezone
 
 class AuditLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
@@ -24,90 +22,44 @@ class DataSet(models.Model):
     shared_with_groups = models.ManyToManyField('auth.Group', related_name='shared_datasets', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    is_public = models.BooleanField(default=False)
+    is_public = models.BooleanField(default=False, db_index=True)
     allow_multiple_entries = models.BooleanField(default=False, help_text="Allow multiple data entries per geometry point")
     enable_mapping_areas = models.BooleanField(default=False, help_text="Enable mapping areas functionality for this dataset")
+    revision = models.PositiveBigIntegerField(default=0, editable=False, help_text="Incremented whenever exported data changes")
+    access_changed_at = models.DateTimeField(
+        null=True, blank=True, editable=False, help_text="Last change of the mapping area restrictions of this dataset"
+    )
 
     def __str__(self):
         return self.name
 
+    def get_access(self, user):
+        """Return a DatasetAccess describing the user's rights on this dataset"""
+        from .access import DatasetAccess
+        return DatasetAccess(self, user)
+
     def can_access(self, user):
         """Check if a user can access this dataset"""
-        # Superusers have access to all datasets
-        if user.is_superuser:
-            return True
-        if self.is_public:
-            return True
-        if user == self.owner:
-            return True
-        if user in self.shared_with.all():
-            return True
-        # Check if user is in any of the shared groups
-        if self.shared_with_groups.filter(user=user).exists():
-            return True
-        return False
+        return self.get_access(user).can_access
 
     def get_user_mapping_area_ids(self, user):
         """
         Return a list of mapping area IDs that restrict this user's access,
         or None if there are no restrictions (full dataset access).
         """
-        # Superusers and owners have full access (no restrictions)
-        if user.is_superuser or user == self.owner:
-            return None
-
-        if not self.mapping_areas.exists():
-            return None
-
-        direct_ids = list(
-            self.user_mapping_area_limits.filter(user=user).values_list('mapping_area_id', flat=True)
-        )
-
-        group_ids = list(user.groups.values_list('id', flat=True))
-        group_area_ids = list(
-            self.group_mapping_area_limits.filter(group_id__in=group_ids).values_list('mapping_area_id', flat=True)
-        ) if group_ids else []
-
-        combined = set(direct_ids) | set(group_area_ids)
-        return list(combined) if combined else None
+        return self.get_access(user).mapping_area_ids
 
     def filter_geometries_for_user(self, geometries_qs, user):
         """
         Apply mapping area restrictions to a geometry queryset for the given user.
         """
-        allowed_ids = self.get_user_mapping_area_ids(user)
-        if allowed_ids is None:
-            return geometries_qs
-
-        if not allowed_ids:
-            return geometries_qs.none()
-
-        allowed_areas = list(self.mapping_areas.filter(id__in=allowed_ids))
-        if not allowed_areas:
-            return geometries_qs.none()
-
-        condition = Q()
-        for area in allowed_areas:
-            condition |= Q(geometry__within=area.geometry)
-
-        if condition:
-            return geometries_qs.filter(condition)
-        return geometries_qs.none()
+        return self.get_access(user).filter_geometries(geometries_qs)
 
     def user_has_geometry_access(self, user, geometry_obj):
         """
         Check whether a user is allowed to access the given geometry, considering mapping area limits.
         """
-        allowed_ids = self.get_user_mapping_area_ids(user)
-        if allowed_ids is None:
-            return True
-        if not allowed_ids:
-            return False
-
-        return self.mapping_areas.filter(
-            id__in=allowed_ids,
-            geometry__covers=geometry_obj.geometry
-        ).exists()
+        return self.get_access(user).has_geometry_access(geometry_obj)
 
     class Meta:
         ordering = ['-created_at']
@@ -136,6 +88,27 @@ class DataGeometry(models.Model):
         ordering = ['-created_at']
         verbose_name_plural = "Data Geometries"
         unique_together = [['dataset', 'id_kurz']]
+        indexes = [
+            models.Index(fields=['dataset', 'updated_at'], name='datageometry_dataset_updated'),
+        ]
+
+
+class DataGeometryTombstone(models.Model):
+    """Record of a deleted geometry so map clients can sync deletions incrementally"""
+    dataset = models.ForeignKey(DataSet, on_delete=models.CASCADE, related_name='geometry_tombstones')
+    geometry_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Deleted geometry {self.geometry_id} ({self.deleted_at})"
+
+    class Meta:
+        ordering = ['-deleted_at']
+        verbose_name = "Data Geometry Tombstone"
+        verbose_name_plural = "Data Geometry Tombstones"
+        indexes = [
+            models.Index(fields=['dataset', 'deleted_at'], name='geomtombstone_dataset_deleted'),
+        ]
 
 
 class DataEntry(models.Model):
@@ -431,6 +404,12 @@ class ExportTask(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
     ]
+    FORMAT_CHOICES = [
+        ('zip', 'ZIP archive of files'),
+        ('csv', 'CSV'),
+        ('geojson', 'GeoJSON'),
+        ('gpkg', 'GeoPackage'),
+    ]
     
     dataset = models.ForeignKey(DataSet, on_delete=models.CASCADE, related_name='export_tasks')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_tasks')
@@ -448,6 +427,22 @@ class ExportTask(models.Model):
     date_to = models.DateField(null=True, blank=True)
     organize_by = models.CharField(max_length=20, default='geometry')
     include_metadata = models.BooleanField(default=True)
+    export_format = models.CharField(max_length=20, choices=FORMAT_CHOICES, default='zip')
+    export_options = models.JSONField(default=dict, blank=True)
+    # Format, options and dataset revision of tabular exports; completed
+    # tasks with the same key are served again instead of being regenerated
+    cache_key = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # Incremental ZIP exports contain only files added after the previous
+    # export of the same user and dataset; watermark_file_id is the highest
+    # DataEntryFile id covered by a completed ZIP export
+    incremental = models.BooleanField(default=False)
+    previous_export = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='next_exports'
+    )
+    watermark_file_id = models.BigIntegerField(null=True, blank=True)
+    # Users emailed when a ZIP export completes: the requester and everyone
+    # who asked for the same export while it was running
+    notify_users = models.ManyToManyField(User, blank=True, related_name='notified_export_tasks')
     
     def __str__(self):
         return f"Export Task {self.task_id} - {self.dataset.name}"
@@ -458,6 +453,97 @@ class ExportTask(models.Model):
         verbose_name_plural = "Export Tasks"
 
 
+class ImportTask(models.Model):
+    """Model to track background CSV import tasks"""
+    STATUS_CHOICES = [
+        ('uploaded', 'Uploaded'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    dataset = models.ForeignKey(DataSet, on_delete=models.CASCADE, related_name='import_tasks')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='import_tasks')
+    task_id = models.CharField(max_length=100, unique=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploaded')
+    file_path = models.CharField(max_length=500, help_text="Temporary path of the uploaded CSV file")
+    file_name = models.CharField(max_length=255, blank=True)
+    file_size = models.BigIntegerField(default=0)
+    delimiter = models.CharField(max_length=5, default=',')
+
+    # Import parameters
+    id_column = models.CharField(max_length=255, blank=True)
+    x_column = models.CharField(max_length=255, default='X')
+    y_column = models.CharField(max_length=255, default='Y')
+    srid = models.IntegerField(default=4326)
+    clear_existing = models.BooleanField(default=False)
+
+    # Progress
+    bytes_processed = models.BigIntegerField(default=0)
+    rows_processed = models.IntegerField(default=0)
+    rows_imported = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="First error messages of the import")
+    error_message = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Import Task {self.task_id} - {self.dataset.name}"
+
+    @property
+    def progress_percent(self):
+        """Share of the uploaded file that has been processed"""
+        if self.status == 'completed':
+            return 100
+        if not self.file_size:
+            return 0
+        return min(100, int(self.bytes_processed * 100 / self.file_size))
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Import Task"
+        verbose_name_plural = "Import Tasks"
+
+
+class Job(models.Model):
+    """Background job run by the workers of manage.py run_workers"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job {self.pk} - {self.kind} ({self.status})"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after'),
+        ]
+
+
 class MappingArea(models.Model):
     """Mapping area defined as a polygon on the map"""
     dataset = models.ForeignKey(DataSet, on_delete=models.CASCADE, related_name='mapping_areas')
@@ -472,24 +558,39 @@ class MappingArea(models.Model):
         return f"{self.name} ({self.dataset.name})"
     
     def get_point_count(self):
-        """Get the number of geometry points inside this polygon"""
-        if not self.geometry:
-            return 0
-        try:
-            return self.dataset.geometries.filter(geometry__within=self.geometry).count()
-        except Exception:  # pragma: no cover - defensive
-            logging.getLogger(__name__).exception(
-                "Failed to count geometries within mapping area %s (dataset %s)",
-                self.id,
-                self.dataset_id,
-            )
+        """Get the number of geometry points inside this polygon (including its boundary)"""
+        if not self.geometry or self.pk is None:
             return 0
+        from .membership import get_mapping_area_point_counts
+        return get_mapping_area_point_counts(self.dataset_id).get(self.pk, 0)
     
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Mapping Areas" 
 
 
+class MappingAreaMembership(models.Model):
+    """
+    Geometry lying inside a mapping area (point covered by the polygon).
+
+    Kept up to date by membership.py and the signal handlers, so access
+    checks join on ids instead of running spatial queries.
+    """
+    mapping_area = models.ForeignKey(MappingArea, on_delete=models.CASCADE, related_name='memberships')
+    geometry = models.ForeignKey(DataGeometry, on_delete=models.CASCADE, related_name='mapping_area_memberships')
+
+    def __str__(self):
+        return f"Geometry {self.geometry_id} in mapping area {self.mapping_area_id}"
+
+    class Meta:
+        unique_together = ('mapping_area', 'geometry')
+        verbose_name = "Mapping Area Membership"
+        verbose_name_plural = "Mapping Area Memberships"
+        indexes = [
+            models.Index(fields=['geometry', 'mapping_area'], name='areamember_geometry_area'),
+        ]
+
+
 class DatasetUserMappingArea(models.Model):
     """Limit a user's dataset access to specific mapping areas."""
     dataset = models.ForeignKey(
@@ -535,4 +636,86 @@ class DatasetGroupMappingArea(models.Model):
     class Meta:
         unique_together = ('dataset', 'group', 'mapping_area')
         verbose_name = "Dataset Group Mapping Area"
-        verbose_name_plural = "Dataset Group Mapping Areas"
\ No newline at end of file
+        verbose_name_plural = "Dataset Group Mapping Areas"
+
+
+class DatasetVisibility(models.Model):
+    """
+    User who can see a private dataset, as owner or through direct or group sharing.
+
+    Kept up to date by visibility.py and the signal handlers, so dataset
+    listings look up one indexed table instead of OR-ing ownership and
+    sharing joins. Public datasets are found through is_public.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='dataset_visibility')
+    dataset = models.ForeignKey(DataSet, on_delete=models.CASCADE, related_name='visibility')
+
+    def __str__(self):
+        return f"Dataset {self.dataset_id} visible to user {self.user_id}"
+
+    class Meta:
+        unique_together = ('user', 'dataset')
+        verbose_name = "Dataset Visibility"
+        verbose_name_plural = "Dataset Visibility"
+
+
+class EntryProgress(models.Model):
+    """
+    Number of required dataset fields an entry has a value for.
+
+    Kept up to date by progress.py when entries, their field values or the
+    dataset's required fields change, and aggregated per mapping area into
+    MappingAreaProgress and MappingAreaUserProgress.
+    """
+    entry = models.OneToOneField(DataEntry, on_delete=models.CASCADE, related_name='progress')
+    dataset = models.ForeignKey(DataSet, on_delete=models.CASCADE, related_name='entry_progress')
+    geometry = models.ForeignKey(DataGeometry, on_delete=models.CASCADE, related_name='entry_progress')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='entry_progress')
+    required_filled = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Entry {self.entry_id}: {self.required_filled} required values"
+
+    class Meta:
+        verbose_name = "Entry Progress"
+        verbose_name_plural = "Entry Progress"
+
+
+class MappingAreaProgress(models.Model):
+    """Points with entries, entries and filled required values inside a mapping area"""
+    mapping_area = models.OneToOneField(MappingArea, on_delete=models.CASCADE, related_name='progress')
+    geometries_with_entries = models.PositiveIntegerField(default=0)
+    entries = models.PositiveIntegerField(default=0)
+    required_filled = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Progress of mapping area {self.mapping_area_id}"
+
+    class Meta:
+        verbose_name = "Mapping Area Progress"
+        verbose_name_plural = "Mapping Area Progress"
+
+
+class MappingAreaUserProgress(models.Model):
+    """
+    Progress inside a mapping area counting only the entries of one user.
+    Entries without a user are counted in the row without a user.
+    """
+    mapping_area = models.ForeignKey(MappingArea, on_delete=models.CASCADE, related_name='user_progress')
+    # Deleting a user recomputes the areas, moving their entries to the row without a user
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='mapping_area_progress')
+    geometries_with_entries = models.PositiveIntegerField(default=0)
+    entries = models.PositiveIntegerField(default=0)
+    required_filled = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Progress of user {self.user_id} in mapping area {self.mapping_area_id}"
+
+    class Meta:
+        verbose_name = "Mapping Area User Progress"
+        verbose_name_plural = "Mapping Area User Progress"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['mapping_area', 'user'], nulls_distinct=False, name='mapping_area_user_progress_unique'
+            ),
+        ]
@@ -0,0 +1,383 @@
+"""
+Progress of data collection per mapping area and field worker.
+
+Coordinators follow how many points of each mapping area have at least one
+entry and how many of the dataset's required field values those entries
+fill, in total and per user. Reading these numbers from the entries on
+every request would scan all field values of a campaign, so they are kept
+in aggregate tables:
+
+* EntryProgress stores, per entry, how many required fields have a value.
+* MappingAreaProgress and MappingAreaUserProgress sum EntryProgress over
+  the points of a mapping area (via MappingAreaMembership).
+
+When entries or field values change, only the affected entries are
+recomputed and the difference is added to the totals of the mapping areas
+containing their points, so field workers saving entries in the same
+area do not wait for each other. Changes are applied once the
+surrounding transaction commits. Mapping areas are recomputed from their
+entries when points move between areas or are deleted; changing which
+fields are required, bulk imports and bulk deletions rebuild the whole
+dataset.
+"""
+
+import threading
+
+from django.db import connection, transaction
+
+from .membership import get_mapping_area_point_counts
+from .models import (
+    DataEntry,
+    DataEntryField,
+    DataGeometry,
+    DatasetField,
+    EntryProgress,
+    MappingArea,
+    MappingAreaMembership,
+    MappingAreaProgress,
+    MappingAreaUserProgress,
+)
+from .schema import get_dataset_schema
+
+
+def _tables():
+    return {
+        'entry_progress': EntryProgress._meta.db_table,
+        'area_progress': MappingAreaProgress._meta.db_table,
+        'user_progress': MappingAreaUserProgress._meta.db_table,
+        'membership': MappingAreaMembership._meta.db_table,
+        'area': MappingArea._meta.db_table,
+        'entry': DataEntry._meta.db_table,
+        'field': DataEntryField._meta.db_table,
+        'geometry': DataGeometry._meta.db_table,
+        'dataset_field': DatasetField._meta.db_table,
+    }
+
+
+def _insert_entry_progress(cursor, condition, params):
+    """
+    Recompute EntryProgress for the entries matching condition; returns
+    their (geometry_id, user_id, required_filled).
+    """
+    tables = _tables()
+    cursor.execute(
+        f"INSERT INTO {tables['entry_progress']} (entry_id, dataset_id, geometry_id, user_id, required_filled) "
+        f"SELECT e.id, g.dataset_id, e.geometry_id, e.user_id, COUNT(df.id) "
+        f"FROM {tables['entry']} e JOIN {tables['geometry']} g ON g.id = e.geometry_id "
+        f"LEFT JOIN {tables['field']} f ON f.entry_id = e.id AND BTRIM(COALESCE(f.value, '')) NOT IN ('', '[]') "
+        f"LEFT JOIN {tables['dataset_field']} df ON df.dataset_id = g.dataset_id AND df.field_name = f.field_name "
+        f"AND df.required AND df.enabled AND df.field_type <> 'headline' "
+        f"WHERE {condition} "
+        f"GROUP BY e.id, g.dataset_id, e.geometry_id, e.user_id "
+        f"ON CONFLICT (entry_id) DO UPDATE SET dataset_id = EXCLUDED.dataset_id, "
+        f"geometry_id = EXCLUDED.geometry_id, user_id = EXCLUDED.user_id, required_filled = EXCLUDED.required_filled "
+        f"RETURNING geometry_id, user_id, required_filled",
+        params
+    )
+    return cursor.fetchall()
+
+
+def refresh_mapping_area_progress(*mapping_area_ids):
+    """Recompute the progress totals of the given mapping areas."""
+    if not mapping_area_ids:
+        return
+    tables = _tables()
+    area_ids = sorted(mapping_area_ids)
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Waits for the changes being added to these areas (see _add_area_progress)
+        cursor.execute(f"SELECT id FROM {tables['area']} WHERE id = ANY(%s) ORDER BY id FOR UPDATE", [area_ids])
+        cursor.execute(f"DELETE FROM {tables['area_progress']} WHERE mapping_area_id = ANY(%s)", [area_ids])
+        cursor.execute(f"DELETE FROM {tables['user_progress']} WHERE mapping_area_id = ANY(%s)", [area_ids])
+        cursor.execute(
+            f"INSERT INTO {tables['area_progress']} "
+            f"(mapping_area_id, geometries_with_entries, entries, required_filled) "
+            f"SELECT m.mapping_area_id, COUNT(DISTINCT p.geometry_id), COUNT(*), SUM(p.required_filled) "
+            f"FROM {tables['membership']} m JOIN {tables['entry_progress']} p ON p.geometry_id = m.geometry_id "
+            f"WHERE m.mapping_area_id = ANY(%s) GROUP BY m.mapping_area_id",
+            [area_ids]
+        )
+        cursor.execute(
+            f"INSERT INTO {tables['user_progress']} "
+            f"(mapping_area_id, user_id, geometries_with_entries, entries, required_filled) "
+            f"SELECT m.mapping_area_id, p.user_id, COUNT(DISTINCT p.geometry_id), COUNT(*), SUM(p.required_filled) "
+            f"FROM {tables['membership']} m JOIN {tables['entry_progress']} p ON p.geometry_id = m.geometry_id "
+            f"WHERE m.mapping_area_id = ANY(%s) GROUP BY m.mapping_area_id, p.user_id",
+            [area_ids]
+        )
+
+
+def _add_area_progress(cursor, area_changes, user_changes):
+    """
+    Add changes to the progress totals of mapping areas.
+
+    area_changes maps mapping area ids and user_changes (mapping area id,
+    user id) pairs to (geometries_with_entries, entries, required_filled)
+    differences.
+    """
+    tables = _tables()
+    area_ids = sorted(set(area_changes) | {area_id for area_id, _ in user_changes})
+    # Changes are added concurrently, only full recomputes lock the areas exclusively
+    cursor.execute(f"SELECT id FROM {tables['area']} WHERE id = ANY(%s) ORDER BY id FOR SHARE", [area_ids])
+
+    areas = sorted(area_changes)
+    cursor.execute(
+        f"INSERT INTO {tables['area_progress']} (mapping_area_id, geometries_with_entries, entries, required_filled) "
+        f"SELECT id, 0, 0, 0 FROM UNNEST(%s::bigint[]) AS id ON CONFLICT (mapping_area_id) DO NOTHING",
+        [areas]
+    )
+    cursor.execute(
+        f"UPDATE {tables['area_progress']} p SET geometries_with_entries = p.geometries_with_entries + d.points, "
+        f"entries = p.entries + d.entries, required_filled = p.required_filled + d.required_filled "
+        f"FROM UNNEST(%s::bigint[], %s::integer[], %s::integer[], %s::integer[]) "
+        f"AS d(mapping_area_id, points, entries, required_filled) WHERE p.mapping_area_id = d.mapping_area_id",
+        [areas] + [[area_changes[area_id][index] for area_id in areas] for index in range(3)]
+    )
+
+    keys = sorted(user_changes, key=lambda key: (key[0], key[1] is None, key[1] or 0))
+    user_params = [[key[0] for key in keys], [key[1] for key in keys]]
+    cursor.execute(
+        f"INSERT INTO {tables['user_progress']} "
+        f"(mapping_area_id, user_id, geometries_with_entries, entries, required_filled) "
+        f"SELECT area_id, user_id, 0, 0, 0 FROM UNNEST(%s::bigint[], %s::integer[]) AS d(area_id, user_id) "
+        f"ON CONFLICT (mapping_area_id, user_id) DO NOTHING",
+        user_params
+    )
+    cursor.execute(
+        f"UPDATE {tables['user_progress']} p SET geometries_with_entries = p.geometries_with_entries + d.points, "
+        f"entries = p.entries + d.entries, required_filled = p.required_filled + d.required_filled "
+        f"FROM UNNEST(%s::bigint[], %s::integer[], %s::integer[], %s::integer[], %s::integer[]) "
+        f"AS d(mapping_area_id, user_id, points, entries, required_filled) "
+        f"WHERE p.mapping_area_id = d.mapping_area_id AND p.user_id IS NOT DISTINCT FROM d.user_id",
+        user_params + [[user_changes[key][index] for key in keys] for index in range(3)]
+    )
+    cursor.execute(
+        f"DELETE FROM {tables['user_progress']} WHERE mapping_area_id = ANY(%s) AND entries = 0", [area_ids]
+    )
+
+
+def _point_change(entries, added):
+    """1 if a point (or a user's part of it) got its first entry, -1 if it lost its last one"""
+    return (entries > 0) - (entries - added > 0)
+
+
+def refresh_entry_progress(entry_ids, removed=()):
+    """
+    Recompute the progress of the given entries and add the difference to
+    the mapping areas containing their points.
+
+    removed holds the (dataset_id, geometry_id, user_id, required_filled)
+    progress of deleted entries, whose rows were deleted with them.
+    """
+    tables = _tables()
+    entry_ids = sorted(set(entry_ids))
+    # (geometry_id, user_id) -> [entries, required_filled] added
+    changes = {}
+
+    def add(geometry_id, user_id, entries, required_filled):
+        change = changes.setdefault((geometry_id, user_id), [0, 0])
+        change[0] += entries
+        change[1] += required_filled
+
+    for _, geometry_id, user_id, required_filled in removed:
+        add(geometry_id, user_id, -1, -required_filled)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Updates of the same point are serialised, so a point gaining its
+        # first or losing its last entry is counted exactly once
+        cursor.execute(
+            f"SELECT id FROM {tables['geometry']} WHERE id = ANY(%s) OR id IN ("
+            f"SELECT geometry_id FROM {tables['entry']} WHERE id = ANY(%s) UNION "
+            f"SELECT geometry_id FROM {tables['entry_progress']} WHERE entry_id = ANY(%s)"
+            f") ORDER BY id FOR NO KEY UPDATE",
+            [sorted({geometry_id for geometry_id, _ in changes}), entry_ids, entry_ids]
+        )
+        if entry_ids:
+            cursor.execute(
+                f"DELETE FROM {tables['entry_progress']} WHERE entry_id = ANY(%s) "
+                f"RETURNING geometry_id, user_id, required_filled",
+                [entry_ids]
+            )
+            for geometry_id, user_id, required_filled in cursor.fetchall():
+                add(geometry_id, user_id, -1, -required_filled)
+            for geometry_id, user_id, required_filled in _insert_entry_progress(cursor, 'e.id = ANY(%s)', [entry_ids]):
+                add(geometry_id, user_id, 1, required_filled)
+
+        changes = {key: change for key, change in changes.items() if change != [0, 0]}
+        if not changes:
+            return
+        geometry_ids = sorted({geometry_id for geometry_id, _ in changes})
+        cursor.execute(
+            f"SELECT geometry_id, mapping_area_id FROM {tables['membership']} WHERE geometry_id = ANY(%s)",
+            [geometry_ids]
+        )
+        areas_by_geometry = {}
+        for geometry_id, area_id in cursor.fetchall():
+            areas_by_geometry.setdefault(geometry_id, []).append(area_id)
+        if not areas_by_geometry:
+            return
+        cursor.execute(
+            f"SELECT geometry_id, user_id, COUNT(*) FROM {tables['entry_progress']} "
+            f"WHERE geometry_id = ANY(%s) GROUP BY geometry_id, user_id",
+            [sorted(areas_by_geometry)]
+        )
+        entry_counts = {}
+        point_counts = {}
+        for geometry_id, user_id, count in cursor.fetchall():
+            entry_counts[(geometry_id, user_id)] = count
+            point_counts[geometry_id] = point_counts.get(geometry_id, 0) + count
+
+        # Sum the changes per point and user into changes per mapping area and user
+        area_changes = {}
+        user_changes = {}
+        point_totals = {}
+        for (geometry_id, user_id), (entries, required_filled) in changes.items():
+            totals = point_totals.setdefault(geometry_id, [0, 0])
+            totals[0] += entries
+            totals[1] += required_filled
+            point = _point_change(entry_counts.get((geometry_id, user_id), 0), entries)
+            for area_id in areas_by_geometry.get(geometry_id, ()):
+                total = user_changes.setdefault((area_id, user_id), [0, 0, 0])
+                total[0] += point
+                total[1] += entries
+                total[2] += required_filled
+        for geometry_id, (entries, required_filled) in point_totals.items():
+            point = _point_change(point_counts.get(geometry_id, 0), entries)
+            for area_id in areas_by_geometry.get(geometry_id, ()):
+                total = area_changes.setdefault(area_id, [0, 0, 0])
+                total[0] += point
+                total[1] += entries
+                total[2] += required_filled
+        _add_area_progress(cursor, area_changes, user_changes)
+
+
+def rebuild_dataset_progress(dataset_id):
+    """Recompute the progress of all entries and mapping areas of a dataset."""
+    tables = _tables()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tables['entry_progress']} WHERE dataset_id = %s", [dataset_id])
+        _insert_entry_progress(cursor, 'g.dataset_id = %s', [dataset_id])
+    refresh_mapping_area_progress(*MappingArea.objects.filter(dataset_id=dataset_id).values_list('pk', flat=True))
+
+
+_pending = threading.local()
+
+
+def progress_changed(datasets=(), entries=(), removed=(), geometries=(), mapping_areas=()):
+    """
+    Update progress once the current transaction commits.
+
+    datasets are rebuilt completely. The differences caused by written
+    entries and by removed entries (see refresh_entry_progress) are added to
+    the totals of their mapping areas. Mapping areas, including those
+    covering the given geometries, are recomputed from their entries, which
+    is needed when points move between areas.
+
+    Changes are collected per thread and applied by the first commit
+    callback, so bulk writes update each mapping area once instead of once
+    per entry. Changes left over by a rolled back transaction are applied
+    with the next commit.
+    """
+    changes = getattr(_pending, 'changes', None)
+    if changes is None:
+        changes = _pending.changes = {
+            'datasets': set(), 'entries': set(), 'removed': [], 'geometries': set(), 'mapping_areas': set(),
+        }
+    changes['datasets'].update(datasets)
+    changes['entries'].update(entries)
+    changes['removed'].extend(removed)
+    changes['geometries'].update(geometries)
+    changes['mapping_areas'].update(mapping_areas)
+    transaction.on_commit(flush_progress)
+
+
+def flush_progress():
+    """Apply the changes collected by progress_changed()."""
+    changes = getattr(_pending, 'changes', None)
+    _pending.changes = None
+    if not changes:
+        return
+    for dataset_id in sorted(changes['datasets']):
+        rebuild_dataset_progress(dataset_id)
+    # Rebuilt datasets no longer count their removed entries
+    removed = [row for row in changes['removed'] if row[0] not in changes['datasets']]
+    if changes['entries'] or removed:
+        refresh_entry_progress(changes['entries'], removed)
+    mapping_areas = set(changes['mapping_areas'])
+    if changes['geometries']:
+        mapping_areas.update(
+            MappingAreaMembership.objects.filter(geometry_id__in=changes['geometries'])
+            .values_list('mapping_area_id', flat=True)
+        )
+    refresh_mapping_area_progress(*mapping_areas)
+
+
+def _completeness(required_filled, entries, required_fields):
+    """Share of required values filled in percent, or None without required fields or entries"""
+    expected = entries * required_fields
+    return round(100 * required_filled / expected, 1) if expected else None
+
+
+def _progress_row(row, required_fields, point_count=None):
+    data = {
+        'geometries_with_entries': row.get('geometries_with_entries') or 0,
+        'entries': row.get('entries') or 0,
+        'required_filled': row.get('required_filled') or 0,
+    }
+    data['completeness'] = _completeness(data['required_filled'], data['entries'], required_fields)
+    if point_count is not None:
+        data['point_count'] = point_count
+        data['coverage'] = (
+            round(100 * data['geometries_with_entries'] / point_count, 1) if point_count else None
+        )
+    return data
+
+
+def get_dataset_progress(dataset):
+    """
+    Progress of every mapping area of a dataset, in total and per user.
+
+    Reads the aggregate tables only: one query for the areas, one for the
+    users, plus the cached point counts and field schema.
+    """
+    schema = get_dataset_schema(dataset)
+    required_fields = sum(
+        1 for field in schema.fields
+        if field.required and field.enabled and field.field_type != 'headline'
+    )
+    point_counts = get_mapping_area_point_counts(dataset)
+
+    users_by_area = {}
+    user_rows = (
+        MappingAreaUserProgress.objects.filter(mapping_area__dataset=dataset)
+        .values('mapping_area_id', 'user_id', 'user__username', 'geometries_with_entries', 'entries', 'required_filled')
+    )
+    for row in user_rows:
+        users = users_by_area.setdefault(row['mapping_area_id'], {})
+        totals = users.setdefault(row['user_id'], {
+            'user_id': row['user_id'], 'username': row['user__username'],
+            'geometries_with_entries': 0, 'entries': 0, 'required_filled': 0,
+        })
+        for key in ('geometries_with_entries', 'entries', 'required_filled'):
+            totals[key] += row[key]
+
+    areas = []
+    area_rows = (
+        MappingArea.objects.filter(dataset=dataset).order_by('name', 'pk')
+        .values('id', 'name', 'progress__geometries_with_entries', 'progress__entries', 'progress__required_filled')
+    )
+    for row in area_rows:
+        area = {'id': row['id'], 'name': row['name']}
+        area.update(_progress_row(
+            {key: row[f'progress__{key}'] for key in ('geometries_with_entries', 'entries', 'required_filled')},
+            required_fields,
+            point_counts.get(row['id'], 0),
+        ))
+        area['users'] = [
+            {'user_id': user['user_id'], 'username': user['username'] or 'Unknown', **_progress_row(user, required_fields)}
+            for user in sorted(
+                users_by_area.get(row['id'], {}).values(), key=lambda user: (user['username'] is None, user['username'] or '')
+            )
+        ]
+        areas.append(area)
+
+    return {'required_fields': required_fields, 'mapping_areas': areas}
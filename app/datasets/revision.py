@@ -0,0 +1,63 @@
+"""
+Revision counters of datasets.
+
+Cached exports are keyed by a dataset's revision. The counter is bumped
+through the signal handlers in signals.py whenever something that appears
+in an export changes (points, entries, field values, field configuration,
+mapping areas and the usernames of point creators), and explicitly by code
+that writes with update(), bulk_create() or raw SQL.
+"""
+
+import threading
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import DataEntry, DataGeometry, DataSet
+
+_pending = threading.local()
+
+
+def bump_dataset_revision(datasets=(), geometries=(), entries=()):
+    """
+    Bump the revision of datasets, and of the datasets the given geometries
+    and entries belong to, once the current transaction commits.
+
+    Changes are collected per thread and written by the first commit
+    callback, so a transaction bumps each dataset once and editors of the
+    same dataset do not queue on its row while their transactions run.
+    Changes left over by a rolled back transaction are applied with the
+    next commit.
+    """
+    changes = getattr(_pending, 'changes', None)
+    if changes is None:
+        changes = _pending.changes = {'datasets': set(), 'geometries': set(), 'entries': set()}
+    changes['datasets'].update(datasets)
+    changes['geometries'].update(geometries)
+    changes['entries'].update(entries)
+    transaction.on_commit(flush_revisions)
+
+
+def flush_revisions():
+    """Write the revision bumps collected by bump_dataset_revision()."""
+    changes = getattr(_pending, 'changes', None)
+    _pending.changes = None
+    if not changes:
+        return
+    condition = Q(pk__in=changes['datasets'])
+    if changes['geometries']:
+        condition |= Q(pk__in=DataGeometry.objects.filter(pk__in=changes['geometries']).values('dataset_id'))
+    if changes['entries']:
+        condition |= Q(pk__in=DataEntry.objects.filter(pk__in=changes['entries']).values('geometry__dataset_id'))
+    DataSet.objects.filter(condition).update(revision=F('revision') + 1)
+
+
+def get_dataset_revision(dataset):
+    """
+    Current revision of a dataset, read from the database.
+
+    updated_at is included because saving a stale DataSet instance writes
+    back the revision it was loaded with.
+    """
+    revision, updated_at = DataSet.objects.filter(pk=dataset.pk).values_list('revision', 'updated_at').get()
+    return f'{revision}:{updated_at.isoformat()}'
@@ -0,0 +1,166 @@
+"""
+Cached field schema of a dataset.
+
+The DatasetField rows of a dataset, together with their resolved choice
+sets, are compiled into an immutable DatasetSchema and stored in Django's
+cache framework. Signal handlers in signals.py invalidate the cached
+schema when fields, typologies or typology entries change.
+"""
+
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import DatasetField, TypologyEntry
+
+
+@dataclass(frozen=True)
+class FieldSchema:
+    """Immutable snapshot of a DatasetField with its resolved choices"""
+    id: int
+    field_name: str
+    label: str
+    field_type: str
+    required: bool
+    enabled: bool
+    non_editable: bool
+    help_text: str
+    choices: str
+    order: int
+    typology_id: Optional[int]
+    typology_category: str
+    choices_list: tuple = ()
+
+    @cached_property
+    def choice_values(self):
+        """Set of valid stored values for choice and multiple_choice fields"""
+        return frozenset(
+            str(option['value'] if isinstance(option, dict) else option)
+            for option in self.choices_list
+        )
+
+    def as_dict(self):
+        """Field description as used by the data input JavaScript"""
+        return {
+            'id': self.id,
+            'name': self.label,  # Use label for display
+            'label': self.label,
+            'field_type': self.field_type,
+            'field_name': self.field_name,
+            'required': self.required,
+            'enabled': self.enabled,
+            'non_editable': self.non_editable,
+            'help_text': self.help_text,
+            'choices': self.choices,
+            'order': self.order,
+            'typology_choices': [dict(option) if isinstance(option, dict) else option for option in self.choices_list],
+            'typology_category': self.typology_category,
+        }
+
+
+@dataclass(frozen=True)
+class DatasetSchema:
+    """All fields of a dataset in display order"""
+    dataset_id: int
+    fields: tuple
+    _by_name: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, '_by_name', {f.field_name: f for f in self.fields})
+
+    def __contains__(self, field_name):
+        return field_name in self._by_name
+
+    def get(self, field_name):
+        """Return the FieldSchema for a field name, or None"""
+        return self._by_name.get(field_name)
+
+    def field_type(self, field_name, default='text'):
+        """Configured type of a field, falling back to text for unknown fields"""
+        field_schema = self._by_name.get(field_name)
+        return field_schema.field_type if field_schema else default
+
+    @property
+    def enabled_fields(self):
+        return tuple(f for f in self.fields if f.enabled)
+
+    @property
+    def enabled_field_names(self):
+        return [f.field_name for f in self.fields if f.enabled]
+
+
+def _schema_cache_key(dataset_id):
+    return f'datasets:schema:{dataset_id}'
+
+
+def _build_dataset_schema(dataset_id):
+    # Same ordering as DatasetField.order_fields(): negative order values go last
+    dataset_fields = sorted(
+        DatasetField.objects.filter(dataset_id=dataset_id),
+        key=lambda f: (999999 if f.order < 0 else f.order, f.field_name),
+    )
+
+    # Resolve typology choices of all fields with a single query
+    typology_ids = {f.typology_id for f in dataset_fields if f.typology_id}
+    typology_entries = {}
+    if typology_ids:
+        for entry in TypologyEntry.objects.filter(typology_id__in=typology_ids).order_by('code'):
+            typology_entries.setdefault(entry.typology_id, []).append(entry)
+
+    fields = []
+    for dataset_field in dataset_fields:
+        # Mirrors DatasetField.get_choices_list()
+        if dataset_field.typology_id:
+            choices_list = tuple(
+                {'value': str(entry.code), 'label': f"{entry.code} - {entry.name}"}
+                for entry in typology_entries.get(dataset_field.typology_id, [])
+                if not dataset_field.typology_category or entry.category == dataset_field.typology_category
+            )
+        elif dataset_field.field_type in ('choice', 'multiple_choice') and dataset_field.choices:
+            choices_list = tuple(
+                choice.strip() for choice in dataset_field.choices.split(',') if choice.strip()
+            )
+        else:
+            choices_list = ()
+
+        fields.append(FieldSchema(
+            id=dataset_field.id,
+            field_name=dataset_field.field_name,
+            label=dataset_field.label,
+            field_type=dataset_field.field_type,
+            required=dataset_field.required,
+            enabled=dataset_field.enabled,
+            non_editable=dataset_field.non_editable,
+            help_text=dataset_field.help_text or '',
+            choices=dataset_field.choices or '',
+            order=dataset_field.order,
+            typology_id=dataset_field.typology_id,
+            typology_category=dataset_field.typology_category or '',
+            choices_list=choices_list,
+        ))
+
+    return DatasetSchema(dataset_id=dataset_id, fields=tuple(fields))
+
+
+def get_dataset_schema(dataset):
+    """Return the cached DatasetSchema for a dataset (instance or id)"""
+    dataset_id = getattr(dataset, 'pk', dataset)
+    key = _schema_cache_key(dataset_id)
+    schema = cache.get(key)
+    if schema is None:
+        schema = _build_dataset_schema(dataset_id)
+        cache.set(key, schema, settings.DATASET_SCHEMA_CACHE_TIMEOUT)
+    return schema
+
+
+def invalidate_dataset_schema(*dataset_ids):
+    """Drop the cached schema of the given datasets"""
+    keys = [_schema_cache_key(dataset_id) for dataset_id in dataset_ids]
+    cache.delete_many(keys)
+    # A concurrent request may have cached the old rows before the change
+    # was committed, so drop the entries again once it is visible
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,317 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .access import mapping_access_changed
+from .bulk_delete import in_bulk_delete
+from .file_stats import invalidate_dataset_file_statistics
+from .membership import (
+    invalidate_mapping_area_point_counts, refresh_geometry_membership, refresh_mapping_area_membership,
+)
+from .models import (
+    DataEntry, DataEntryField, DataEntryFile, DataGeometry, DataGeometryTombstone, DataSet, DatasetField,
+    DatasetGroupMappingArea, DatasetUserMappingArea, EntryProgress, MappingArea, MappingAreaUserProgress, Typology,
+    TypologyEntry,
+)
+from .progress import progress_changed
+from .revision import bump_dataset_revision
+from .schema import invalidate_dataset_schema
+from .visibility import refresh_dataset_visibility, refresh_user_visibility
+
+
+@receiver(post_delete, sender=DataGeometry)
+def record_geometry_tombstone(sender, instance, **kwargs):
+    """Keep track of deleted geometries for incremental map data sync (bulk deletions write their own)."""
+    if not in_bulk_delete():
+        DataGeometryTombstone.objects.create(dataset_id=instance.dataset_id, geometry_id=instance.pk)
+
+
+@receiver(post_delete, sender=DataSet)
+def remove_dataset_tombstones(sender, instance, **kwargs):
+    """Drop tombstones written while a dataset's geometries were cascade-deleted."""
+    DataGeometryTombstone.objects.filter(dataset_id=instance.pk).delete()
+
+
+def _invalidate_typology_schemas(typology_id):
+    dataset_ids = set(
+        DatasetField.objects.filter(typology_id=typology_id).values_list('dataset_id', flat=True)
+    )
+    if dataset_ids:
+        invalidate_dataset_schema(*dataset_ids)
+
+
+@receiver(post_save, sender=DatasetField)
+@receiver(post_delete, sender=DatasetField)
+def invalidate_field_schema(sender, instance, **kwargs):
+    """Drop the cached schema of the dataset a field belongs to."""
+    invalidate_dataset_schema(instance.dataset_id)
+
+
+@receiver(post_save, sender=Typology)
+@receiver(pre_delete, sender=Typology)
+def invalidate_typology_schema(sender, instance, **kwargs):
+    """Drop cached schemas using a typology (before deletion unlinks the fields)."""
+    _invalidate_typology_schemas(instance.pk)
+
+
+@receiver(post_save, sender=TypologyEntry)
+@receiver(post_delete, sender=TypologyEntry)
+def invalidate_typology_entry_schema(sender, instance, **kwargs):
+    """Drop cached schemas whose choices come from the entry's typology."""
+    _invalidate_typology_schemas(instance.typology_id)
+
+
+@receiver(post_save, sender=DataEntryFile)
+@receiver(post_delete, sender=DataEntryFile)
+def invalidate_file_statistics(sender, instance, **kwargs):
+    """Drop the cached file statistics of the dataset a file belongs to."""
+    if in_bulk_delete():
+        return
+    dataset_id = DataEntry.objects.filter(pk=instance.entry_id).values_list('geometry__dataset_id', flat=True).first()
+    if dataset_id is not None:
+        invalidate_dataset_file_statistics(dataset_id)
+
+
+def _geometry_changed(created, update_fields):
+    return created or update_fields is None or 'geometry' in update_fields
+
+
+@receiver(post_save, sender=DataGeometry)
+def refresh_geometry_mapping_areas(sender, instance, created, update_fields=None, **kwargs):
+    """Record which mapping areas cover a new or moved point."""
+    if _geometry_changed(created, update_fields):
+        if not created:
+            # Mapping areas the point leaves lose the progress of its entries
+            progress_changed(
+                geometries=[instance.pk],
+                mapping_areas=list(instance.mapping_area_memberships.values_list('mapping_area_id', flat=True)),
+            )
+        refresh_geometry_membership(instance.pk)
+        invalidate_mapping_area_point_counts(instance.dataset_id)
+
+
+@receiver(post_save, sender=MappingArea)
+def refresh_mapping_area_geometries(sender, instance, created, update_fields=None, **kwargs):
+    """Record which points a new or reshaped mapping area covers."""
+    if _geometry_changed(created, update_fields):
+        refresh_mapping_area_membership(instance.pk)
+        invalidate_mapping_area_point_counts(instance.dataset_id)
+        progress_changed(mapping_areas=[instance.pk])
+        mapping_access_changed([instance.dataset_id])
+
+
+@receiver(post_delete, sender=DataGeometry)
+@receiver(post_delete, sender=MappingArea)
+def invalidate_deleted_point_counts(sender, instance, **kwargs):
+    """Drop the cached point counts of the dataset a point or mapping area left."""
+    if not in_bulk_delete():
+        invalidate_mapping_area_point_counts(instance.dataset_id)
+
+
+@receiver(pre_delete, sender=DataGeometry)
+def refresh_deleted_geometry_progress(sender, instance, **kwargs):
+    """Recompute the mapping areas of a point before deletion unlinks them."""
+    if not in_bulk_delete():
+        progress_changed(
+            mapping_areas=list(instance.mapping_area_memberships.values_list('mapping_area_id', flat=True))
+        )
+
+
+@receiver(post_save, sender=DataSet)
+def refresh_owner_visibility(sender, instance, created, update_fields=None, **kwargs):
+    """List a new dataset for its owner and follow ownership transfers."""
+    if created or update_fields is None or 'owner' in update_fields:
+        refresh_dataset_visibility(instance.pk)
+
+
+_M2M_CHANGES = ('post_add', 'post_remove', 'post_clear')
+
+
+@receiver(m2m_changed, sender=DataSet.shared_with.through)
+def refresh_shared_user_visibility(sender, instance, action, reverse, pk_set, **kwargs):
+    """Follow datasets being shared with or withdrawn from users."""
+    if action not in _M2M_CHANGES:
+        return
+    if reverse:
+        refresh_user_visibility(instance.pk)
+    else:
+        refresh_dataset_visibility(instance.pk)
+
+
+@receiver(m2m_changed, sender=DataSet.shared_with_groups.through)
+def refresh_shared_group_visibility(sender, instance, action, reverse, pk_set, **kwargs):
+    """Follow datasets being shared with or withdrawn from groups."""
+    if action not in _M2M_CHANGES:
+        return
+    if reverse:
+        refresh_user_visibility(*instance.user_set.values_list('pk', flat=True))
+    else:
+        refresh_dataset_visibility(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def refresh_group_member_visibility(sender, instance, action, reverse, pk_set, **kwargs):
+    """Follow users joining or leaving groups that datasets are shared with."""
+    if action not in _M2M_CHANGES:
+        return
+    if not reverse:
+        refresh_user_visibility(instance.pk)
+    elif pk_set:
+        refresh_user_visibility(*pk_set)
+    elif action == 'post_clear':
+        # The former members are gone, recompute the group's datasets instead
+        refresh_dataset_visibility(*instance.shared_datasets.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_datasets(sender, instance, **kwargs):
+    """Note the datasets shared with a group before deletion unlinks them."""
+    instance._visibility_dataset_ids = list(instance.shared_datasets.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def refresh_deleted_group_visibility(sender, instance, **kwargs):
+    """Recompute the datasets a deleted group gave access to."""
+    refresh_dataset_visibility(*getattr(instance, '_visibility_dataset_ids', []))
+
+
+@receiver(post_save, sender=DataEntry)
+def refresh_saved_entry_progress(sender, instance, **kwargs):
+    """Count a new entry, or one moved to another point or user, in the progress tables."""
+    progress_changed(entries=[instance.pk])
+
+
+@receiver(pre_delete, sender=DataEntry)
+def refresh_deleted_entry_progress(sender, instance, **kwargs):
+    """Remove an entry from the progress of its mapping areas before its progress row is deleted with it."""
+    if in_bulk_delete():
+        return
+    progress = EntryProgress.objects.filter(entry_id=instance.pk).values_list(
+        'dataset_id', 'geometry_id', 'user_id', 'required_filled'
+    ).first()
+    if progress is not None:
+        progress_changed(removed=[progress])
+
+
+# Field values are only deleted together with their entry, whose receiver
+# updates the progress. A post_delete receiver would make the collector load
+# every value of a deleted dataset or point.
+@receiver(post_save, sender=DataEntryField)
+def refresh_entry_field_progress(sender, instance, **kwargs):
+    """Recount the required values of the entry a value belongs to."""
+    progress_changed(entries=[instance.entry_id])
+
+
+_PROGRESS_FIELD_ATTRS = ('field_name', 'required', 'enabled', 'field_type')
+
+
+def _progress_field_state(field):
+    return tuple(getattr(field, attr) for attr in _PROGRESS_FIELD_ATTRS)
+
+
+@receiver(post_init, sender=DatasetField)
+def remember_progress_field_state(sender, instance, **kwargs):
+    """Note what decides whether a field counts as required, to detect changes on save."""
+    instance._progress_state = _progress_field_state(instance)
+
+
+@receiver(post_save, sender=DatasetField)
+def rebuild_field_progress(sender, instance, created, **kwargs):
+    """Recount required values of the dataset when the set of required fields changes."""
+    state = _progress_field_state(instance)
+    if (instance.required if created else state != instance._progress_state):
+        progress_changed(datasets=[instance.dataset_id])
+    instance._progress_state = state
+
+
+@receiver(post_delete, sender=DatasetField)
+def rebuild_deleted_field_progress(sender, instance, **kwargs):
+    """Recount required values of the dataset after a required field is removed."""
+    if instance.required:
+        progress_changed(datasets=[instance.dataset_id])
+
+
+@receiver(pre_delete, sender=User)
+def refresh_deleted_user_progress(sender, instance, **kwargs):
+    """Recompute the mapping areas a deleted user's entries are counted in, moving them to the row without a user."""
+    progress_changed(
+        mapping_areas=list(
+            MappingAreaUserProgress.objects.filter(user=instance).values_list('mapping_area_id', flat=True)
+        )
+    )
+
+
+@receiver(post_save, sender=DataGeometry)
+@receiver(post_delete, sender=DataGeometry)
+@receiver(post_save, sender=DatasetField)
+@receiver(post_delete, sender=DatasetField)
+@receiver(post_save, sender=MappingArea)
+@receiver(post_delete, sender=MappingArea)
+def bump_revision(sender, instance, **kwargs):
+    """Bump the revision of the dataset a point, field or mapping area belongs to."""
+    if not in_bulk_delete():
+        bump_dataset_revision([instance.dataset_id])
+
+
+@receiver(post_save, sender=DataEntry)
+@receiver(post_delete, sender=DataEntry)
+def bump_entry_revision(sender, instance, **kwargs):
+    """Bump the revision of the dataset an entry belongs to."""
+    if not in_bulk_delete():
+        bump_dataset_revision(geometries=[instance.geometry_id])
+
+
+# Field values are only deleted together with their entry, whose receiver
+# bumps the revision
+@receiver(post_save, sender=DataEntryField)
+def bump_entry_field_revision(sender, instance, **kwargs):
+    """Bump the revision of the dataset a field value belongs to."""
+    bump_dataset_revision(entries=[instance.entry_id])
+
+
+def _bump_user_revisions(user_id):
+    # Exports show the username of each point's creator
+    bump_dataset_revision(
+        DataGeometry.objects.filter(user_id=user_id).order_by().values_list('dataset_id', flat=True).distinct()
+    )
+
+
+@receiver(pre_save, sender=User)
+def bump_renamed_user_revision(sender, instance, update_fields=None, **kwargs):
+    """Bump the revision of datasets whose exports show a renamed user."""
+    if instance.pk is None or (update_fields is not None and 'username' not in update_fields):
+        return
+    username = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+    if username is not None and username != instance.username:
+        _bump_user_revisions(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def bump_deleted_user_revision(sender, instance, **kwargs):
+    """Bump the revision of datasets whose exports show a deleted user, before their points are unlinked."""
+    _bump_user_revisions(instance.pk)
+
+
+@receiver(post_save, sender=DatasetUserMappingArea)
+@receiver(post_delete, sender=DatasetUserMappingArea)
+@receiver(post_save, sender=DatasetGroupMappingArea)
+@receiver(post_delete, sender=DatasetGroupMappingArea)
+@receiver(post_delete, sender=MappingArea)
+def record_mapping_access_change(sender, instance, **kwargs):
+    """Make map clients reload a dataset whose mapping area restrictions changed."""
+    if not in_bulk_delete():
+        mapping_access_changed([instance.dataset_id])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def record_group_member_access_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Users joining or leaving a group gain or lose the group's mapping areas."""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        group_ids = [instance.pk]
+    elif action == 'pre_clear':
+        group_ids = instance.groups.values('pk')
+    else:
+        group_ids = pk_set
+    mapping_access_changed(DatasetGroupMappingArea.objects.filter(group_id__in=group_ids).values('dataset_id'))
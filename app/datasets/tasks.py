@@ -1,27 +1,50 @@
 """
-Background tasks for file export operations.
+Background tasks for file export and CSV import operations.
 
-This module handles asynchronous ZIP file generation and email notifications.
+This module handles asynchronous ZIP file generation, email notifications,
+cached tabular dataset exports and chunked CSV imports. Background work is
+queued as jobs (see jobs.py) and run by ``manage.py run_workers``.
 """
 
 import os
+import csv
+import mimetypes
+import shutil
 import zipfile
 import uuid
 import json
-from datetime import datetime
+import logging
+from datetime import datetime, timedelta
 from pathlib import Path
 from django.conf import settings
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
-from django.db import transaction
+from django.db import DataError, IntegrityError, transaction
 from django.core.files.storage import default_storage
 from django.contrib.auth.models import User
+from django.db.models import Max
 
-from .models import DataSet, DataEntryFile, ExportTask
+from django.utils import timezone
+
+from .models import (
+    DataSet, DataEntryFile, ExportTask, ImportTask,
+    DataGeometry, DatasetField,
+)
+from .bulk_import import import_rows as bulk_import_rows
+from .exports import EXPORT_FORMATS
+from .file_stats import calculate_file_statistics
+from .bulk_delete import delete_dataset_geometries
+from .jobs import enqueue_job, register_job
+from .membership import rebuild_dataset_membership
+from .progress import rebuild_dataset_progress
+from .revision import bump_dataset_revision
+from .schema import invalidate_dataset_schema
+
+logger = logging.getLogger(__name__)
 
 
 def generate_zip_export(task_id, dataset_id, user_id, file_types=None, date_from=None, date_to=None, 
-                       organize_by='geometry', include_metadata=True):
+                       organize_by='geometry', include_metadata=True, incremental=False):
     """
     Generate ZIP export asynchronously.
     
@@ -34,6 +57,8 @@ def generate_zip_export(task_id, dataset_id, user_id, file_types=None, date_from
         date_to: End date for filtering
         organize_by: How to organize files
         include_metadata: Whether to include metadata files
+        incremental: Only include files added since the user's previous ZIP
+            export with the same file type and date filters
     """
     try:
         # Get objects
@@ -48,9 +73,20 @@ def generate_zip_export(task_id, dataset_id, user_id, file_types=None, date_from
         
         # Get filtered files
         files_queryset = get_filtered_files(dataset, file_types, date_from, date_to)
-        
-        if not files_queryset.exists():
-            raise ValueError("No files found matching the specified criteria")
+        file_types = normalize_zip_file_types(file_types)
+        previous_export = (
+            get_previous_zip_export(dataset_id, user_id, file_types, date_from, date_to) if incremental else None
+        )
+        if previous_export is not None:
+            files_queryset = files_queryset.filter(id__gt=previous_export.watermark_file_id)
+
+        # Files uploaded while the archive is written belong to the next export
+        watermark = files_queryset.aggregate(watermark=Max('id'))['watermark']
+        if watermark is None:
+            if not incremental:
+                raise ValueError("No files found matching the specified criteria")
+            watermark = previous_export.watermark_file_id if previous_export else 0
+        files_queryset = files_queryset.filter(id__lte=watermark)
         
         # Create export directory
         export_dir = Path(settings.MEDIA_ROOT) / 'exports' / task_id
@@ -67,48 +103,143 @@ def generate_zip_export(task_id, dataset_id, user_id, file_types=None, date_from
                     # Create filename with geometry/entry ID prefix
                     prefixed_filename = create_prefixed_filename(file_obj, organize_by)
                     
-                    # Read file content
+                    # Copy file content in chunks
                     try:
-                        with default_storage.open(file_obj.file.name, 'rb') as f:
-                            zipf.writestr(prefixed_filename, f.read())
+                        add_file_to_zip(zipf, prefixed_filename, file_obj)
                     except Exception as e:
-                        print(f"Error reading file {file_obj.filename}: {e}")
+                        logger.warning(f"Error reading file {file_obj.filename}: {str(e)}")
                         continue
                 else:
-                    print(f"File not found: {file_obj.filename}")
+                    logger.warning(f"File not found: {file_obj.filename}")
             
             # Add metadata if requested
             if include_metadata:
                 add_metadata_to_zip(zipf, files_queryset, dataset, organize_by)
+            add_export_manifest_to_zip(zipf, task, files_queryset, watermark, previous_export)
         
         # Update task with completion
         file_size = zip_path.stat().st_size
         with transaction.atomic():
-            task = ExportTask.objects.get(task_id=task_id)
+            # Locked so users joining the running export are either added
+            # to the recipients first or see the completed task
+            task = ExportTask.objects.select_for_update().get(task_id=task_id)
             task.status = 'completed'
             task.file_path = str(zip_path.relative_to(settings.MEDIA_ROOT))
             task.file_size = file_size
+            task.error_message = None
             task.completed_at = datetime.now()
+            task.previous_export = previous_export
+            # The watermark only applies to exports with the same filters
+            task.file_types = file_types
+            task.watermark_file_id = watermark
             task.save()
+            recipients = [recipient for recipient in task.notify_users.all() if recipient.email]
         
-        # Send email notification
-        send_export_completion_email(user, dataset, task, zip_path)
+        # Send email notifications
+        for recipient in recipients:
+            send_export_completion_email(recipient, dataset, task, zip_path)
         
-        print(f"ZIP export completed: {zip_path}")
+        logger.info(f"ZIP export {task_id} completed: {zip_path}")
         
     except Exception as e:
-        # Update task with error
-        with transaction.atomic():
-            task = ExportTask.objects.get(task_id=task_id)
-            task.status = 'failed'
-            task.error_message = str(e)
-            task.completed_at = datetime.now()
-            task.save()
-        
-        print(f"ZIP export failed: {e}")
+        # The task stays in progress while the job is retried; fail_export_task
+        # marks it failed once the job is given up
+        ExportTask.objects.filter(task_id=task_id).update(error_message=str(e))
+        logger.error(f"ZIP export {task_id} failed: {str(e)}", exc_info=True)
         raise
 
 
+# Bytes copied at a time when adding a file to a ZIP archive
+ZIP_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+# MIME types whose content is already compressed; deflating them again
+# costs CPU time without making the archive smaller
+PRECOMPRESSED_MIME_TYPES = {
+    'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/heic', 'image/heif', 'image/avif',
+    'application/zip', 'application/gzip', 'application/x-gzip', 'application/x-7z-compressed',
+    'application/x-rar-compressed', 'application/vnd.rar', 'application/x-bzip2', 'application/x-xz',
+}
+PRECOMPRESSED_MIME_PREFIXES = (
+    'video/', 'audio/',
+    # Office documents are ZIP containers
+    'application/vnd.openxmlformats-officedocument.', 'application/vnd.oasis.opendocument.',
+)
+
+
+def get_zip_compression(file_type, filename=''):
+    """ZIP compression method for a file: stored if already compressed, deflated otherwise."""
+    if not settings.ZIP_EXPORT_STORE_COMPRESSED:
+        return zipfile.ZIP_DEFLATED
+    mime_type = (file_type or mimetypes.guess_type(filename)[0] or '').lower()
+    # Uncompressed audio is the exception among audio types
+    if mime_type in ('audio/wav', 'audio/x-wav', 'audio/wave'):
+        return zipfile.ZIP_DEFLATED
+    if mime_type in PRECOMPRESSED_MIME_TYPES or mime_type.startswith(PRECOMPRESSED_MIME_PREFIXES):
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def add_file_to_zip(zipf, arcname, file_obj):
+    """
+    Copy a stored file into a ZIP archive in fixed-size chunks.
+
+    The size from storage lets zipfile decide up front whether the entry
+    needs ZIP64 extensions, so files larger than 2 GiB are supported.
+    """
+    zinfo = zipfile.ZipInfo(arcname, date_time=timezone.localtime(file_obj.upload_date).timetuple()[:6])
+    zinfo.compress_type = get_zip_compression(file_obj.file_type, file_obj.filename)
+    zinfo.file_size = default_storage.size(file_obj.file.name)
+    with default_storage.open(file_obj.file.name, 'rb') as source, zipf.open(zinfo, 'w') as target:
+        shutil.copyfileobj(source, target, ZIP_COPY_CHUNK_SIZE)
+
+
+def normalize_zip_file_types(file_types):
+    """File type filter of a ZIP export as stored on its task"""
+    if not file_types or 'all' in file_types:
+        return ['all']
+    return sorted(set(file_types))
+
+
+def get_previous_zip_export(dataset_id, user_id, file_types=None, date_from=None, date_to=None):
+    """
+    Latest completed ZIP export of a user and dataset with the same file
+    type and date filters, the base of an incremental export.
+    """
+    return (
+        ExportTask.objects.filter(
+            dataset_id=dataset_id, user_id=user_id, export_format='zip',
+            status='completed', watermark_file_id__isnull=False,
+            file_types=normalize_zip_file_types(file_types), date_from=date_from, date_to=date_to,
+        )
+        .order_by('-watermark_file_id', '-completed_at')
+        .first()
+    )
+
+
+def add_export_manifest_to_zip(zipf, task, files_queryset, watermark, previous_export):
+    """
+    Add export_manifest.json, which records the files in the archive and
+    links an incremental export to the export it continues.
+    """
+    manifest = {
+        'task_id': task.task_id,
+        'dataset_id': task.dataset_id,
+        'incremental': task.incremental,
+        'created_at': task.created_at.isoformat(),
+        'watermark_file_id': watermark,
+        'previous_export': None,
+        'file_ids': list(files_queryset.order_by('id').values_list('id', flat=True)),
+    }
+    if previous_export is not None:
+        manifest['previous_export'] = {
+            'task_id': previous_export.task_id,
+            'watermark_file_id': previous_export.watermark_file_id,
+            'completed_at': previous_export.completed_at.isoformat() if previous_export.completed_at else None,
+        }
+    zipf.writestr('export_manifest.json', json.dumps(manifest, indent=2))
+
+
 def get_filtered_files(dataset, file_types=None, date_from=None, date_to=None):
     """Get filtered files based on criteria."""
     files_queryset = DataEntryFile.objects.filter(
@@ -216,7 +347,9 @@ def add_metadata_to_zip(zipf, files_queryset, dataset, organize_by):
         'file_types': stats['file_types'],
         'users': stats['users'],
         'geometries': stats['geometries'],
-        'date_range': stats['date_range'],
+        'date_range': {
+            key: value.isoformat() if value else None for key, value in stats['date_range'].items()
+        },
         'organization_method': organize_by
     }
     zipf.writestr('dataset_summary.json', json.dumps(summary, indent=2))
@@ -258,40 +391,6 @@ Files are prefixed with geometry/entry identifiers for easy identification:
     zipf.writestr('README.md', readme_content)
 
 
-def calculate_file_statistics(files_queryset):
-    """Calculate comprehensive file statistics."""
-    stats = {
-        'total_files': files_queryset.count(),
-        'total_size': sum(f.file_size for f in files_queryset if f.file_size),
-        'file_types': {},
-        'users': {},
-        'geometries': {},
-        'date_range': {'earliest': None, 'latest': None},
-    }
-    
-    for file_obj in files_queryset:
-        # File type stats
-        file_type = file_obj.file_type.split('/')[0]
-        stats['file_types'][file_type] = stats['file_types'].get(file_type, 0) + 1
-        
-        # User stats
-        user = file_obj.upload_user.username if file_obj.upload_user else 'Unknown'
-        stats['users'][user] = stats['users'].get(user, 0) + 1
-        
-        # Geometry stats
-        geom_id = file_obj.entry.geometry.id_kurz
-        stats['geometries'][geom_id] = stats['geometries'].get(geom_id, 0) + 1
-        
-        # Date range
-        upload_date = file_obj.upload_date.date()
-        if not stats['date_range']['earliest'] or upload_date < stats['date_range']['earliest']:
-            stats['date_range']['earliest'] = upload_date
-        if not stats['date_range']['latest'] or upload_date > stats['date_range']['latest']:
-            stats['date_range']['latest'] = upload_date
-    
-    return stats
-
-
 def send_export_completion_email(user, dataset, task, zip_path):
     """Send email notification when export is completed."""
     try:
@@ -345,17 +444,20 @@ ISR Field Team
             fail_silently=False,
         )
         
-        print(f"Export completion email sent to {user.email}")
+        logger.info(f"Export completion email sent to {user.email}")
         
     except Exception as e:
-        print(f"Failed to send export completion email: {e}")
+        logger.error(f"Failed to send export completion email: {str(e)}")
 
 
 def start_export_task(dataset_id, user_id, file_types=None, date_from=None, date_to=None, 
-                     organize_by='geometry', include_metadata=True):
+                     organize_by='geometry', include_metadata=True, incremental=False, cache_key='',
+                     notify=True):
     """
     Start a new export task.
     
+    The requesting user is emailed when the export completes if notify is set.
+    
     Returns:
         ExportTask: The created task object
     """
@@ -367,18 +469,18 @@ def start_export_task(dataset_id, user_id, file_types=None, date_from=None, date
         task_id=task_id,
         dataset_id=dataset_id,
         user_id=user_id,
-        file_types=file_types or ['all'],
+        file_types=normalize_zip_file_types(file_types),
         date_from=date_from,
         date_to=date_to,
         organize_by=organize_by,
-        include_metadata=include_metadata
+        include_metadata=include_metadata,
+        incremental=incremental,
+        cache_key=cache_key
     )
+    if notify:
+        task.notify_users.add(user_id)
     
-    # Start background task (in a real implementation, you'd use Celery or similar)
-    # For now, we'll run it synchronously but in a separate thread
-    import threading
-    
-    def run_export():
+    if not settings.EXPORT_IN_BACKGROUND:
         try:
             generate_zip_export(
                 task_id=task_id,
@@ -388,14 +490,406 @@ def start_export_task(dataset_id, user_id, file_types=None, date_from=None, date
                 date_from=date_from,
                 date_to=date_to,
                 organize_by=organize_by,
-                include_metadata=include_metadata
+                include_metadata=include_metadata,
+                incremental=incremental
             )
         except Exception as e:
-            print(f"Export task failed: {e}")
-    
-    # Start the task in a separate thread
-    thread = threading.Thread(target=run_export)
-    thread.daemon = True
-    thread.start()
-    
+            # Without a worker there is no retry
+            fail_export_task(str(e), task.task_id)
+        task.refresh_from_db()
+        return task
+
+    enqueue_job('zip_export', task_id=task_id)
+    return task
+
+
+def fail_export_task(error, task_id):
+    """Job failure handler: mark an export task failed once its job is given up."""
+    ExportTask.objects.filter(task_id=task_id).exclude(status='completed').update(
+        status='failed', error_message=error, completed_at=timezone.now()
+    )
+
+
+@register_job('zip_export', on_failure=fail_export_task)
+def run_zip_export_job(task_id):
+    """Job handler: generate a ZIP export with the parameters stored on its task."""
+    task = ExportTask.objects.get(task_id=task_id)
+    # A job that is run again after a lost heartbeat may find its task done
+    if task.status == 'completed':
+        return
+    generate_zip_export(
+        task_id=task.task_id,
+        dataset_id=task.dataset_id,
+        user_id=task.user_id,
+        file_types=task.file_types,
+        date_from=task.date_from,
+        date_to=task.date_to,
+        organize_by=task.organize_by,
+        include_metadata=task.include_metadata,
+        incremental=task.incremental
+    )
+
+
+def generate_dataset_export(task_id):
+    """
+    Write a dataset export in one of exports.EXPORT_FORMATS to
+    MEDIA_ROOT/exports/<task_id>/.
+
+    The file is written under a temporary name and renamed once complete,
+    so a cached export is never served half-written.
+    """
+    task = ExportTask.objects.select_related('dataset', 'user').get(task_id=task_id)
+    ExportTask.objects.filter(pk=task.pk).update(status='processing')
+    try:
+        export_format = EXPORT_FORMATS[task.export_format]
+        export_dir = Path(settings.MEDIA_ROOT) / 'exports' / task_id
+        export_dir.mkdir(parents=True, exist_ok=True)
+        filename = (
+            f"{task.dataset.name}_export_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
+            f".{export_format['extension']}"
+        )
+        export_path = export_dir / filename
+        partial_path = export_dir / f'partial-{filename}'
+
+        export_format['writer'](task.dataset, partial_path, task.export_options, task.user)
+        os.replace(partial_path, export_path)
+
+        ExportTask.objects.filter(pk=task.pk).update(
+            status='completed',
+            file_path=str(export_path.relative_to(settings.MEDIA_ROOT)),
+            file_size=export_path.stat().st_size,
+            error_message=None,
+            completed_at=timezone.now()
+        )
+        logger.info(f"Dataset export {task_id} completed: {export_path}")
+
+    except Exception as e:
+        logger.error(f"Dataset export {task_id} failed: {str(e)}", exc_info=True)
+        # fail_export_task marks the task failed once the job is given up
+        ExportTask.objects.filter(pk=task.pk).update(error_message=str(e))
+        raise
+
+
+def start_dataset_export_task(dataset, user, export_format, options, cache_key):
+    """Create a dataset export task and queue it for the job workers."""
+    task = ExportTask.objects.create(
+        task_id=str(uuid.uuid4()),
+        dataset=dataset,
+        user=user,
+        export_format=export_format,
+        export_options=options,
+        cache_key=cache_key,
+        file_types=[],
+        include_metadata=False
+    )
+
+    if not settings.EXPORT_IN_BACKGROUND:
+        try:
+            generate_dataset_export(task.task_id)
+        except Exception as e:
+            # Without a worker there is no retry
+            fail_export_task(str(e), task.task_id)
+        task.refresh_from_db()
+        return task
+
+    enqueue_job('dataset_export', task_id=task.task_id)
+    return task
+
+
+@register_job('dataset_export', on_failure=fail_export_task)
+def run_dataset_export_job(task_id):
+    """Job handler: generate a tabular or GIS dataset export."""
+    if ExportTask.objects.filter(task_id=task_id, status='completed').exists():
+        return
+    generate_dataset_export(task_id)
+
+
+# Number of error messages kept on an import task for display
+IMPORT_STORED_ERRORS = 100
+
+
+def iter_csv_lines(handle, progress):
+    """Decode a binary file line by line, counting the bytes read."""
+    for index, raw_line in enumerate(handle):
+        progress['bytes'] += len(raw_line)
+        # Strip a byte order mark from the header line
+        yield raw_line.decode('utf-8-sig' if index == 0 else 'utf-8')
+
+
+class _CSVImportState:
+    """State shared across the chunks of one CSV import."""
+
+    def __init__(self, task):
+        self.task = task
+        self.dataset = task.dataset
+        self.skip_columns = {task.id_column, task.x_column, task.y_column, None}
+        self.seen_ids = {}
+        self.fields = {}
+        self.choice_values = {}
+        # A retried import continues after the chunks saved by the failed attempt
+        self.rows_processed = task.rows_processed
+        self.rows_imported = task.rows_imported
+        self.error_count = task.error_count
+        self.errors = list(task.errors or [])
+
+    def add_error(self, message):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_STORED_ERRORS:
+            self.errors.append(message)
+
+    def resolve_fields(self, columns):
+        """Get or create the dataset fields of columns not resolved yet."""
+        missing = [column for column in columns if column not in self.fields]
+        if not missing:
+            return
+        fields = {
+            field.field_name: field
+            for field in DatasetField.objects.filter(dataset=self.dataset, field_name__in=missing)
+        }
+        new_fields = [
+            DatasetField(dataset=self.dataset, field_name=column, label=column, field_type='text', enabled=True)
+            for column in missing if column not in fields
+        ]
+        if new_fields:
+            # bulk_create skips the signal handlers that drop the cached schema
+            # and bump the revision
+            for field in DatasetField.objects.bulk_create(new_fields):
+                fields[field.field_name] = field
+            invalidate_dataset_schema(self.dataset.pk)
+            bump_dataset_revision([self.dataset.pk])
+
+        for column in missing:
+            field = fields[column]
+            self.fields[column] = field
+            if field.field_type == 'multiple_choice':
+                self.choice_values[column] = {
+                    str(opt.get('value', opt) if isinstance(opt, dict) else opt)
+                    for opt in field.get_choices_list()
+                }
+
+
+def _import_csv_chunk(state, rows):
+    """Validate a chunk of CSV rows and create its geometries, entries and field values."""
+    task = state.task
+    valid_rows = []
+    for row_num, row in rows:
+        state.rows_processed += 1
+        geometry_id = (row.get(task.id_column) or '').strip()
+        x_coord = (row.get(task.x_column) or '').strip()
+        y_coord = (row.get(task.y_column) or '').strip()
+
+        if not geometry_id or not x_coord or not y_coord:
+            state.add_error(f'Row {row_num}: Missing required data')
+            continue
+
+        if geometry_id in state.seen_ids:
+            state.add_error(
+                f'Row {row_num}: Duplicate ID "{geometry_id}" within CSV '
+                f'(first occurrence at row {state.seen_ids[geometry_id]})'
+            )
+            continue
+
+        try:
+            x = float(x_coord)
+            y = float(y_coord)
+        except ValueError:
+            state.add_error(f'Row {row_num}: Invalid coordinates')
+            continue
+
+        state.seen_ids[geometry_id] = row_num
+        valid_rows.append((row_num, geometry_id, x, y, row))
+
+    # Check for existing geometries in the current dataset only
+    existing_ids = set(DataGeometry.objects.filter(
+        dataset=state.dataset,
+        id_kurz__in=[geometry_id for _, geometry_id, _, _, _ in valid_rows]
+    ).values_list('id_kurz', flat=True))
+    new_rows = []
+    for row in valid_rows:
+        if row[1] in existing_ids:
+            state.add_error(f'Row {row[0]}: ID "{row[1]}" already exists in this dataset')
+        else:
+            new_rows.append(row)
+    if not new_rows:
+        return
+
+    try:
+        _write_import_rows(state, new_rows)
+    except (IntegrityError, DataError) as e:
+        # A value the database rejects fails the whole chunk; write the rows
+        # one at a time to import the others and report the rows at fault
+        logger.warning(f"Importing rows {new_rows[0][0]}-{new_rows[-1][0]} one by one: {str(e)}")
+        state.fields = {}
+        for row in new_rows:
+            try:
+                _write_import_rows(state, [row])
+            except (IntegrityError, DataError) as e:
+                state.add_error(f'Row {row[0]}: {str(e).strip()}')
+                state.fields = {}
+            else:
+                state.rows_imported += 1
+        return
+    # Other errors (lost connection, lock timeout, full disk) propagate so
+    # the job is retried from the last committed chunk
+
+    state.rows_imported += len(new_rows)
+
+
+def _write_import_rows(state, rows):
+    """Create the geometries, entries and field values of validated rows in one transaction."""
+    with transaction.atomic():
+        # Field values for all other columns
+        row_values = [
+            [
+                (column, value.strip())
+                for column, value in row.items()
+                if column not in state.skip_columns and isinstance(value, str) and value.strip()
+            ]
+            for _, _, _, _, row in rows
+        ]
+        state.resolve_fields({column for values in row_values for column, _ in values})
+
+        import_rows = []
+        for (_, geometry_id, x, y, _), values in zip(rows, row_values):
+            field_values = []
+            for column, field_value in values:
+                field_type = state.fields[column].field_type
+                if field_type == 'multiple_choice':
+                    # Convert comma-separated values to validated JSON
+                    values_list = [v.strip() for v in field_value.split(',') if v.strip()]
+                    field_value = json.dumps([v for v in values_list if v in state.choice_values[column]])
+                field_values.append((column, field_type, field_value))
+            import_rows.append((geometry_id, x, y, field_values))
+
+        bulk_import_rows(state.dataset, state.task.user, state.task.srid, import_rows)
+
+
+def run_csv_import(task_id):
+    """
+    Import the uploaded CSV file of an import task.
+
+    The file is streamed from its temporary path and rows are committed in
+    chunks of CSV_IMPORT_CHUNK_SIZE, updating the task's progress after each
+    chunk so the status endpoint can report it. Each chunk is written by the
+    loader selected with CSV_IMPORT_ENGINE (see bulk_import.py).
+
+    Failure messages are recorded on the task and the error is raised again
+    so the job is retried. A retry skips the rows of the chunks saved before the failure;
+    the file is removed once the import completed or was given up.
+    """
+    task = ImportTask.objects.select_related('dataset', 'user').get(task_id=task_id)
+    ImportTask.objects.filter(pk=task.pk).update(
+        status='processing', started_at=task.started_at or timezone.now(), error_message=None, completed_at=None
+    )
+    state = _CSVImportState(task)
+    resume_after = state.rows_processed
+    progress = {'bytes': 0}
+
+    def save_progress(**extra):
+        ImportTask.objects.filter(pk=task.pk).update(
+            bytes_processed=progress['bytes'],
+            rows_processed=state.rows_processed,
+            rows_imported=state.rows_imported,
+            error_count=state.error_count,
+            errors=state.errors,
+            **extra
+        )
+
+    try:
+        if task.clear_existing and not resume_after:
+            delete_dataset_geometries(task.dataset_id)
+
+        chunk_size = max(1, settings.CSV_IMPORT_CHUNK_SIZE)
+        with open(task.file_path, 'rb') as handle:
+            reader = csv.DictReader(iter_csv_lines(handle, progress), delimiter=task.delimiter)
+            chunk = []
+            for row_num, row in enumerate(reader, start=2):  # Start at 2 for header
+                if row_num - 1 <= resume_after:
+                    continue
+                chunk.append((row_num, row))
+                if len(chunk) >= chunk_size:
+                    _import_csv_chunk(state, chunk)
+                    chunk = []
+                    save_progress()
+            if chunk:
+                _import_csv_chunk(state, chunk)
+
+        _rebuild_imported_dataset(task.dataset_id)
+        save_progress(status='completed', completed_at=timezone.now())
+        logger.info(f"CSV import {task_id} completed: {state.rows_imported} rows imported, {state.error_count} errors")
+        _remove_import_file(task.file_path)
+
+    except Exception as e:
+        logger.error(f"CSV import {task_id} failed: {str(e)}", exc_info=True)
+        # The counters saved after the last complete chunk are kept for the
+        # retry; fail_csv_import marks the task failed once the job is given up
+        ImportTask.objects.filter(pk=task.pk).update(error_message=str(e))
+        raise
+
+
+def _rebuild_imported_dataset(dataset_id):
+    # Rows written by the bulk loaders bypass the signal handlers
+    rebuild_dataset_membership(dataset_id)
+    rebuild_dataset_progress(dataset_id)
+
+
+def _remove_import_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def fail_csv_import(error, task_id):
+    """Job failure handler: mark an import task failed and remove its file once its job is given up."""
+    task = ImportTask.objects.filter(task_id=task_id).first()
+    if task is None:
+        return
+    ImportTask.objects.filter(pk=task.pk).exclude(status='completed').update(
+        status='failed', error_message=error, completed_at=timezone.now()
+    )
+    _remove_import_file(task.file_path)
+    if task.rows_imported:
+        # Index the rows of the chunks committed before the failure
+        _rebuild_imported_dataset(task.dataset_id)
+
+
+def delete_stale_import_uploads():
+    """
+    Give up uploads whose columns were not selected within
+    CSV_IMPORT_UPLOAD_MAX_AGE hours and remove their files; returns the
+    number of uploads given up.
+    """
+    cutoff = timezone.now() - timedelta(hours=settings.CSV_IMPORT_UPLOAD_MAX_AGE)
+    stale = list(ImportTask.objects.filter(status='uploaded', created_at__lt=cutoff).values_list('pk', 'file_path'))
+    for _, file_path in stale:
+        _remove_import_file(file_path)
+    ImportTask.objects.filter(pk__in=[pk for pk, _ in stale], status='uploaded').update(
+        status='failed', error_message='The upload expired before it was imported.', completed_at=timezone.now()
+    )
+    return len(stale)
+
+
+def start_csv_import_task(task):
+    """Queue an import task for the job workers."""
+    ImportTask.objects.filter(pk=task.pk).update(status='pending')
+
+    if not settings.CSV_IMPORT_IN_BACKGROUND:
+        try:
+            run_csv_import(task.task_id)
+        except Exception as e:
+            # Without a worker there is no retry
+            fail_csv_import(str(e), task.task_id)
+        return task
+
+    enqueue_job('csv_import', task_id=task.task_id)
     return task
+
+
+@register_job('csv_import', on_failure=fail_csv_import)
+def run_csv_import_job(task_id):
+    """Job handler: import the uploaded CSV file of an import task."""
+    # A job that is run again after a lost heartbeat may find its task done
+    if ImportTask.objects.filter(task_id=task_id, status='completed').exists():
+        return
+    run_csv_import(task_id)
@@ -0,0 +1,64 @@
+import re
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from datasets.bulk_import import IMPORT_ENGINES
+from datasets.management.commands.benchmark_csv_import import Command
+from datasets.models import DataGeometry, DataSet, ImportTask
+
+
+RESULT_LINE = re.compile(r'^\s*(\w+): (\d+) rows in ([\d.]+)s \(([\d,]+) rows/s\)$')
+
+
+class BenchmarkCSVImportTests(TestCase):
+    def run_benchmark(self, command=None, **options):
+        output = StringIO()
+        call_command(command or 'benchmark_csv_import', stdout=output, **options)
+        return output.getvalue().splitlines()
+
+    def test_every_engine_is_timed_against_the_per_row_import(self):
+        # copy takes 1s, orm 2s and the original per-row import 8s
+        clock = mock.patch(
+            'datasets.management.commands.benchmark_csv_import.perf_counter',
+            side_effect=[0.0, 1.0, 10.0, 12.0, 20.0, 28.0],
+        )
+        with clock:
+            lines = self.run_benchmark(rows=40, columns=2, chunk_size=15)
+
+        self.assertEqual(lines, [
+            ' copy: 40 rows in 1.00s (40 rows/s)',
+            '  orm: 40 rows in 2.00s (20 rows/s)',
+            '  row: 40 rows in 8.00s (5 rows/s)',
+            'copy is 8.0x the speed of row',
+            'orm is 4.0x the speed of row',
+        ])
+
+    def test_reported_timings_match_the_measured_imports(self):
+        command = Command()
+        lines = self.run_benchmark(command, rows=25, columns=3, chunk_size=10)
+
+        self.assertEqual(list(command.results), list(IMPORT_ENGINES))
+        reported = {}
+        for line in lines[:len(IMPORT_ENGINES)]:
+            engine, imported, seconds, rate = RESULT_LINE.match(line).groups()
+            reported[engine] = (int(imported), float(seconds), int(rate.replace(',', '')))
+        for engine, (seconds, imported) in command.results.items():
+            with self.subTest(engine=engine):
+                self.assertGreater(seconds, 0)
+                self.assertEqual(imported, 25)
+                self.assertEqual(reported[engine], (imported, round(seconds, 2), round(imported / seconds)))
+        self.assertEqual(
+            lines[len(IMPORT_ENGINES):],
+            [
+                f'{engine} is {command.results["row"][0] / command.results[engine][0]:.1f}x the speed of row'
+                for engine in IMPORT_ENGINES if engine != 'row'
+            ],
+        )
+
+        # The benchmark cleans up after itself
+        self.assertFalse(DataSet.objects.exists())
+        self.assertFalse(DataGeometry.objects.exists())
+        self.assertFalse(ImportTask.objects.exists())
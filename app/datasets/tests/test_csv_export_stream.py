@@ -0,0 +1,85 @@
+import csv
+import io
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.models import DataEntry, DataEntryField, DataGeometry, DataSet, DatasetField
+
+
+class StreamingCSVExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='pass')
+        self.dataset = DataSet.objects.create(name='Export', owner=self.user)
+        DatasetField.objects.create(dataset=self.dataset, field_name='height', label='Height', field_type='integer')
+        DatasetField.objects.create(
+            dataset=self.dataset, field_name='uses', label='Uses', field_type='multiple_choice',
+            choices='living,office',
+        )
+        DatasetField.objects.create(dataset=self.dataset, field_name='section', label='Section', field_type='headline')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def add_geometry(self, id_kurz, entries=1, user=True, **values):
+        geometry = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz=id_kurz, address=f'{id_kurz} Street',
+            geometry=Point(16.0, 48.0, srid=4326), user=self.user if user else None,
+        )
+        for index in range(entries):
+            entry = DataEntry.objects.create(geometry=geometry, name=f'{id_kurz}-{index}', year=2020 + index)
+            for field_name, value in values.items():
+                DataEntryField.objects.create(entry=entry, field_name=field_name, value=value)
+        return geometry
+
+    def export(self, **params):
+        response = self.client.get(reverse('dataset_csv_export', args=[self.dataset.id]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_export_pivots_field_values(self):
+        self.add_geometry('B1', height='12', uses='["living", "office"]')
+        self.add_geometry('B2', user=False, extra='from import')
+
+        rows = self.export()
+        self.assertEqual(
+            rows[0],
+            ['ID', 'Address', 'X', 'Y', 'User', 'Entry_Name', 'Year', 'extra', 'height', 'uses'],
+        )
+        by_id = {row[0]: row for row in rows[1:]}
+        self.assertEqual(by_id['B1'], ['B1', 'B1 Street', '16.0', '48.0', 'owner', 'B1-0', '2020', '', '12', 'living, office'])
+        self.assertEqual(by_id['B2'][4], 'Unknown')
+        self.assertEqual(by_id['B2'][7:], ['from import', '', ''])
+
+    def test_export_without_coordinates(self):
+        self.add_geometry('B1', height='3')
+        rows = self.export(include_coordinates='false')
+        self.assertEqual(rows[0][:5], ['ID', 'Address', 'User', 'Entry_Name', 'Year'])
+        self.assertEqual(rows[1][:5], ['B1', 'B1 Street', 'owner', 'B1-0', '2020'])
+
+    def test_query_count_does_not_grow_with_rows_or_fields(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.export()
+            return len(context.captured_queries)
+
+        self.add_geometry('B1', height='1', uses='["living"]')
+        self.export()  # Warm the cached field schema
+        small = count_queries()
+
+        for index in range(10):
+            self.add_geometry(f'C{index}', entries=2, height=str(index), uses='["office"]', a='x', b='y')
+        self.assertEqual(count_queries(), small)
+        self.assertEqual(len(self.export()), 1 + 1 + 20)
+
+    def test_access_denied_for_other_users(self):
+        stranger = User.objects.create_user(username='stranger', password='pass')
+        self.client.force_login(stranger)
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.client.get(reverse('dataset_csv_export', args=[self.dataset.id]))
+        self.assertEqual(response.status_code, 403)
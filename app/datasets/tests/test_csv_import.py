@@ -1,12 +1,14 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.gis.geos import Point
 import io
 import csv
+import shutil
+import tempfile
 
-from ..models import DataSet, DataGeometry, DataEntry, DataEntryField, DatasetField
+from ..models import DataSet, DataGeometry, DataEntry, DataEntryField, DatasetField, ImportTask
 
 
 class CSVImportTestCase(TestCase):
@@ -14,6 +16,13 @@ class CSVImportTestCase(TestCase):
     
     def setUp(self):
         """Set up test data"""
+        # Run imports inside the request and keep uploads in a throwaway directory
+        self.import_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.import_dir, ignore_errors=True)
+        settings_override = override_settings(CSV_IMPORT_TEMP_DIR=self.import_dir, CSV_IMPORT_IN_BACKGROUND=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        
         self.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
@@ -26,6 +35,15 @@ class CSVImportTestCase(TestCase):
             owner=self.user
         )
     
+    def upload_csv(self, client, csv_content):
+        """Upload a CSV file, creating the import task kept in the session"""
+        response = client.post(
+            reverse('dataset_csv_import', args=[self.dataset.id]),
+            {'csv_file': SimpleUploadedFile('test.csv', csv_content.encode('utf-8'), content_type='text/csv')}
+        )
+        self.assertEqual(response.status_code, 302)
+        return response
+    
     def test_csv_import_view_get(self):
         """Test GET request to CSV import view"""
         client = Client()
@@ -75,13 +93,10 @@ test_002,Test Address 2,656620,3399141,640,0"""
         client = Client()
         client.force_login(self.user)
         
-        # Set up session data
-        session = client.session
-        session['csv_data'] = """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG
+        # Upload the CSV file
+        self.upload_csv(client, """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG
 test_001,Test Address 1,656610,3399131,870
-test_002,Test Address 2,656620,3399141,640"""
-        session['csv_delimiter'] = ','
-        session.save()
+test_002,Test Address 2,656620,3399141,640""")
         
         response = client.get(reverse('dataset_csv_column_selection', args=[self.dataset.id]))
         self.assertEqual(response.status_code, 200)
@@ -100,13 +115,10 @@ test_002,Test Address 2,656620,3399141,640"""
         client = Client()
         client.force_login(self.user)
         
-        # Set up session data
-        session = client.session
-        session['csv_data'] = """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG
+        # Upload the CSV file
+        self.upload_csv(client, """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG
 test_001,Test Address 1,656610,3399131,870
-test_002,Test Address 2,656620,3399141,640"""
-        session['csv_delimiter'] = ','
-        session.save()
+test_002,Test Address 2,656620,3399141,640""")
         
         response = client.post(
             reverse('dataset_csv_column_selection', args=[self.dataset.id]),
@@ -121,13 +133,10 @@ test_002,Test Address 2,656620,3399141,640"""
         client = Client()
         client.force_login(self.user)
         
-        # Set up session data
-        session = client.session
-        session['csv_data'] = """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG,2016_CAT_INNO
+        # Upload the CSV file
+        self.upload_csv(client, """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG,2016_CAT_INNO
 test_001,Test Address 1,656610,3399131,870,999
-test_002,Test Address 2,656620,3399141,640,0"""
-        session['csv_delimiter'] = ','
-        session.save()
+test_002,Test Address 2,656620,3399141,640,0""")
         
         response = client.post(
             reverse('dataset_csv_column_selection', args=[self.dataset.id]),
@@ -139,22 +148,20 @@ test_002,Test Address 2,656620,3399141,640,0"""
             }
         )
         
-        # Should redirect to dataset detail
+        # Should redirect to the import progress page
         self.assertEqual(response.status_code, 302)
-        self.assertRedirects(response, reverse('dataset_detail', args=[self.dataset.id]))
+        task = ImportTask.objects.get(dataset=self.dataset)
+        self.assertRedirects(response, reverse('import_task', args=[self.dataset.id, task.task_id]))
     
     def test_csv_import_creates_geometries(self):
         """Test that CSV import creates geometries correctly"""
         client = Client()
         client.force_login(self.user)
         
-        # Set up session data
-        session = client.session
-        session['csv_data'] = """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG,2016_CAT_INNO
+        # Upload the CSV file
+        self.upload_csv(client, """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG,2016_CAT_INNO
 test_001,Test Address 1,656610,3399131,870,999
-test_002,Test Address 2,656620,3399141,640,0"""
-        session['csv_delimiter'] = ','
-        session.save()
+test_002,Test Address 2,656620,3399141,640,0""")
         
         # Check initial state
         self.assertEqual(DataGeometry.objects.filter(dataset=self.dataset).count(), 0)
@@ -190,13 +197,10 @@ test_002,Test Address 2,656620,3399141,640,0"""
         client = Client()
         client.force_login(self.user)
         
-        # Set up session data
-        session = client.session
-        session['csv_data'] = """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG,2016_CAT_INNO
+        # Upload the CSV file
+        self.upload_csv(client, """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG,2016_CAT_INNO
 test_001,Test Address 1,656610,3399131,870,999
-test_002,Test Address 2,656620,3399141,640,0"""
-        session['csv_delimiter'] = ','
-        session.save()
+test_002,Test Address 2,656620,3399141,640,0""")
         
         # Perform import
         response = client.post(
@@ -235,13 +239,10 @@ test_002,Test Address 2,656620,3399141,640,0"""
         client = Client()
         client.force_login(self.user)
         
-        # Set up session data with semicolon delimiter
-        session = client.session
-        session['csv_data'] = """ID;ADRESSE;GEB_X;GEB_Y;2016_NUTZUNG;2016_CAT_INNO
+        # Upload a CSV file with semicolon delimiter
+        self.upload_csv(client, """ID;ADRESSE;GEB_X;GEB_Y;2016_NUTZUNG;2016_CAT_INNO
 test_001;Test Address 1;656610;3399131;870;999
-test_002;Test Address 2;656620;3399141;640;0"""
-        session['csv_delimiter'] = ';'
-        session.save()
+test_002;Test Address 2;656620;3399141;640;0""")
         
         # Perform import
         response = client.post(
@@ -263,14 +264,11 @@ test_002;Test Address 2;656620;3399141;640;0"""
         client = Client()
         client.force_login(self.user)
         
-        # Set up session data with missing data
-        session = client.session
-        session['csv_data'] = """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG
+        # Upload a CSV file with missing data
+        self.upload_csv(client, """ID,ADRESSE,GEB_X,GEB_Y,2016_NUTZUNG
 test_001,Test Address 1,656610,3399131,870
 test_002,Test Address 2,,3399141,640
-test_003,Test Address 3,656630,,900"""
-        session['csv_delimiter'] = ','
-        session.save()
+test_003,Test Address 3,656630,,900""")
         
         # Perform import
         response = client.post(
@@ -357,6 +355,6 @@ test_003,Test Address 3,656630,,900"""
         self.assertIn('attachment', response['Content-Disposition'])
         
         # Check CSV content
-        content = response.content.decode('utf-8')
+        content = b''.join(response.streaming_content).decode('utf-8')
         self.assertIn('ID,Address,X,Y,User,Entry_Name,Year,test_field', content)
         self.assertIn('test_001,Test Address,656610.0,3399131.0,testuser,test_001,,test_value', content)
@@ -0,0 +1,269 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from datasets.bulk_import import IMPORT_ENGINES
+from datasets.jobs import work
+from datasets.models import DataEntryField, DataGeometry, DataSet, DatasetField, ImportTask, Job
+from datasets.schema import get_dataset_schema
+from datasets.tasks import delete_stale_import_uploads, fail_csv_import, run_csv_import
+
+
+CSV_CONTENT = """ID,GEB_X,GEB_Y,USE,HEIGHT
+A1,16.37,48.21,living,12
+A2,16.38,48.22,office,
+A3,,48.23,shop,8
+A1,16.39,48.24,living,9
+A5,16.40,48.25,"office, shop",4
+"""
+
+
+class CSVImportTaskTests(TestCase):
+    def setUp(self):
+        self.import_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.import_dir, ignore_errors=True)
+        settings_override = override_settings(
+            CSV_IMPORT_TEMP_DIR=self.import_dir,
+            CSV_IMPORT_IN_BACKGROUND=False,
+            CSV_IMPORT_CHUNK_SIZE=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='owner', password='pass')
+        self.dataset = DataSet.objects.create(name='Import', owner=self.user)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def upload(self, content=CSV_CONTENT):
+        response = self.client.post(
+            reverse('dataset_csv_import', args=[self.dataset.id]),
+            {'csv_file': SimpleUploadedFile('buildings.csv', content.encode('utf-8'), content_type='text/csv')}
+        )
+        self.assertEqual(response.status_code, 302)
+        return ImportTask.objects.get(dataset=self.dataset, status='uploaded')
+
+    def start(self, **extra):
+        data = {'id_column': 'ID', 'coordinate_system': '4326', 'x_column': 'GEB_X', 'y_column': 'GEB_Y'}
+        data.update(extra)
+        return self.client.post(reverse('dataset_csv_column_selection', args=[self.dataset.id]), data)
+
+    def test_upload_is_stored_on_disk_not_in_session(self):
+        task = self.upload()
+        self.assertNotIn('csv_data', self.client.session)
+        self.assertEqual(self.client.session['csv_import_task'], task.task_id)
+        self.assertTrue(os.path.exists(task.file_path))
+        self.assertEqual(task.file_size, len(CSV_CONTENT.encode('utf-8')))
+        self.assertEqual(task.delimiter, ',')
+
+        response = self.client.get(reverse('dataset_csv_column_selection', args=[self.dataset.id]))
+        self.assertContains(response, 'HEIGHT')
+
+    def test_import_runs_in_chunks_and_reports_progress(self):
+        task = self.upload()
+        response = self.start()
+        self.assertRedirects(response, reverse('import_task', args=[self.dataset.id, task.task_id]))
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+        self.assertEqual(task.rows_processed, 5)
+        self.assertEqual(task.rows_imported, 3)
+        self.assertEqual(task.error_count, 2)
+        self.assertEqual(task.bytes_processed, task.file_size)
+        self.assertEqual(task.progress_percent, 100)
+        self.assertTrue(any('Missing required data' in error for error in task.errors))
+        self.assertTrue(any('Duplicate ID "A1"' in error for error in task.errors))
+        self.assertFalse(os.path.exists(task.file_path))
+
+        self.assertCountEqual(
+            DataGeometry.objects.filter(dataset=self.dataset).values_list('id_kurz', flat=True),
+            ['A1', 'A2', 'A5'],
+        )
+        self.assertEqual(DatasetField.objects.filter(dataset=self.dataset).count(), 2)
+        height = DataEntryField.objects.get(entry__geometry__id_kurz='A1', field_name='HEIGHT')
+        self.assertEqual(height.value, '12')
+        self.assertFalse(
+            DataEntryField.objects.filter(entry__geometry__id_kurz='A2', field_name='HEIGHT').exists()
+        )
+
+    def test_status_endpoint_returns_progress(self):
+        task = self.upload()
+        self.start()
+
+        response = self.client.get(reverse('import_task_status', args=[self.dataset.id, task.task_id]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'completed')
+        self.assertTrue(data['finished'])
+        self.assertEqual(data['rows_imported'], 3)
+        self.assertEqual(data['error_count'], 2)
+        self.assertEqual(len(data['errors']), 2)
+
+        page = self.client.get(reverse('import_task', args=[self.dataset.id, task.task_id]))
+        self.assertContains(page, 'buildings.csv')
+
+    def test_status_is_private_to_the_importing_user(self):
+        task = self.upload()
+        other = User.objects.create_user(username='other', password='pass')
+        self.dataset.shared_with.add(other)
+        client = Client()
+        client.force_login(other)
+        with self.assertLogs('django.request', level='WARNING'):
+            response = client.get(reverse('import_task_status', args=[self.dataset.id, task.task_id]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_existing_ids_are_skipped_unless_cleared(self):
+        DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='A2', address='Existing',
+            geometry=Point(16.0, 48.0, srid=4326), user=self.user,
+        )
+        task = self.upload()
+        self.start()
+        task.refresh_from_db()
+        self.assertEqual(task.rows_imported, 2)
+        self.assertTrue(any('ID "A2" already exists' in error for error in task.errors))
+
+        task = self.upload()
+        self.start(clear_existing='on')
+        task.refresh_from_db()
+        self.assertEqual(task.rows_imported, 3)
+        self.assertFalse(DataGeometry.objects.filter(address='Existing').exists())
+
+    def test_missing_file_marks_task_failed(self):
+        task = self.upload()
+        os.remove(task.file_path)
+        task.id_column = 'ID'
+        task.save()
+
+        # The error is raised again so a job would be retried, and the task
+        # stays in progress until the job is given up
+        with self.assertRaises(OSError):
+            run_csv_import(task.task_id)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'processing')
+        self.assertTrue(task.error_message)
+        self.assertIsNone(task.completed_at)
+
+        fail_csv_import(task.error_message, task.task_id)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertIsNotNone(task.completed_at)
+
+    def test_failed_attempts_keep_their_error_and_skip_the_rebuild(self):
+        task = self.upload()
+        os.remove(task.file_path)
+        task.id_column = 'ID'
+        task.save()
+
+        with mock.patch('datasets.tasks.rebuild_dataset_progress', side_effect=RuntimeError('rebuild')) as rebuild:
+            with self.assertRaises(OSError):
+                run_csv_import(task.task_id)
+        rebuild.assert_not_called()
+
+    def test_operational_errors_fail_the_attempt(self):
+        task = self.upload()
+        task.id_column, task.x_column, task.y_column = 'ID', 'GEB_X', 'GEB_Y'
+        task.save()
+
+        with mock.patch('datasets.tasks.bulk_import_rows', side_effect=OperationalError('server closed the connection')):
+            with self.assertRaises(OperationalError):
+                run_csv_import(task.task_id)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.error_count), ('processing', 0))
+        self.assertIn('server closed the connection', task.error_message)
+        self.assertTrue(os.path.exists(task.file_path))
+
+    def test_rows_rejected_by_the_database_are_reported_one_by_one(self):
+        content = f"ID,GEB_X,GEB_Y,USE\nA1,16.37,48.21,living\n{'X' * 150},16.38,48.22,office\nA3,16.39,48.23,shop\n"
+        for engine in IMPORT_ENGINES:
+            with self.subTest(engine=engine), override_settings(CSV_IMPORT_ENGINE=engine):
+                task = self.upload(content)
+                self.start(clear_existing='on')
+                task.refresh_from_db()
+                self.assertEqual(task.status, 'completed')
+                self.assertEqual(task.rows_imported, 2)
+                self.assertEqual(task.error_count, 1)
+                self.assertTrue(task.errors[0].startswith('Row 3: '))
+                self.assertEqual(
+                    set(DataGeometry.objects.filter(dataset=self.dataset).values_list('id_kurz', flat=True)), {'A1', 'A3'}
+                )
+
+    def test_unknown_coordinate_system_fails_the_task(self):
+        task = self.upload()
+        response = self.start(coordinate_system='not-a-srid')
+        self.assertRedirects(response, reverse('import_task', args=[self.dataset.id, task.task_id]))
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertIn('not-a-srid', task.error_message)
+        self.assertFalse(os.path.exists(task.file_path))
+        self.assertFalse(DataGeometry.objects.exists())
+
+    def test_abandoned_uploads_are_removed(self):
+        task = self.upload()
+        ImportTask.objects.filter(pk=task.pk).update(created_at=timezone.now() - timedelta(days=2))
+        # Each upload removes the abandoned ones
+        recent = self.upload()
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'failed')
+        self.assertFalse(os.path.exists(task.file_path))
+        self.assertTrue(os.path.exists(recent.file_path))
+        self.assertEqual(delete_stale_import_uploads(), 0)
+
+    def test_import_engines_create_the_same_rows(self):
+        DatasetField.objects.create(
+            dataset=self.dataset, field_name='USE', label='Use', field_type='multiple_choice',
+            choices='living,office',
+        )
+        results = {}
+        for engine in IMPORT_ENGINES:
+            with self.subTest(engine=engine), override_settings(CSV_IMPORT_ENGINE=engine):
+                task = self.upload()
+                self.start(clear_existing='on')
+                task.refresh_from_db()
+                self.assertEqual(task.status, 'completed')
+                self.assertEqual(task.rows_imported, 3)
+                results[engine] = sorted(
+                    DataEntryField.objects.filter(entry__geometry__dataset=self.dataset).values_list(
+                        'entry__geometry__id_kurz', 'entry__name', 'field_name', 'field_type', 'value'
+                    )
+                )
+                geometry = DataGeometry.objects.get(dataset=self.dataset, id_kurz='A5')
+                self.assertEqual(geometry.address, 'Unknown Address (A5)')
+                self.assertEqual(geometry.user, self.user)
+                self.assertAlmostEqual(geometry.geometry.x, 16.40)
+
+        self.assertEqual(results['copy'], results['orm'])
+        self.assertEqual(results['row'], results['orm'])
+        self.assertIn(('A5', 'A5', 'USE', 'multiple_choice', '["office"]'), results['copy'])
+
+    def test_new_fields_are_visible_in_the_cached_schema(self):
+        self.assertNotIn('HEIGHT', get_dataset_schema(self.dataset))
+        self.upload()
+        self.start()
+        self.assertEqual(get_dataset_schema(self.dataset).field_type('HEIGHT'), 'text')
+
+    @override_settings(CSV_IMPORT_IN_BACKGROUND=True)
+    def test_background_import_is_run_by_a_worker(self):
+        task = self.upload()
+        self.start()
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'pending')
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.payload), ('csv_import', {'task_id': task.task_id}))
+
+        work('test-worker', once=True)
+        task.refresh_from_db()
+        job.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+        self.assertEqual(task.rows_imported, 3)
+        self.assertEqual(job.status, 'completed')
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.models import (
+    DataEntry,
+    DataEntryField,
+    DataGeometry,
+    DataSet,
+    DatasetField,
+    DatasetUserMappingArea,
+    MappingArea,
+)
+
+
+class DataInputLazyRenderTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.dataset = DataSet.objects.create(name='Lazy', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+        DatasetField.objects.create(
+            dataset=self.dataset, field_name='height', label='Height',
+            field_type='integer', enabled=True, order=1,
+        )
+        area = MappingArea.objects.create(
+            dataset=self.dataset,
+            name='Vienna',
+            geometry=Polygon.from_bbox((16.0, 48.0, 17.0, 49.0)),
+            created_by=self.owner,
+        )
+        DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=area)
+        self.url = reverse('dataset_data_input', args=[self.dataset.id])
+
+    def add_geometries(self, count):
+        start = DataGeometry.objects.filter(dataset=self.dataset).count()
+        for index in range(start, start + count):
+            geometry = DataGeometry.objects.create(
+                dataset=self.dataset,
+                id_kurz=f'G{index:04d}',
+                address=f'Street {index}',
+                geometry=Point(16.3 + index * 0.0001, 48.2, srid=4326),
+                user=self.owner,
+            )
+            entry = DataEntry.objects.create(geometry=geometry, name=f'Entry {index}', user=self.owner)
+            DataEntryField.objects.create(entry=entry, field_name='height', value=str(index), field_type='integer')
+
+    def count_queries(self, user):
+        client = Client()
+        client.force_login(user)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def assert_constant_queries(self, user):
+        self.add_geometries(2)
+        small_count, _ = self.count_queries(user)
+        self.add_geometries(30)
+        large_count, _ = self.count_queries(user)
+        self.assertEqual(small_count, large_count)
+
+    def test_query_count_does_not_grow_for_owner(self):
+        self.assert_constant_queries(self.owner)
+
+    def test_query_count_does_not_grow_for_restricted_user(self):
+        self.assert_constant_queries(self.member)
+
+    def test_page_does_not_embed_geometries(self):
+        self.add_geometries(3)
+        _, response = self.count_queries(self.owner)
+        self.assertNotIn('geometries', response.context)
+        self.assertNotIn('map_data', response.context)
+        self.assertNotContains(response, 'G0001')
+
+    @override_settings(MAP_VECTOR_TILES_MIN_POINTS=3)
+    def test_vector_tile_threshold_is_detected_without_loading_geometries(self):
+        self.add_geometries(2)
+        _, response = self.count_queries(self.owner)
+        self.assertFalse(response.context['use_vector_tiles'])
+
+        self.add_geometries(1)
+        _, response = self.count_queries(self.owner)
+        self.assertTrue(response.context['use_vector_tiles'])
+        self.assertIsNotNone(response.context['map_extent'])
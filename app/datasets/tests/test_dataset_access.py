@@ -0,0 +1,116 @@
+from django.contrib.auth.models import Group, User
+from django.contrib.gis.geos import Point, Polygon
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.access import DatasetAccess, get_dataset_access
+from datasets.models import (
+    DataEntry,
+    DataGeometry,
+    DataSet,
+    DatasetGroupMappingArea,
+    DatasetUserMappingArea,
+    MappingArea,
+)
+
+
+class DatasetAccessTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.group_member = User.objects.create_user(username='group-member', password='pass')
+        self.outsider = User.objects.create_user(username='outsider', password='pass')
+        self.group = Group.objects.create(name='Field team')
+        self.group.user_set.add(self.group_member)
+
+        self.dataset = DataSet.objects.create(name='Survey', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+        self.dataset.shared_with_groups.add(self.group)
+
+        self.west = MappingArea.objects.create(
+            dataset=self.dataset, name='West', created_by=self.owner, geometry=Polygon.from_bbox((0, 0, 1, 1)),
+        )
+        self.east = MappingArea.objects.create(
+            dataset=self.dataset, name='East', created_by=self.owner, geometry=Polygon.from_bbox((2, 0, 3, 1)),
+        )
+        DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=self.west)
+        DatasetGroupMappingArea.objects.create(dataset=self.dataset, group=self.group, mapping_area=self.east)
+        self.group.user_set.add(self.member)
+
+        self.west_point = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='W', address='West', geometry=Point(0.5, 0.5, srid=4326), user=self.owner,
+        )
+        self.far_point = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='F', address='Far', geometry=Point(5, 5, srid=4326), user=self.owner,
+        )
+
+    def test_rights_are_read_with_one_query(self):
+        access = DatasetAccess(self.dataset, self.member)
+        with self.assertNumQueries(1):
+            self.assertTrue(access.can_access)
+            # Direct and group limits are combined
+            self.assertEqual(access.mapping_area_ids, sorted([self.west.id, self.east.id]))
+
+        group_access = DatasetAccess(self.dataset, self.group_member)
+        self.assertTrue(group_access.can_access)
+        self.assertEqual(group_access.mapping_area_ids, [self.east.id])
+
+        self.assertFalse(DatasetAccess(self.dataset, self.outsider).can_access)
+
+    def test_owner_and_superuser_need_no_query(self):
+        admin = User.objects.create_superuser(username='admin', password='pass')
+        for user in (self.owner, admin):
+            access = DatasetAccess(self.dataset, user)
+            with self.assertNumQueries(0):
+                self.assertTrue(access.can_access)
+                self.assertIsNone(access.mapping_area_ids)
+
+    def test_public_datasets_and_unrestricted_users(self):
+        self.dataset.is_public = True
+        self.dataset.save()
+        access = DatasetAccess(self.dataset, self.outsider)
+        self.assertTrue(access.can_access)
+        self.assertIsNone(access.mapping_area_ids)
+        self.assertTrue(access.has_geometry_access(self.far_point))
+
+    def test_geometry_access(self):
+        access = DatasetAccess(self.dataset, self.member)
+        self.assertTrue(access.has_geometry_access(self.west_point))
+        self.assertFalse(access.has_geometry_access(self.far_point))
+        # Unsaved points are checked against the polygons
+        self.assertTrue(access.has_geometry_access(DataGeometry(geometry=Point(2.5, 0.5, srid=4326))))
+        self.assertEqual(
+            list(access.filter_geometries(DataGeometry.objects.filter(dataset=self.dataset)).values_list('id_kurz', flat=True)),
+            ['W'],
+        )
+
+    def test_access_is_memoized_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.member
+        access = get_dataset_access(request, self.dataset)
+        self.assertIs(get_dataset_access(request, self.dataset), access)
+        access.can_access
+        with self.assertNumQueries(0):
+            self.assertTrue(get_dataset_access(request, self.dataset).can_access)
+
+    def test_query_count_does_not_depend_on_sharing(self):
+        entry = DataEntry.objects.create(geometry=self.west_point, name='W', user=self.owner)
+        client = Client()
+        client.force_login(self.member)
+        url = reverse('entry_detail', args=[entry.id])
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(client.get(url).status_code, 200)
+            return len(queries)
+
+        baseline = count_queries()
+        for index in range(30):
+            user = User.objects.create_user(username=f'collaborator-{index}')
+            self.dataset.shared_with.add(user)
+            group = Group.objects.create(name=f'Team {index}')
+            self.dataset.shared_with_groups.add(group)
+            self.member.groups.add(group)
+        self.assertEqual(count_queries(), baseline)
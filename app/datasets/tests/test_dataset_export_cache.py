@@ -0,0 +1,181 @@
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.bulk_delete import delete_dataset_geometries
+from datasets.bulk_import import import_rows
+from datasets.exports import get_dataset_revision
+from datasets.models import DataEntry, DataEntryField, DataGeometry, DataSet, DatasetField, ExportTask, Job
+
+
+class CachedDatasetExportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            EXPORT_BACKGROUND_MIN_ROWS=1,
+            EXPORT_IN_BACKGROUND=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='owner', password='pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dataset = DataSet.objects.create(name='Cached', owner=self.user)
+            geometry = DataGeometry.objects.create(
+                dataset=self.dataset, id_kurz='B1', address='Main Street',
+                geometry=Point(16.0, 48.0, srid=4326), user=self.user,
+            )
+            self.entry = DataEntry.objects.create(geometry=geometry, name='B1', user=self.user)
+            self.height = DataEntryField.objects.create(entry=self.entry, field_name='height', value='12')
+
+        self.url = reverse('dataset_csv_export', args=[self.dataset.id])
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def download(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_export_is_generated_once_and_served_from_disk(self):
+        content = self.download()
+        self.assertIn('ID,Address,X,Y,User,Entry_Name,Year,height', content)
+        self.assertIn('B1,Main Street,16.0,48.0,owner,B1,,12', content)
+
+        task = ExportTask.objects.get(dataset=self.dataset)
+        self.assertEqual(task.export_format, 'csv')
+        self.assertEqual(task.status, 'completed')
+        self.assertTrue(task.file_path.startswith('exports/'))
+
+        # Other users with access reuse the cached file
+        member = User.objects.create_user(username='member', password='pass')
+        self.dataset.shared_with.add(member)
+        client = Client()
+        client.force_login(member)
+        response = client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content).decode('utf-8'), content)
+        self.assertEqual(ExportTask.objects.filter(dataset=self.dataset).count(), 1)
+
+    def test_options_are_part_of_the_cache_key(self):
+        self.download()
+        content = self.download(include_coordinates='false')
+        self.assertIn('ID,Address,User,Entry_Name,Year,height', content)
+        self.assertEqual(ExportTask.objects.filter(dataset=self.dataset).count(), 2)
+
+    def test_changes_produce_a_new_export(self):
+        self.download()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.height.value = '15'
+            self.height.save()
+        self.assertIn('owner,B1,,15', self.download())
+
+        # Field values are deleted with their entry
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.delete()
+        self.assertNotIn(',15', self.download())
+        self.assertEqual(ExportTask.objects.filter(dataset=self.dataset).count(), 3)
+
+    def test_revision_changes_on_deletion(self):
+        revision = get_dataset_revision(self.dataset)
+        with self.captureOnCommitCallbacks(execute=True):
+            DataEntry.objects.create(geometry=self.entry.geometry, name='Second', user=self.user)
+        added = get_dataset_revision(self.dataset)
+        self.assertNotEqual(added, revision)
+        with self.captureOnCommitCallbacks(execute=True):
+            DataEntry.objects.filter(name='Second').delete()
+        self.assertNotEqual(get_dataset_revision(self.dataset), added)
+
+    def test_revision_is_a_single_lookup(self):
+        with self.assertNumQueries(1):
+            get_dataset_revision(self.dataset)
+
+    def test_revision_is_bumped_once_per_transaction(self):
+        dataset_table = f'"{DataSet._meta.db_table}"'
+        revision = DataSet.objects.get(pk=self.dataset.pk).revision
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for value in ('13', '14', '15'):
+                    self.height.value = value
+                    self.height.save()
+                    self.entry.set_field_value('floors', value)
+                # Nothing is written to the dataset row before the commit
+                self.assertFalse([query for query in queries.captured_queries if dataset_table in query['sql']])
+        self.assertTrue(callbacks)
+        self.assertEqual(
+            len([query for query in queries.captured_queries if query['sql'].startswith(f'UPDATE {dataset_table}')]), 1
+        )
+        self.assertEqual(DataSet.objects.get(pk=self.dataset.pk).revision, revision + 1)
+
+    def assertRevisionChanges(self, change):
+        revision = get_dataset_revision(self.dataset)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        self.assertNotEqual(get_dataset_revision(self.dataset), revision)
+
+    def test_bulk_writes_change_the_revision(self):
+        DatasetField.objects.create(dataset=self.dataset, field_name='height', label='Height', field_type='integer')
+        self.assertRevisionChanges(
+            lambda: import_rows(self.dataset, self.user, 4326, [('B2', 16.1, 48.1, [('height', 'text', '7')])], 'orm')
+        )
+        self.assertRevisionChanges(
+            lambda: self.client.post(
+                reverse('save_entries_bulk'),
+                data=json.dumps({
+                    'geometry_id': self.entry.geometry_id,
+                    'entries': [{'id': self.entry.id, 'fields': {'height': 20}}],
+                }),
+                content_type='application/json',
+            )
+        )
+        self.assertRevisionChanges(lambda: delete_dataset_geometries(self.dataset.pk))
+
+    def test_renaming_a_point_creator_changes_the_revision(self):
+        other = DataSet.objects.create(name='Other', owner=self.user)
+        untouched = get_dataset_revision(other)
+
+        def rename():
+            user = User.objects.get(pk=self.user.pk)
+            user.username = 'renamed'
+            user.save()
+        self.assertRevisionChanges(rename)
+        self.assertEqual(get_dataset_revision(other), untouched)
+
+        # Saves that keep the username leave the revision alone
+        revision = get_dataset_revision(self.dataset)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=self.user.pk).save()
+        self.assertEqual(get_dataset_revision(self.dataset), revision)
+
+    @override_settings(EXPORT_IN_BACKGROUND=True)
+    def test_background_export_redirects_to_status_page(self):
+        response = self.client.get(self.url)
+        task = ExportTask.objects.get(dataset=self.dataset)
+        self.assertRedirects(response, reverse('export_task_status', args=[task.task_id]))
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.payload), ('dataset_export', {'task_id': task.task_id}))
+
+        # A repeated request waits for the running task instead of starting another
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse('export_task_status', args=[task.task_id]))
+        self.assertEqual(ExportTask.objects.filter(dataset=self.dataset).count(), 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+        page = self.client.get(reverse('export_task_status', args=[task.task_id]))
+        self.assertContains(page, 'CSV')
+
+    @override_settings(EXPORT_BACKGROUND_MIN_ROWS=100)
+    def test_small_exports_are_streamed_directly(self):
+        self.assertIn('B1,Main Street', self.download())
+        self.assertFalse(ExportTask.objects.exists())
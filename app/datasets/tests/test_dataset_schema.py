@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from datasets.models import DataSet, DatasetField, Typology, TypologyEntry
+from datasets.schema import get_dataset_schema
+
+
+class DatasetSchemaCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='owner', password='pass')
+        self.dataset = DataSet.objects.create(name='Schema', owner=self.user)
+        self.typology = Typology.objects.create(name='Uses', created_by=self.user)
+        TypologyEntry.objects.create(typology=self.typology, code=20, category='Commercial', name='Office')
+        TypologyEntry.objects.create(typology=self.typology, code=10, category='Residential', name='Living')
+
+        self.text_field = DatasetField.objects.create(
+            dataset=self.dataset, field_name='name', label='Name', field_type='text', order=2,
+        )
+        self.last_field = DatasetField.objects.create(
+            dataset=self.dataset, field_name='notes', label='Notes', field_type='textarea', order=-1,
+        )
+        self.use_field = DatasetField.objects.create(
+            dataset=self.dataset, field_name='use', label='Use', field_type='choice',
+            typology=self.typology, order=1,
+        )
+        self.manual_field = DatasetField.objects.create(
+            dataset=self.dataset, field_name='roof', label='Roof', field_type='multiple_choice',
+            choices='flat, gabled,,hipped', order=3, enabled=False,
+        )
+
+    def test_schema_orders_fields_and_resolves_choices(self):
+        schema = get_dataset_schema(self.dataset)
+
+        self.assertEqual([field.field_name for field in schema.fields], ['use', 'name', 'roof', 'notes'])
+        self.assertEqual(schema.enabled_field_names, ['use', 'name', 'notes'])
+        self.assertEqual(schema.field_type('roof'), 'multiple_choice')
+        self.assertEqual(schema.field_type('unknown'), 'text')
+        self.assertIsNone(schema.get('unknown'))
+
+        for field_name in ('use', 'roof'):
+            dataset_field = DatasetField.objects.get(dataset=self.dataset, field_name=field_name)
+            self.assertEqual(list(schema.get(field_name).choices_list), dataset_field.get_choices_list())
+        self.assertEqual(schema.get('use').choice_values, {'10', '20'})
+
+    def test_schema_is_served_from_cache(self):
+        get_dataset_schema(self.dataset)
+        with self.assertNumQueries(0):
+            schema = get_dataset_schema(self.dataset.id)
+        self.assertEqual(len(schema.fields), 4)
+
+    def test_schema_build_query_count_is_constant(self):
+        for index in range(10):
+            DatasetField.objects.create(
+                dataset=self.dataset, field_name=f'extra_{index}', label=f'Extra {index}',
+                field_type='choice', typology=self.typology, order=10 + index,
+            )
+        cache.clear()
+        with self.assertNumQueries(2):
+            get_dataset_schema(self.dataset)
+
+    def test_field_changes_invalidate_schema(self):
+        get_dataset_schema(self.dataset)
+
+        self.text_field.label = 'Building name'
+        self.text_field.save()
+        self.assertEqual(get_dataset_schema(self.dataset).get('name').label, 'Building name')
+
+        self.last_field.delete()
+        self.assertNotIn('notes', get_dataset_schema(self.dataset))
+
+    def test_typology_entry_changes_invalidate_schema(self):
+        get_dataset_schema(self.dataset)
+
+        TypologyEntry.objects.create(typology=self.typology, code=30, category='Public', name='School')
+        self.assertIn('30', get_dataset_schema(self.dataset).get('use').choice_values)
+
+        TypologyEntry.objects.filter(code=10).delete()
+        self.assertNotIn('10', get_dataset_schema(self.dataset).get('use').choice_values)
+
+    def test_typology_deletion_invalidates_schema(self):
+        get_dataset_schema(self.dataset)
+        self.typology.delete()
+
+        use_field = get_dataset_schema(self.dataset).get('use')
+        self.assertIsNone(use_field.typology_id)
+        self.assertEqual(use_field.choices_list, ())
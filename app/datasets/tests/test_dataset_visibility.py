@@ -0,0 +1,120 @@
+from django.contrib.auth.models import Group, User
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.models import DataEntry, DataGeometry, DataSet, DatasetVisibility
+from datasets.visibility import dataset_list_queryset, visible_datasets
+
+
+class DatasetVisibilityTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.group = Group.objects.create(name='Field team')
+        self.dataset = DataSet.objects.create(name='Survey', owner=self.owner)
+
+    def visible(self, user):
+        return set(visible_datasets(user).values_list('name', flat=True))
+
+    def rows(self):
+        return set(DatasetVisibility.objects.values_list('user__username', 'dataset__name'))
+
+    def test_owner_and_direct_sharing(self):
+        self.assertEqual(self.rows(), {('owner', 'Survey')})
+        self.assertEqual(self.visible(self.member), set())
+
+        self.dataset.shared_with.add(self.member)
+        self.assertEqual(self.visible(self.member), {'Survey'})
+        self.dataset.shared_with.remove(self.member)
+        self.assertEqual(self.visible(self.member), set())
+
+        # Changes from the user's side are followed as well
+        self.member.shared_datasets.add(self.dataset)
+        self.assertEqual(self.visible(self.member), {'Survey'})
+        self.member.shared_datasets.clear()
+        self.assertEqual(self.visible(self.member), set())
+
+        self.dataset.owner = self.member
+        self.dataset.save()
+        self.assertEqual(self.rows(), {('member', 'Survey')})
+        self.assertEqual(self.visible(self.owner), set())
+
+    def test_group_sharing_and_membership(self):
+        self.dataset.shared_with_groups.add(self.group)
+        self.assertEqual(self.visible(self.member), set())
+
+        self.member.groups.add(self.group)
+        self.assertEqual(self.visible(self.member), {'Survey'})
+        self.member.groups.remove(self.group)
+        self.assertEqual(self.visible(self.member), set())
+
+        self.group.user_set.add(self.member)
+        self.assertEqual(self.visible(self.member), {'Survey'})
+        self.group.user_set.clear()
+        self.assertEqual(self.visible(self.member), set())
+
+        self.group.user_set.add(self.member)
+        self.group.shared_datasets.clear()
+        self.assertEqual(self.visible(self.member), set())
+
+        self.dataset.shared_with_groups.add(self.group)
+        self.group.delete()
+        self.assertEqual(self.visible(self.member), set())
+        self.assertEqual(self.rows(), {('owner', 'Survey')})
+
+    def test_public_datasets_and_superusers(self):
+        other = User.objects.create_user(username='other', password='pass')
+        DataSet.objects.create(name='Open', owner=other, is_public=True)
+        DataSet.objects.create(name='Private', owner=other)
+        self.assertEqual(self.visible(self.member), {'Open'})
+
+        admin = User.objects.create_superuser(username='admin', password='pass')
+        self.assertEqual(self.visible(admin), {'Survey', 'Open', 'Private'})
+        self.assertEqual(
+            set(visible_datasets(admin, all_for_superusers=False).values_list('name', flat=True)), {'Open'}
+        )
+
+    def test_listing_annotations(self):
+        self.dataset.shared_with.add(self.member)
+        for id_kurz in ('A', 'B'):
+            geometry = DataGeometry.objects.create(
+                dataset=self.dataset, id_kurz=id_kurz, address=id_kurz,
+                geometry=Point(16.0, 48.0, srid=4326), user=self.owner,
+            )
+            DataEntry.objects.create(geometry=geometry, name=id_kurz, user=self.owner)
+        DataEntry.objects.create(geometry=geometry, name='B2', user=self.owner)
+        DataSet.objects.create(name='Empty', owner=self.owner)
+
+        datasets = {dataset.name: dataset for dataset in dataset_list_queryset(self.owner)}
+        self.assertEqual((datasets['Survey'].geometry_count, datasets['Survey'].entry_count), (2, 3))
+        self.assertEqual((datasets['Empty'].geometry_count, datasets['Empty'].entry_count), (0, 0))
+        self.assertTrue(datasets['Survey'].is_shared)
+        self.assertFalse(datasets['Empty'].is_shared)
+
+    def test_list_queries_do_not_grow_with_datasets(self):
+        client = Client()
+        client.force_login(self.member)
+        for index in range(5):
+            group = Group.objects.create(name=f'Team {index}')
+            group.user_set.add(self.member)
+            dataset = DataSet.objects.create(name=f'Shared {index}', owner=self.owner)
+            dataset.shared_with_groups.add(group)
+
+        with CaptureQueriesContext(connection) as baseline:
+            response = client.get(reverse('dataset_list'))
+        self.assertEqual(len(response.context['datasets']), 5)
+        self.assertContains(response, 'Shared 4')
+
+        for index in range(30):
+            DataSet.objects.create(name=f'Public {index}', owner=self.owner, is_public=True)
+        with self.assertNumQueries(len(baseline)):
+            response = client.get(reverse('dataset_list'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 35)
+        self.assertEqual(len(response.context['datasets']), 24)
+
+        response = client.get(reverse('dashboard'), {'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['datasets']), 10)
@@ -0,0 +1,90 @@
+import datetime
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from datasets.file_stats import calculate_file_statistics, get_dataset_file_statistics
+from datasets.models import DataEntry, DataEntryFile, DataGeometry, DataSet
+
+
+class FileStatisticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='owner', password='pass')
+        self.dataset = DataSet.objects.create(name='Photos', owner=self.user)
+        self.entries = {}
+        for id_kurz in ('A1', 'B2'):
+            geometry = DataGeometry.objects.create(
+                dataset=self.dataset, id_kurz=id_kurz, address=f'{id_kurz} Street',
+                geometry=Point(16.0, 48.0, srid=4326), user=self.user,
+            )
+            self.entries[id_kurz] = DataEntry.objects.create(geometry=geometry, name=id_kurz, user=self.user)
+
+        self.add_file('A1', 'front.jpg', 'image/jpeg', 100)
+        self.add_file('A1', 'back.png', 'image/png', 200)
+        self.add_file('B2', 'plan.pdf', 'application/pdf', 300, upload_user=None)
+
+    def add_file(self, id_kurz, filename, file_type, size, upload_user='owner'):
+        return DataEntryFile.objects.create(
+            entry=self.entries[id_kurz], file=SimpleUploadedFile(filename, b'x' * size, content_type=file_type),
+            filename=filename, file_type=file_type, file_size=size,
+            upload_user=self.user if upload_user else None,
+        )
+
+    def test_statistics_are_aggregated(self):
+        DataEntryFile.objects.filter(filename='plan.pdf').update(
+            upload_date=timezone.make_aware(datetime.datetime(2024, 3, 1, 12, 0))
+        )
+        stats = calculate_file_statistics(DataEntryFile.objects.filter(entry__geometry__dataset=self.dataset))
+
+        self.assertEqual(stats['total_files'], 3)
+        self.assertEqual(stats['total_size'], 600)
+        self.assertEqual(stats['file_types'], {'image': 2, 'application': 1})
+        self.assertEqual(stats['users'], {'owner': 2, 'Unknown': 1})
+        self.assertEqual(stats['geometries'], {'A1': 2, 'B2': 1})
+        self.assertEqual(stats['date_range']['earliest'], datetime.date(2024, 3, 1))
+        self.assertEqual(stats['date_range']['latest'], timezone.now().date())
+
+    def test_empty_queryset(self):
+        stats = calculate_file_statistics(DataEntryFile.objects.none())
+        self.assertEqual(stats['total_files'], 0)
+        self.assertEqual(stats['total_size'], 0)
+        self.assertEqual(stats['date_range'], {'earliest': None, 'latest': None})
+
+    def test_query_count_does_not_grow_with_files(self):
+        for index in range(20):
+            self.add_file('B2', f'photo_{index}.jpg', 'image/jpeg', 10)
+        with self.assertNumQueries(4):
+            calculate_file_statistics(DataEntryFile.objects.filter(entry__geometry__dataset=self.dataset))
+
+    def test_dataset_statistics_are_cached_and_invalidated(self):
+        self.assertEqual(get_dataset_file_statistics(self.dataset)['total_files'], 3)
+        with self.assertNumQueries(0):
+            get_dataset_file_statistics(self.dataset.id)
+
+        new_file = self.add_file('B2', 'extra.jpg', 'image/jpeg', 50)
+        self.assertEqual(get_dataset_file_statistics(self.dataset)['total_files'], 4)
+
+        new_file.delete()
+        self.assertEqual(get_dataset_file_statistics(self.dataset)['total_size'], 600)
+
+    def test_export_page_shows_statistics(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('dataset_files_export', args=[self.dataset.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['total_files'], 3)
+        self.assertContains(response, 'Application')
@@ -0,0 +1,129 @@
+import json
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.models import (
+    DataEntry,
+    DataEntryField,
+    DataGeometry,
+    DataSet,
+    DatasetField,
+    DatasetUserMappingArea,
+    ExportTask,
+    MappingArea,
+)
+
+
+class GeoJSONExportTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.dataset = DataSet.objects.create(name='GIS', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+        DatasetField.objects.create(
+            dataset=self.dataset, field_name='uses', label='Uses', field_type='multiple_choice',
+            choices='living,office',
+        )
+        area = MappingArea.objects.create(
+            dataset=self.dataset, name='Inner city',
+            geometry=Polygon.from_bbox((16.0, 48.0, 16.5, 48.5)), created_by=self.owner,
+        )
+        DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=area)
+
+        self.inside = self.add_geometry('IN', 16.25, 48.25, uses='["living", "office"]', height='12')
+        self.outside = self.add_geometry('OUT', 17.0, 49.0, height='3')
+        self.client = Client()
+
+    def add_geometry(self, id_kurz, x, y, **values):
+        geometry = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz=id_kurz, address=f'{id_kurz} Street',
+            geometry=Point(x, y, srid=4326), user=self.owner,
+        )
+        entry = DataEntry.objects.create(geometry=geometry, name=id_kurz, year=2024)
+        for field_name, value in values.items():
+            DataEntryField.objects.create(entry=entry, field_name=field_name, value=value)
+        return geometry
+
+    def export(self, user, name='dataset_geojson_export'):
+        self.client.force_login(user)
+        response = self.client.get(reverse(name, args=[self.dataset.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_feature_collection_carries_field_values(self):
+        response, content = self.export(self.owner)
+        self.assertEqual(response['Content-Type'], 'application/geo+json')
+        data = json.loads(content)
+        self.assertEqual(data['type'], 'FeatureCollection')
+        features = {feature['properties']['ID']: feature for feature in data['features']}
+        self.assertEqual(set(features), {'IN', 'OUT'})
+
+        inside = features['IN']
+        self.assertEqual(inside['geometry']['type'], 'Point')
+        self.assertAlmostEqual(inside['geometry']['coordinates'][0], 16.25)
+        self.assertEqual(inside['properties']['uses'], 'living, office')
+        self.assertEqual(inside['properties']['height'], '12')
+        self.assertEqual(inside['properties']['Year'], 2024)
+        self.assertEqual(inside['properties']['User'], 'owner')
+        self.assertIsNone(features['OUT']['properties']['uses'])
+
+    def test_mapping_area_restrictions_apply(self):
+        _, content = self.export(self.member)
+        ids = [feature['properties']['ID'] for feature in json.loads(content)['features']]
+        self.assertEqual(ids, ['IN'])
+
+    def test_large_exports_are_cached_per_mapping_area_restriction(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root, EXPORT_BACKGROUND_MIN_ROWS=1, EXPORT_IN_BACKGROUND=False):
+            _, content = self.export(self.owner)
+            self.assertEqual(len(json.loads(content)['features']), 2)
+            self.export(self.owner)
+            _, content = self.export(self.member)
+            self.assertEqual([feature['properties']['ID'] for feature in json.loads(content)['features']], ['IN'])
+
+        tasks = ExportTask.objects.filter(dataset=self.dataset, export_format='geojson')
+        self.assertEqual(tasks.count(), 2)
+        self.assertEqual(
+            sorted(task.export_options['mapping_area_ids'] is None for task in tasks), [False, True]
+        )
+
+    def test_newline_delimited_export(self):
+        response, content = self.export(self.owner, 'dataset_ndjson_export')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = content.splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(content.endswith('\n'))
+        self.assertEqual({json.loads(line)['properties']['ID'] for line in lines}, {'IN', 'OUT'})
+
+    def test_empty_dataset_is_valid_geojson(self):
+        DataGeometry.objects.filter(dataset=self.dataset).delete()
+        _, content = self.export(self.owner)
+        self.assertEqual(json.loads(content)['features'], [])
+
+    def test_query_count_does_not_grow_with_features(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.export(self.owner)
+            return len(context.captured_queries)
+
+        self.export(self.owner)  # Warm the cached field schema
+        small = count_queries()
+        for index in range(10):
+            self.add_geometry(f'X{index}', 16.1, 48.1, uses='["office"]', floors=str(index))
+        self.assertEqual(count_queries(), small)
+
+    def test_access_denied_for_other_users(self):
+        self.client.force_login(User.objects.create_user(username='stranger', password='pass'))
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.client.get(reverse('dataset_ndjson_export', args=[self.dataset.id]))
+        self.assertEqual(response.status_code, 403)
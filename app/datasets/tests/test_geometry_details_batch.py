@@ -0,0 +1,122 @@
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.models import (
+    DataEntry,
+    DataEntryField,
+    DataGeometry,
+    DataSet,
+    DatasetField,
+    DatasetUserMappingArea,
+    MappingArea,
+)
+
+
+class GeometryDetailsTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.dataset = DataSet.objects.create(name='Details', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+
+        for order, (name, field_type) in enumerate([('height', 'integer'), ('roof', 'text'), ('notes', 'textarea')]):
+            DatasetField.objects.create(
+                dataset=self.dataset, field_name=name, label=name.title(),
+                field_type=field_type, enabled=True, order=order,
+            )
+        DatasetField.objects.create(
+            dataset=self.dataset, field_name='hidden', label='Hidden',
+            field_type='text', enabled=False, order=10,
+        )
+
+        self.inside = self.create_geometry('IN', Point(16.37, 48.21, srid=4326), entries=3)
+        self.outside = self.create_geometry('OUT', Point(12.0, 47.0, srid=4326), entries=1)
+
+        self.owner_client = Client()
+        self.owner_client.force_login(self.owner)
+        self.member_client = Client()
+        self.member_client.force_login(self.member)
+        self.batch_url = reverse('geometry_details_batch')
+
+    def create_geometry(self, id_kurz, point, entries):
+        geometry = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz=id_kurz, address=id_kurz, geometry=point, user=self.owner,
+        )
+        for index in range(entries):
+            entry = DataEntry.objects.create(geometry=geometry, name=f'{id_kurz}-{index}', user=self.owner)
+            DataEntryField.objects.create(entry=entry, field_name='height', value=str(index), field_type='integer')
+            DataEntryField.objects.create(entry=entry, field_name='roof', value='flat', field_type='text')
+            DataEntryField.objects.create(entry=entry, field_name='hidden', value='secret', field_type='text')
+        return geometry
+
+    def test_details_pivot_field_values(self):
+        response = self.owner_client.get(reverse('geometry_details', args=[self.inside.id]))
+        geometry = response.json()['geometry']
+
+        self.assertEqual(len(geometry['entries']), 3)
+        entry = next(entry for entry in geometry['entries'] if entry['name'] == 'IN-2')
+        self.assertEqual(entry['height'], 2)
+        self.assertEqual(entry['roof'], 'flat')
+        self.assertIsNone(entry['notes'])
+        self.assertNotIn('hidden', entry)
+
+    def test_details_query_count_does_not_depend_on_entries(self):
+        url_small = reverse('geometry_details', args=[self.outside.id])
+        url_large = reverse('geometry_details', args=[self.inside.id])
+        with CaptureQueriesContext(connection) as small:
+            self.owner_client.get(url_small)
+        with CaptureQueriesContext(connection) as large:
+            self.owner_client.get(url_large)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_batch_returns_details_for_all_ids(self):
+        response = self.owner_client.get(self.batch_url, {'ids': f'{self.inside.id},{self.outside.id}'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual([geometry['id'] for geometry in data['geometries']], sorted([self.inside.id, self.outside.id]))
+        self.assertEqual(data['missing'], [])
+
+        single = self.owner_client.get(reverse('geometry_details', args=[self.inside.id])).json()['geometry']
+        batched = next(geometry for geometry in data['geometries'] if geometry['id'] == self.inside.id)
+        self.assertEqual(batched, single)
+
+    def test_batch_respects_mapping_area_limits(self):
+        area = MappingArea.objects.create(
+            dataset=self.dataset,
+            name='Vienna',
+            geometry=Polygon.from_bbox((16.0, 48.0, 17.0, 49.0)),
+            created_by=self.owner,
+        )
+        DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=area)
+
+        data = self.member_client.get(self.batch_url, {'ids': f'{self.inside.id},{self.outside.id}'}).json()
+        self.assertEqual([geometry['id'] for geometry in data['geometries']], [self.inside.id])
+        self.assertEqual(data['missing'], [self.outside.id])
+
+    def test_batch_hides_inaccessible_datasets(self):
+        stranger = User.objects.create_user(username='stranger', password='pass')
+        client = Client()
+        client.force_login(stranger)
+        data = client.get(self.batch_url, {'ids': str(self.inside.id)}).json()
+        self.assertEqual(data['geometries'], [])
+        self.assertEqual(data['missing'], [self.inside.id])
+
+    def test_batch_rejects_invalid_ids(self):
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.owner_client.get(self.batch_url, {'ids': '1,abc'})
+        self.assertEqual(response.status_code, 400)
+
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.owner_client.get(self.batch_url)
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_limits_number_of_ids(self):
+        ids = ','.join(str(value) for value in range(1, 200))
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.owner_client.get(self.batch_url, {'ids': ids})
+        self.assertEqual(response.status_code, 400)
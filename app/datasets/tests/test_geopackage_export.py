@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from datasets.models import (
+    DataEntry,
+    DataEntryField,
+    DataGeometry,
+    DataSet,
+    DatasetField,
+    DatasetUserMappingArea,
+    ExportTask,
+    Job,
+    MappingArea,
+)
+
+try:
+    from osgeo import ogr
+except ImportError:  # GDAL Python bindings are optional outside the Docker image
+    ogr = None
+
+
+@unittest.skipUnless(ogr, 'GDAL Python bindings are not installed')
+class GeoPackageExportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, EXPORT_IN_BACKGROUND=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.dataset = DataSet.objects.create(name='GIS', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+        DatasetField.objects.create(dataset=self.dataset, field_name='floors', label='Floors', field_type='integer')
+        DatasetField.objects.create(dataset=self.dataset, field_name='heated', label='Heated', field_type='boolean')
+        DatasetField.objects.create(dataset=self.dataset, field_name='surveyed', label='Surveyed', field_type='date')
+        DatasetField.objects.create(dataset=self.dataset, field_name='id', label='Local ID', field_type='text')
+        area = MappingArea.objects.create(
+            dataset=self.dataset, name='Inner city',
+            geometry=Polygon.from_bbox((16.0, 48.0, 16.5, 48.5)), created_by=self.owner,
+        )
+        DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=area)
+
+        self.add_geometry('IN', 16.25, 48.25, floors='4', heated='true', surveyed='2024-05-01', id='local-1')
+        self.add_geometry('OUT', 17.0, 49.0, floors='many')
+        self.url = reverse('dataset_geopackage_export', args=[self.dataset.id])
+        self.client = Client()
+
+    def add_geometry(self, id_kurz, x, y, **values):
+        geometry = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz=id_kurz, address=f'{id_kurz} Street',
+            geometry=Point(x, y, srid=4326), user=self.owner,
+        )
+        entry = DataEntry.objects.create(geometry=geometry, name=id_kurz, year=2024)
+        for field_name, value in values.items():
+            DataEntryField.objects.create(entry=entry, field_name=field_name, value=value)
+
+    def export(self, user):
+        self.client.force_login(user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/geopackage+sqlite3')
+        b''.join(response.streaming_content)
+        task = ExportTask.objects.filter(user=user, export_format='gpkg').latest('created_at')
+        return Path(settings.MEDIA_ROOT) / task.file_path
+
+    def read_features(self, path):
+        data_source = ogr.Open(str(path))
+        layer = data_source.GetLayerByName('entries')
+        definition = layer.GetLayerDefn()
+        columns = [definition.GetFieldDefn(index) for index in range(definition.GetFieldCount())]
+        features = {feature.GetField('ID'): feature for feature in layer}
+        return data_source, {column.GetName(): column for column in columns}, features
+
+    def test_geopackage_has_typed_columns(self):
+        path = self.export(self.owner)
+        # data_source is kept referenced because OGR frees the column
+        # definitions with it; it is closed when the test returns
+        data_source, columns, features = self.read_features(path)
+
+        self.assertEqual(columns['floors'].GetType(), ogr.OFTInteger64)
+        self.assertEqual(columns['heated'].GetSubType(), ogr.OFSTBoolean)
+        self.assertEqual(columns['surveyed'].GetType(), ogr.OFTDate)
+        # Column names are unique regardless of case
+        self.assertIn('id_2', columns)
+
+        self.assertEqual(set(features), {'IN', 'OUT'})
+        inside = features['IN']
+        self.assertEqual(inside.GetField('floors'), 4)
+        self.assertEqual(inside.GetField('heated'), 1)
+        self.assertEqual(inside.GetField('surveyed'), '2024/05/01')
+        self.assertEqual(inside.GetField('id_2'), 'local-1')
+        self.assertAlmostEqual(inside.GetGeometryRef().GetX(), 16.25)
+        # Values that do not match the field type are left empty
+        self.assertFalse(features['OUT'].IsFieldSet('floors'))
+
+    def test_mapping_area_restrictions_apply_and_are_cached_separately(self):
+        _, _, features = self.read_features(self.export(self.member))
+        self.assertEqual(set(features), {'IN'})
+
+        self.export(self.owner)
+        self.export(self.member)
+        self.assertEqual(ExportTask.objects.filter(export_format='gpkg').count(), 2)
+
+    @override_settings(EXPORT_IN_BACKGROUND=True)
+    def test_export_runs_as_background_task(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(self.url)
+        task = ExportTask.objects.get(export_format='gpkg')
+        self.assertTrue(Job.objects.filter(kind='dataset_export', payload__task_id=task.task_id).exists())
+        self.assertRedirects(response, reverse('export_task_status', args=[task.task_id]))
+        self.assertContains(self.client.get(reverse('export_task_status', args=[task.task_id])), 'GeoPackage')
@@ -0,0 +1,187 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from datasets.exports import EXPORT_FORMATS
+from datasets.jobs import JOB_HANDLERS, claim_job, delete_old_jobs, enqueue_job, register_job, run_job, work
+from datasets.models import DataEntry, DataEntryFile, DataGeometry, DataSet, ExportTask, Job
+from datasets.tasks import start_dataset_export_task, start_export_task
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.failures = 0
+
+        @register_job('test_job')
+        def handler(value):
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError('Temporary failure')
+            self.calls.append(value)
+
+        self.addCleanup(JOB_HANDLERS.pop, 'test_job')
+
+    def test_job_is_claimed_and_run(self):
+        job = enqueue_job('test_job', value=42)
+        self.assertEqual(job.status, 'queued')
+
+        claimed = claim_job('worker-1')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual((claimed.status, claimed.attempts, claimed.locked_by), ('running', 1, 'worker-1'))
+        # A running job is not handed to another worker
+        self.assertIsNone(claim_job('worker-2'))
+
+        run_job(claimed)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.locked_by, '')
+        self.assertIsNotNone(job.completed_at)
+        self.assertEqual(self.calls, [42])
+
+    @override_settings(JOB_MAX_ATTEMPTS=2, JOB_RETRY_DELAY=60)
+    def test_failed_job_is_retried_until_max_attempts(self):
+        self.failures = 5
+        job = enqueue_job('test_job', value=1)
+
+        run_job(claim_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.last_error, 'Temporary failure')
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=30))
+        # The retry is not due yet
+        self.assertIsNone(claim_job('worker-1'))
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_job(claim_job('worker-1'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(self.calls, [])
+
+    def test_job_without_heartbeat_is_claimed_again(self):
+        job = enqueue_job('test_job', value=7)
+        claim_job('worker-1')
+        self.assertIsNone(claim_job('worker-2'))
+
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        claimed = claim_job('worker-2')
+        self.assertEqual((claimed.pk, claimed.attempts, claimed.locked_by), (job.pk, 2, 'worker-2'))
+
+    def test_result_of_reclaimed_job_is_discarded(self):
+        job = enqueue_job('test_job', value=7)
+        first = claim_job('worker-1')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        claim_job('worker-2')
+
+        run_job(first)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('running', 'worker-2'))
+
+    def test_old_jobs_are_deleted(self):
+        old = enqueue_job('test_job', value=1)
+        recent = enqueue_job('test_job', value=2)
+        queued = enqueue_job('test_job', value=3)
+        Job.objects.filter(pk=old.pk).update(status='completed', completed_at=timezone.now() - timedelta(days=31))
+        Job.objects.filter(pk=recent.pk).update(status='failed', completed_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(delete_old_jobs(), 1)
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)), {recent.pk, queued.pk})
+
+    def test_work_runs_due_jobs_once(self):
+        enqueue_job('test_job', value='a')
+        enqueue_job('test_job', value='b')
+        work('worker-1', once=True)
+        self.assertEqual(self.calls, ['a', 'b'])
+        self.assertEqual(Job.objects.filter(status='completed').count(), 2)
+
+    def test_unknown_job_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue_job('missing_job')
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, EXPORT_IN_BACKGROUND=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='owner', password='pass')
+        self.dataset = DataSet.objects.create(name='Files', owner=self.user)
+        geometry = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='P1', address='Photo Street',
+            geometry=Point(16.0, 48.0, srid=4326), user=self.user,
+        )
+        entry = DataEntry.objects.create(geometry=geometry, name='P1', user=self.user)
+        DataEntryFile.objects.create(
+            entry=entry, file=SimpleUploadedFile('notes.txt', b'notes', content_type='text/plain'),
+            filename='notes.txt', file_type='text/plain', file_size=5, upload_user=self.user,
+        )
+
+    def test_zip_export_is_queued_and_run_by_a_worker(self):
+        task = start_export_task(self.dataset.id, self.user.id, file_types=['all'])
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'pending')
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.payload), ('zip_export', {'task_id': task.task_id}))
+
+        work('worker-1', once=True)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+        self.assertTrue(task.file_path)
+
+    def test_failed_export_is_retried(self):
+        calls = []
+
+        def flaky_writer(dataset, path, options, user):
+            calls.append(path)
+            if len(calls) == 1:
+                raise OSError('Disk full')
+            path.write_text('id\n')
+
+        with mock.patch.dict(EXPORT_FORMATS['csv'], writer=flaky_writer):
+            task = start_dataset_export_task(self.dataset, self.user, 'csv', {}, 'key')
+            work('worker-1', once=True)
+            job = Job.objects.get()
+            self.assertEqual((job.status, job.last_error), ('queued', 'Disk full'))
+            # Users see the export as running until the job is given up
+            task.refresh_from_db()
+            self.assertEqual((task.status, task.error_message), ('processing', 'Disk full'))
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            work('worker-1', once=True)
+        task.refresh_from_db()
+        job.refresh_from_db()
+        self.assertEqual((task.status, job.status, len(calls)), ('completed', 'completed', 2))
+        self.assertIsNone(task.error_message)
+
+    def test_task_of_given_up_job_is_marked_failed(self):
+        task = start_export_task(self.dataset.id, self.user.id, file_types=['all'])
+        # The worker running the last attempt was lost
+        Job.objects.update(
+            status='running', attempts=3, max_attempts=3, locked_by='worker-1',
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        ExportTask.objects.filter(pk=task.pk).update(status='processing')
+
+        work('worker-2', once=True)
+        task.refresh_from_db()
+        self.assertEqual(Job.objects.get().status, 'failed')
+        self.assertEqual(task.status, 'failed')
+        self.assertIn('Gave up', task.error_message)
+
+    def test_completed_tasks_are_not_run_again(self):
+        task = start_export_task(self.dataset.id, self.user.id, file_types=['all'])
+        ExportTask.objects.filter(pk=task.pk).update(status='completed')
+        work('worker-1', once=True)
+        task.refresh_from_db()
+        self.assertIsNone(task.file_path)
+        self.assertEqual(Job.objects.get().status, 'completed')
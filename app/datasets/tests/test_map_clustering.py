@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from datasets.models import DataEntry, DataGeometry, DataSet, DatasetUserMappingArea, MappingArea
+
+
+@override_settings(MAP_CLUSTER_MAX_ZOOM=15, MAP_CLUSTER_CELL_PIXELS=60)
+class MapDataClusteringTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.dataset = DataSet.objects.create(name='Clusters', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+
+        # Two neighbouring points and one far away
+        self.near_a = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='A', address='A',
+            geometry=Point(16.3700, 48.2100, srid=4326), user=self.owner,
+        )
+        self.near_b = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='B', address='B',
+            geometry=Point(16.3701, 48.2101, srid=4326), user=self.owner,
+        )
+        self.far = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='C', address='C',
+            geometry=Point(12.0, 47.0, srid=4326), user=self.owner,
+        )
+        DataEntry.objects.create(geometry=self.near_a, name='A1', user=self.owner)
+        DataEntry.objects.create(geometry=self.near_a, name='A2', user=self.owner)
+        DataEntry.objects.create(geometry=self.near_b, name='B1', user=self.owner)
+
+        self.url = reverse('dataset_map_data', args=[self.dataset.id])
+        self.owner_client = Client()
+        self.owner_client.force_login(self.owner)
+        self.member_client = Client()
+        self.member_client.force_login(self.member)
+
+    def test_low_zoom_returns_clusters(self):
+        response = self.owner_client.get(self.url, {'zoom': 8})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['clustered'])
+        self.assertNotIn('map_data', data)
+
+        clusters = sorted(data['clusters'], key=lambda cluster: cluster['count'])
+        self.assertEqual([cluster['count'] for cluster in clusters], [1, 2])
+        self.assertEqual(clusters[0]['id'], self.far.id)
+        self.assertEqual(clusters[0]['entries_count'], 0)
+        self.assertNotIn('id', clusters[1])
+        self.assertEqual(clusters[1]['entries_count'], 3)
+        self.assertAlmostEqual(clusters[1]['lat'], 48.21005, places=4)
+        self.assertAlmostEqual(clusters[1]['lng'], 16.37005, places=4)
+
+    def test_high_zoom_returns_individual_points(self):
+        response = self.owner_client.get(self.url, {'zoom': 16})
+        data = response.json()
+        self.assertFalse(data['clustered'])
+        self.assertEqual(len(data['map_data']), 3)
+
+    def test_without_zoom_returns_individual_points(self):
+        data = self.owner_client.get(self.url).json()
+        self.assertFalse(data['clustered'])
+        self.assertEqual(len(data['map_data']), 3)
+
+    def test_invalid_zoom_is_ignored(self):
+        data = self.owner_client.get(self.url, {'zoom': 'abc'}).json()
+        self.assertFalse(data['clustered'])
+
+    def test_clusters_respect_mapping_area_limits(self):
+        area = MappingArea.objects.create(
+            dataset=self.dataset,
+            name='Vienna',
+            geometry=Polygon.from_bbox((16.0, 48.0, 16.5, 48.5)),
+            created_by=self.owner,
+        )
+        DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=area)
+
+        data = self.member_client.get(self.url, {'zoom': 8}).json()
+        self.assertTrue(data['clustered'])
+        self.assertEqual(len(data['clusters']), 1)
+        self.assertEqual(data['clusters'][0]['count'], 2)
+        self.assertEqual(data['clusters'][0]['entries_count'], 3)
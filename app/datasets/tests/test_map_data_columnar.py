@@ -0,0 +1,94 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from datasets.models import DataGeometry, DataSet
+
+
+def decode_columnar(columns):
+    """Python mirror of decodeColumnarMapData() in data-input.js."""
+    scale = 10 ** columns['precision']
+    lat = lng = 0
+    points = []
+    for i in range(columns['count']):
+        lat += columns['lat'][i]
+        lng += columns['lng'][i]
+        points.append({
+            'id': columns['id'][i],
+            'id_kurz': columns['id_kurz'][i],
+            'address': columns['address'][i],
+            'lat': lat / scale,
+            'lng': lng / scale,
+            'user': columns['users'][columns['user'][i]],
+        })
+    return points
+
+
+class ColumnarMapDataTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.collector = User.objects.create_user(username='collector', password='pass')
+        self.dataset = DataSet.objects.create(name='Columnar', owner=self.owner)
+
+        for index in range(20):
+            DataGeometry.objects.create(
+                dataset=self.dataset,
+                id_kurz=f'P{index:03d}',
+                address=f'Street {index}',
+                geometry=Point(16.37 + index * 0.001, 48.21 - index * 0.0005, srid=4326),
+                user=self.owner if index % 2 else self.collector,
+            )
+        DataGeometry.objects.create(
+            dataset=self.dataset,
+            id_kurz='ORPHAN',
+            address='No user',
+            geometry=Point(16.5, 48.3, srid=4326),
+            user=None,
+        )
+
+        self.url = reverse('dataset_map_data', args=[self.dataset.id])
+        self.client = Client()
+        self.client.force_login(self.owner)
+
+    def test_columnar_matches_default_format(self):
+        default_points = self.client.get(self.url).json()['map_data']
+        columns = self.client.get(self.url, {'format': 'columnar'}).json()['map_data']
+
+        self.assertEqual(columns['format'], 'columnar')
+        self.assertEqual(columns['count'], len(default_points))
+
+        decoded = {point['id']: point for point in decode_columnar(columns)}
+        for point in default_points:
+            other = decoded[point['id']]
+            self.assertEqual(other['id_kurz'], point['id_kurz'])
+            self.assertEqual(other['address'], point['address'])
+            self.assertEqual(other['user'], point['user'])
+            self.assertAlmostEqual(other['lat'], point['lat'], places=6)
+            self.assertAlmostEqual(other['lng'], point['lng'], places=6)
+
+    def test_usernames_are_stored_once(self):
+        columns = self.client.get(self.url, {'format': 'columnar'}).json()['map_data']
+        self.assertCountEqual(columns['users'], ['owner', 'collector', 'Unknown'])
+        self.assertTrue(all(isinstance(index, int) for index in columns['user']))
+
+    def test_coordinates_are_delta_encoded_integers(self):
+        columns = self.client.get(self.url, {'format': 'columnar'}).json()['map_data']
+        self.assertTrue(all(isinstance(value, int) for value in columns['lat'] + columns['lng']))
+        # After the first point, neighbouring points produce small deltas
+        self.assertTrue(all(abs(delta) <= 1500 for delta in columns['lng'][1:20]))
+
+    def test_columnar_payload_is_smaller(self):
+        default_size = len(self.client.get(self.url).content)
+        columnar_size = len(self.client.get(self.url, {'format': 'columnar'}).content)
+        self.assertLess(columnar_size, default_size)
+
+    def test_data_input_script_decodes_columnar_format(self):
+        js_file_path = os.path.join(settings.STATICFILES_DIRS[0], 'js', 'data-input.js')
+        with open(js_file_path, encoding='utf-8') as handle:
+            js_content = handle.read()
+        self.assertIn('function decodeColumnarMapData', js_content)
+        self.assertIn("format: 'columnar'", js_content)
@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from datasets.bulk_delete import delete_dataset_geometries
+from datasets.models import (
+    DataGeometry,
+    DataGeometryTombstone,
+    DataSet,
+    DatasetUserMappingArea,
+    MappingArea,
+)
+
+
+class MapDataDeltaSyncTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.dataset = DataSet.objects.create(name='Delta', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+
+        self.first = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='A', address='A',
+            geometry=Point(16.37, 48.21, srid=4326), user=self.owner,
+        )
+        self.second = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='B', address='B',
+            geometry=Point(16.38, 48.22, srid=4326), user=self.owner,
+        )
+        # Pretend both points were synced a while ago
+        self.synced_at = timezone.now() - timedelta(hours=1)
+        DataGeometry.objects.filter(dataset=self.dataset).update(
+            updated_at=self.synced_at - timedelta(minutes=5)
+        )
+
+        self.url = reverse('dataset_map_data', args=[self.dataset.id])
+        self.owner_client = Client()
+        self.owner_client.force_login(self.owner)
+        self.member_client = Client()
+        self.member_client.force_login(self.member)
+
+    def get_delta(self, client=None, **params):
+        params.setdefault('since', self.synced_at.isoformat())
+        response = (client or self.owner_client).get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_full_response_includes_cursor(self):
+        data = self.owner_client.get(self.url).json()
+        self.assertFalse(data['delta'])
+        self.assertIn('cursor', data)
+        self.assertNotIn('deleted', data)
+        self.assertEqual(len(data['map_data']), 2)
+
+    def test_delta_returns_only_changed_geometries(self):
+        self.assertEqual(self.get_delta()['map_data'], [])
+
+        self.second.address = 'Moved'
+        self.second.save()
+
+        data = self.get_delta()
+        self.assertTrue(data['delta'])
+        self.assertEqual([point['id'] for point in data['map_data']], [self.second.id])
+        self.assertEqual(data['map_data'][0]['address'], 'Moved')
+        self.assertEqual(data['deleted'], [])
+
+    def test_delta_supports_columnar_format(self):
+        self.first.save()
+        data = self.get_delta(format='columnar')
+        self.assertEqual(data['map_data']['count'], 1)
+        self.assertEqual(data['map_data']['id'], [self.first.id])
+
+    def test_deleted_geometry_is_reported(self):
+        deleted_id = self.first.id
+        self.first.delete()
+
+        self.assertTrue(
+            DataGeometryTombstone.objects.filter(dataset=self.dataset, geometry_id=deleted_id).exists()
+        )
+        data = self.get_delta()
+        self.assertEqual(data['deleted'], [deleted_id])
+        self.assertEqual(data['map_data'], [])
+
+    def test_old_tombstones_are_not_reported(self):
+        deleted_id = self.first.id
+        self.first.delete()
+        DataGeometryTombstone.objects.filter(geometry_id=deleted_id).update(
+            deleted_at=self.synced_at - timedelta(minutes=5)
+        )
+        self.assertEqual(self.get_delta()['deleted'], [])
+
+    def test_geometry_leaving_mapping_area_is_reported_as_deleted(self):
+        area = MappingArea.objects.create(
+            dataset=self.dataset,
+            name='Around A',
+            geometry=Polygon.from_bbox((16.36, 48.20, 16.375, 48.215)),
+            created_by=self.owner,
+        )
+        DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=area)
+        # The restriction was in place when the client last synced
+        DataSet.objects.filter(pk=self.dataset.pk).update(access_changed_at=self.synced_at - timedelta(minutes=5))
+
+        self.first.geometry = Point(16.5, 48.5, srid=4326)
+        self.first.save()
+
+        data = self.get_delta(client=self.member_client)
+        self.assertEqual(data['map_data'], [])
+        self.assertEqual(data['deleted'], [self.first.id])
+
+    def test_changed_mapping_area_restrictions_force_a_full_reload(self):
+        area = MappingArea.objects.create(
+            dataset=self.dataset,
+            name='Around A',
+            geometry=Polygon.from_bbox((16.36, 48.20, 16.375, 48.215)),
+            created_by=self.owner,
+        )
+        allocation = DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=area)
+
+        # B was never changed, but is no longer visible to the member
+        data = self.get_delta(client=self.member_client)
+        self.assertFalse(data['delta'])
+        self.assertEqual([point['id'] for point in data['map_data']], [self.first.id])
+
+        # Cursors from after the change receive deltas again
+        later = timezone.now() + timedelta(seconds=10)
+        self.assertTrue(self.get_delta(client=self.member_client, since=later.isoformat())['delta'])
+
+        DataSet.objects.filter(pk=self.dataset.pk).update(access_changed_at=None)
+        allocation.delete()
+        self.assertFalse(self.get_delta(client=self.member_client)['delta'])
+
+        DataSet.objects.filter(pk=self.dataset.pk).update(access_changed_at=None)
+        area.geometry = Polygon.from_bbox((16.0, 48.0, 17.0, 49.0))
+        area.save()
+        self.assertFalse(self.get_delta(client=self.member_client)['delta'])
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.owner_client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Invalid cursor')
+
+    def test_deleting_dataset_removes_tombstones(self):
+        self.first.delete()
+        self.dataset.delete()
+        self.assertFalse(DataGeometryTombstone.objects.exists())
+
+    def test_clearing_dataset_writes_tombstones_in_one_statement(self):
+        ids = sorted([self.first.id, self.second.id])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(delete_dataset_geometries(self.dataset.id), 2)
+        tombstone_inserts = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith(f'INSERT INTO {DataGeometryTombstone._meta.db_table}')
+        ]
+        self.assertEqual(len(tombstone_inserts), 1)
+        self.assertEqual(sorted(self.get_delta()['deleted']), ids)
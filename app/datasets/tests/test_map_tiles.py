@@ -0,0 +1,141 @@
+import math
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from datasets.models import DataGeometry, DataSet, DatasetUserMappingArea, MappingArea
+from datasets.views.dataset_views import _tile_bounds
+
+
+def _tile_for(lng, lat, zoom):
+    """Return the XYZ tile containing the given WGS84 coordinate."""
+    n = 2 ** zoom
+    x = int((lng + 180.0) / 360.0 * n)
+    lat_rad = math.radians(lat)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return x, y
+
+
+class CollectedStaticFilesTests(TestCase):
+    def test_collected_map_scripts_match_their_sources(self):
+        # STATIC_ROOT is checked in; the map must load tiles from either tree
+        for path in ('js/data-input.js', 'css/data-input.css'):
+            with self.subTest(path=path):
+                source = (settings.BASE_DIR / 'static' / path).read_text(encoding='utf-8')
+                collected = (settings.STATIC_ROOT / path).read_text(encoding='utf-8')
+                self.assertEqual(collected, source)
+        script = (settings.STATIC_ROOT / 'js' / 'data-input.js').read_text(encoding='utf-8')
+        self.assertIn('function loadVectorTiles', script)
+
+
+class TileBoundsTests(TestCase):
+    def test_world_tile_covers_web_mercator_extent(self):
+        west, south, east, north = _tile_bounds(0, 0, 0)
+        self.assertAlmostEqual(west, -180.0)
+        self.assertAlmostEqual(east, 180.0)
+        self.assertAlmostEqual(north, 85.0511, places=3)
+        self.assertAlmostEqual(south, -85.0511, places=3)
+
+    def test_tile_contains_point(self):
+        x, y = _tile_for(16.37, 48.21, 14)
+        west, south, east, north = _tile_bounds(14, x, y)
+        self.assertTrue(west <= 16.37 <= east)
+        self.assertTrue(south <= 48.21 <= north)
+
+
+class DatasetMapTileViewTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.outsider = User.objects.create_user(username='outsider', password='pass')
+
+        self.dataset = DataSet.objects.create(name='Tiles', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+
+        self.inside = DataGeometry.objects.create(
+            dataset=self.dataset,
+            id_kurz='IN',
+            address='Inside',
+            geometry=Point(16.37, 48.21, srid=4326),
+            user=self.owner,
+        )
+        self.outside = DataGeometry.objects.create(
+            dataset=self.dataset,
+            id_kurz='OUT',
+            address='Outside',
+            geometry=Point(16.60, 48.40, srid=4326),
+            user=self.owner,
+        )
+        self.area = MappingArea.objects.create(
+            dataset=self.dataset,
+            name='Center',
+            geometry=Polygon.from_bbox((16.3, 48.1, 16.45, 48.3)),
+            created_by=self.owner,
+        )
+
+        self.owner_client = Client()
+        self.owner_client.force_login(self.owner)
+        self.member_client = Client()
+        self.member_client.force_login(self.member)
+        self.outsider_client = Client()
+        self.outsider_client.force_login(self.outsider)
+
+    def _tile_url(self, point, zoom=14):
+        x, y = _tile_for(point.geometry.x, point.geometry.y, zoom)
+        return reverse('dataset_map_tile', args=[self.dataset.id, zoom, x, y])
+
+    def test_tile_returns_vector_tile(self):
+        response = self.owner_client.get(self._tile_url(self.inside))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertGreater(len(response.content), 0)
+        self.assertIn(b'geometries', response.content)
+        self.assertIn(b'IN', response.content)
+
+    def test_empty_tile_has_no_content(self):
+        url = reverse('dataset_map_tile', args=[self.dataset.id, 14, 0, 0])
+        response = self.owner_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+
+    def test_tile_respects_mapping_area_limits(self):
+        DatasetUserMappingArea.objects.create(
+            dataset=self.dataset,
+            user=self.member,
+            mapping_area=self.area,
+        )
+
+        inside_response = self.member_client.get(self._tile_url(self.inside))
+        self.assertGreater(len(inside_response.content), 0)
+
+        outside_response = self.member_client.get(self._tile_url(self.outside))
+        self.assertEqual(outside_response.status_code, 200)
+        self.assertEqual(outside_response.content, b'')
+
+    def test_tile_requires_dataset_access(self):
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.outsider_client.get(self._tile_url(self.inside))
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_tile_coordinates_rejected(self):
+        url = reverse('dataset_map_tile', args=[self.dataset.id, 2, 4, 0])
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.owner_client.get(url)
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(MAP_VECTOR_TILES_MIN_POINTS=2)
+    def test_data_input_switches_to_vector_tiles_for_large_datasets(self):
+        response = self.owner_client.get(reverse('dataset_data_input', args=[self.dataset.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['use_vector_tiles'])
+        self.assertIsNotNone(response.context['map_extent'])
+        self.assertContains(response, 'window.useVectorTiles = true')
+
+    @override_settings(MAP_VECTOR_TILES_MIN_POINTS=100)
+    def test_data_input_uses_markers_for_small_datasets(self):
+        response = self.owner_client.get(reverse('dataset_data_input', args=[self.dataset.id]))
+        self.assertFalse(response.context['use_vector_tiles'])
+        self.assertContains(response, 'window.useVectorTiles = false')
@@ -0,0 +1,90 @@
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.test import TestCase
+
+from datasets.membership import rebuild_dataset_membership
+from datasets.models import (
+    DataGeometry,
+    DataSet,
+    DatasetUserMappingArea,
+    MappingArea,
+    MappingAreaMembership,
+)
+
+
+class MappingAreaMembershipTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.member = User.objects.create_user(username='member', password='pass')
+        self.dataset = DataSet.objects.create(name='Areas', owner=self.owner)
+        self.dataset.shared_with.add(self.member)
+
+        self.area = MappingArea.objects.create(
+            dataset=self.dataset, name='West', created_by=self.owner,
+            geometry=Polygon.from_bbox((0, 0, 1, 1)),
+        )
+        DatasetUserMappingArea.objects.create(dataset=self.dataset, user=self.member, mapping_area=self.area)
+        self.inside = self.add_geometry('IN', 0.5, 0.5)
+        self.outside = self.add_geometry('OUT', 2.5, 0.5)
+
+    def add_geometry(self, id_kurz, x, y):
+        return DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz=id_kurz, address=id_kurz,
+            geometry=Point(x, y, srid=4326), user=self.owner,
+        )
+
+    def members(self, area):
+        return set(area.memberships.values_list('geometry__id_kurz', flat=True))
+
+    def visible(self):
+        return set(
+            self.dataset.filter_geometries_for_user(
+                DataGeometry.objects.filter(dataset=self.dataset), self.member
+            ).values_list('id_kurz', flat=True)
+        )
+
+    def test_memberships_follow_points_and_areas(self):
+        self.assertEqual(self.members(self.area), {'IN'})
+
+        # A point on the boundary is covered by the area
+        self.add_geometry('EDGE', 1, 0.5)
+        self.assertEqual(self.members(self.area), {'IN', 'EDGE'})
+
+        self.outside.geometry = Point(0.2, 0.2, srid=4326)
+        self.outside.save()
+        self.assertEqual(self.members(self.area), {'IN', 'EDGE', 'OUT'})
+
+        self.area.geometry = Polygon.from_bbox((0, 0, 0.3, 0.3))
+        self.area.save()
+        self.assertEqual(self.members(self.area), {'OUT'})
+
+        self.area.delete()
+        self.assertFalse(MappingAreaMembership.objects.exists())
+
+    def test_memberships_are_limited_to_the_dataset(self):
+        other = DataSet.objects.create(name='Other', owner=self.owner)
+        DataGeometry.objects.create(
+            dataset=other, id_kurz='IN', address='Other', geometry=Point(0.5, 0.5, srid=4326), user=self.owner,
+        )
+        self.assertEqual(MappingAreaMembership.objects.count(), 1)
+
+    def test_access_checks_use_memberships(self):
+        self.assertEqual(self.visible(), {'IN'})
+        self.assertTrue(self.dataset.user_has_geometry_access(self.member, self.inside))
+        self.assertFalse(self.dataset.user_has_geometry_access(self.member, self.outside))
+        self.assertTrue(self.dataset.user_has_geometry_access(self.owner, self.outside))
+
+        # Access follows the table, so a missing row hides the point
+        MappingAreaMembership.objects.all().delete()
+        self.assertEqual(self.visible(), set())
+        self.assertFalse(self.dataset.user_has_geometry_access(self.member, self.inside))
+
+    def test_rebuild_covers_bulk_created_points(self):
+        DataGeometry.objects.bulk_create([
+            DataGeometry(dataset=self.dataset, id_kurz='BULK', address='Bulk',
+                         geometry=Point(0.7, 0.7, srid=4326), user=self.owner),
+        ])
+        self.assertEqual(self.members(self.area), {'IN'})
+        rebuild_dataset_membership(self.dataset.pk)
+        self.assertEqual(self.members(self.area), {'IN', 'BULK'})
+        self.assertEqual(self.visible(), {'IN', 'BULK'})
@@ -3,12 +3,16 @@ import json
 from unittest import mock
 
 from django.contrib.auth.models import User
-from django.contrib.gis.geos import Polygon
+from django.contrib.gis.geos import Point, Polygon
+from django.core.cache import cache
+from django.db import connection
 from django.db.utils import ProgrammingError
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from datasets.models import DataSet, MappingArea
+from datasets.membership import get_mapping_area_point_counts
+from datasets.models import DataGeometry, DataSet, MappingArea
 
 
 class MappingAreaViewsTests(TestCase):
@@ -275,3 +279,69 @@ class MappingAreaViewsTests(TestCase):
         self.assertEqual(MappingArea.objects.count(), 1)
 
 
+
+
+class MappingAreaPointCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.dataset = DataSet.objects.create(name='Campaign', owner=self.owner)
+        self.client.force_login(self.owner)
+        self.list_url = reverse('mapping_area_list', args=[self.dataset.id])
+
+        self.west = self.add_area('West', 0)
+        self.east = self.add_area('East', 2)
+        for index, x in enumerate((0.2, 0.4, 1.0, 2.5)):
+            self.add_point(f'P{index}', x)
+
+    def add_area(self, name, x):
+        area = MappingArea.objects.create(
+            dataset=self.dataset, name=name, created_by=self.owner,
+            geometry=Polygon.from_bbox((x, 0, x + 1, 1)),
+        )
+        area.allocated_users.add(self.owner)
+        return area
+
+    def add_point(self, id_kurz, x):
+        return DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz=id_kurz, address=id_kurz,
+            geometry=Point(x, 0.5, srid=4326), user=self.owner,
+        )
+
+    def point_counts(self):
+        return {area['name']: area['point_count'] for area in self.client.get(self.list_url).json()['mapping_areas']}
+
+    def test_counts_include_boundary_points(self):
+        self.assertEqual(self.point_counts(), {'West': 3, 'East': 1})
+        self.assertEqual(self.west.get_point_count(), 3)
+
+    def test_counts_are_cached_until_points_or_areas_change(self):
+        self.assertEqual(get_mapping_area_point_counts(self.dataset), {self.west.id: 3, self.east.id: 1})
+        with self.assertNumQueries(0):
+            get_mapping_area_point_counts(self.dataset.id)
+
+        point = self.add_point('NEW', 2.2)
+        self.assertEqual(self.point_counts(), {'West': 3, 'East': 2})
+
+        point.geometry = Point(0.5, 0.5, srid=4326)
+        point.save()
+        self.assertEqual(self.point_counts(), {'West': 4, 'East': 1})
+
+        point.delete()
+        self.assertEqual(self.point_counts(), {'West': 3, 'East': 1})
+
+        self.east.geometry = Polygon.from_bbox((0, 0, 3, 1))
+        self.east.save()
+        self.assertEqual(self.point_counts(), {'West': 3, 'East': 4})
+
+        self.west.delete()
+        self.assertEqual(self.point_counts(), {'East': 4})
+
+    def test_list_queries_do_not_grow_with_areas(self):
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get(self.list_url)
+        for index in range(10):
+            self.add_area(f'Extra {index}', 4 + index)
+        cache.clear()
+        with self.assertNumQueries(len(baseline)):
+            self.assertEqual(len(self.client.get(self.list_url).json()['mapping_areas']), 12)
@@ -0,0 +1,202 @@
+import json
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point, Polygon
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.models import (
+    DataEntry,
+    DataEntryField,
+    DataGeometry,
+    DataSet,
+    DatasetField,
+    EntryProgress,
+    MappingArea,
+)
+from datasets.bulk_delete import delete_dataset_geometries
+from datasets.progress import get_dataset_progress, rebuild_dataset_progress
+
+
+class MappingAreaProgressTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.anna = User.objects.create_user(username='anna', password='pass')
+        self.ben = User.objects.create_user(username='ben', password='pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dataset = DataSet.objects.create(name='Campaign', owner=self.owner, enable_mapping_areas=True)
+            for name, required, field_type in (
+                ('height', True, 'integer'), ('use', True, 'text'),
+                ('note', False, 'text'), ('section', True, 'headline'),
+            ):
+                DatasetField.objects.create(
+                    dataset=self.dataset, field_name=name, label=name.title(), field_type=field_type, required=required,
+                )
+            self.west = self.add_area('West', 0)
+            self.east = self.add_area('East', 2)
+            self.w1 = self.add_point('W1', 0.5)
+            self.w2 = self.add_point('W2', 0.6)
+            self.e1 = self.add_point('E1', 2.5)
+
+    def add_area(self, name, x):
+        return MappingArea.objects.create(
+            dataset=self.dataset, name=name, created_by=self.owner, geometry=Polygon.from_bbox((x, 0, x + 1, 1)),
+        )
+
+    def add_point(self, id_kurz, x):
+        return DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz=id_kurz, address=id_kurz,
+            geometry=Point(x, 0.5, srid=4326), user=self.owner,
+        )
+
+    def add_entry(self, geometry, user, **values):
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = DataEntry.objects.create(geometry=geometry, name=geometry.id_kurz, user=user)
+            for field_name, value in values.items():
+                DataEntryField.objects.create(entry=entry, field_name=field_name, value=value)
+        return entry
+
+    def progress(self):
+        return {area['name']: area for area in get_dataset_progress(self.dataset)['mapping_areas']}
+
+    def users(self, area):
+        return {user['username']: (user['entries'], user['completeness']) for user in area['users']}
+
+    def test_progress_per_area_and_user(self):
+        self.add_entry(self.w1, self.anna, height='10', use='  ')
+        self.add_entry(self.w1, self.ben, height='12', use='shop', note='corner')
+        self.add_entry(self.e1, self.anna)
+
+        self.assertEqual(get_dataset_progress(self.dataset)['required_fields'], 2)
+        west = self.progress()['West']
+        self.assertEqual(
+            {key: west[key] for key in ('point_count', 'geometries_with_entries', 'entries', 'required_filled')},
+            {'point_count': 2, 'geometries_with_entries': 1, 'entries': 2, 'required_filled': 3},
+        )
+        self.assertEqual(west['coverage'], 50.0)
+        self.assertEqual(west['completeness'], 75.0)
+        self.assertEqual(self.users(west), {'anna': (1, 50.0), 'ben': (1, 100.0)})
+
+        east = self.progress()['East']
+        self.assertEqual((east['geometries_with_entries'], east['coverage'], east['completeness']), (1, 100.0, 0.0))
+
+    def test_progress_follows_writes(self):
+        entry = self.add_entry(self.w1, self.anna, height='10')
+        other = self.add_entry(self.w2, self.ben)
+        self.assertEqual(self.progress()['West']['completeness'], 25.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.set_field_value('use', 'office')
+        self.assertEqual(self.users(self.progress()['West'])['anna'], (1, 100.0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(self.progress()['West']['geometries_with_entries'], 1)
+        self.assertEqual(self.users(self.progress()['West']), {'anna': (1, 100.0)})
+
+        # Requiring another field lowers completeness of existing entries
+        with self.captureOnCommitCallbacks(execute=True):
+            note = DatasetField.objects.get(dataset=self.dataset, field_name='note')
+            note.required = True
+            note.save()
+        self.assertEqual(self.progress()['West']['completeness'], round(200 / 3, 1))
+
+        # Entries move with their point
+        with self.captureOnCommitCallbacks(execute=True):
+            self.w1.geometry = Point(2.2, 0.5, srid=4326)
+            self.w1.save()
+        progress = self.progress()
+        self.assertEqual(progress['West']['entries'], 0)
+        self.assertEqual(progress['East']['entries'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.east.geometry = Polygon.from_bbox((5, 0, 6, 1))
+            self.east.save()
+        self.assertEqual(self.progress()['East']['entries'], 0)
+
+    def test_rebuild_matches_incremental_updates(self):
+        self.add_entry(self.w1, self.anna, height='10', use='shop')
+        self.add_entry(self.e1, self.ben, use='shop')
+        before = get_dataset_progress(self.dataset)
+        EntryProgress.objects.all().delete()
+        rebuild_dataset_progress(self.dataset.pk)
+        self.assertEqual(get_dataset_progress(self.dataset), before)
+
+    def test_added_differences_match_a_rebuild(self):
+        first = self.add_entry(self.w1, self.anna, height='10')
+        second = self.add_entry(self.w1, self.anna, use='shop')
+        self.add_entry(self.w2, self.ben, height='3', use='shop')
+        with self.captureOnCommitCallbacks(execute=True):
+            first.set_field_value('height', '')
+            second.user = self.ben
+            second.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        incremental = get_dataset_progress(self.dataset)
+        self.assertEqual(self.users(self.progress()['West']), {'ben': (2, 75.0)})
+
+        rebuild_dataset_progress(self.dataset.pk)
+        self.assertEqual(get_dataset_progress(self.dataset), incremental)
+
+    def test_deleted_users_are_counted_without_user(self):
+        self.add_entry(self.w1, self.anna, height='10')
+        self.add_entry(self.w2, self.ben)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.anna.delete()
+        self.assertEqual(self.users(self.progress()['West']), {'Unknown': (1, 50.0), 'ben': (1, 0.0)})
+
+    def test_clearing_points_rebuilds_progress_once(self):
+        for index in range(3):
+            self.add_entry(self.add_point(f'X{index}', 0.1 * index), self.anna, height='1', use='shop', note='n')
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(delete_dataset_geometries(self.dataset.pk), 6)
+        self.assertEqual(self.progress()['West']['entries'], 0)
+        self.assertEqual(self.users(self.progress()['West']), {})
+        # Field values are deleted without being loaded
+        self.assertFalse([
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and DataEntryField._meta.db_table in query['sql']
+        ])
+
+    def test_progress_is_read_from_aggregate_tables(self):
+        for index in range(5):
+            self.add_entry(self.add_point(f'X{index}', 0.1 * index), self.anna, height='1')
+        get_dataset_progress(self.dataset)
+        with self.assertNumQueries(2):
+            get_dataset_progress(self.dataset)
+
+    def test_bulk_save_updates_progress(self):
+        entry = self.add_entry(self.w1, self.anna)
+        self.client.force_login(self.anna)
+        self.dataset.shared_with.add(self.anna)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('save_entries_bulk'),
+                data=json.dumps({'geometry_id': self.w1.id, 'entries': [{'id': entry.id, 'fields': {'height': 3, 'use': 'shop'}}]}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.progress()['West']['completeness'], 100.0)
+
+    def test_progress_endpoint_and_panel(self):
+        self.add_entry(self.w1, self.anna, height='10', use='shop')
+        url = reverse('mapping_area_progress', args=[self.dataset.id])
+
+        self.client.force_login(self.owner)
+        data = self.client.get(url).json()
+        self.assertTrue(data['success'])
+        self.assertEqual([area['name'] for area in data['mapping_areas']], ['East', 'West'])
+        response = self.client.get(reverse('dataset_detail', args=[self.dataset.id]))
+        self.assertContains(response, 'Mapping Progress')
+        self.assertContains(response, 'anna')
+
+        self.dataset.shared_with.add(self.anna)
+        self.client.force_login(self.anna)
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotContains(self.client.get(reverse('dataset_detail', args=[self.dataset.id])), 'Mapping Progress')
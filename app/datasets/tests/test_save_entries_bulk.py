@@ -0,0 +1,137 @@
+import json
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from datasets.models import DataEntry, DataEntryField, DataGeometry, DataSet, DatasetField
+
+
+class SaveEntriesBulkViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='pass')
+        self.dataset = DataSet.objects.create(name='Bulk', owner=self.user)
+        self.geometry = DataGeometry.objects.create(
+            dataset=self.dataset, geometry=Point(16.0, 48.0, srid=4326),
+            id_kurz='BULK001', address='Bulk Street', user=self.user,
+        )
+        DatasetField.objects.create(dataset=self.dataset, field_name='name', label='Name', field_type='text', order=1)
+        DatasetField.objects.create(dataset=self.dataset, field_name='floors', label='Floors', field_type='integer', order=2)
+        DatasetField.objects.create(dataset=self.dataset, field_name='heated', label='Heated', field_type='boolean', order=3)
+        DatasetField.objects.create(dataset=self.dataset, field_name='surveyed', label='Surveyed', field_type='date', order=4)
+        DatasetField.objects.create(
+            dataset=self.dataset, field_name='uses', label='Uses', field_type='multiple_choice',
+            choices='living,office,shop', order=5,
+        )
+        DatasetField.objects.create(
+            dataset=self.dataset, field_name='source', label='Source', field_type='text',
+            non_editable=True, order=6,
+        )
+
+        self.entry1 = DataEntry.objects.create(geometry=self.geometry, name='Entry 1', user=self.user)
+        self.entry2 = DataEntry.objects.create(geometry=self.geometry, name='Entry 2', user=self.user)
+        DataEntryField.objects.create(entry=self.entry1, field_name='name', value='Old name')
+        DataEntryField.objects.create(entry=self.entry1, field_name='source', value='import')
+
+        self.url = reverse('save_entries_bulk')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def post(self, payload):
+        return self.client.post(self.url, data=json.dumps(payload), content_type='application/json')
+
+    def value(self, entry, field_name):
+        return DataEntryField.objects.get(entry=entry, field_name=field_name).value
+
+    def test_bulk_save_creates_and_updates_values(self):
+        response = self.post({
+            'geometry_id': self.geometry.id,
+            'entries': [
+                {'id': self.entry1.id, 'fields': {'name': 'New name', 'floors': '3', 'heated': 'yes'}},
+                {'id': self.entry2.id, 'fields': {'surveyed': '2024-05-01', 'uses': '["office", "garage"]'}},
+            ],
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['updated_entries'], 2)
+        self.assertEqual(data['updated_fields'], 5)
+
+        self.assertEqual(self.value(self.entry1, 'name'), 'New name')
+        self.assertEqual(self.value(self.entry1, 'floors'), '3')
+        self.assertEqual(self.value(self.entry1, 'heated'), 'true')
+        self.assertEqual(self.value(self.entry2, 'surveyed'), '2024-05-01')
+        # Values outside the field's choices are dropped
+        self.assertEqual(json.loads(self.value(self.entry2, 'uses')), ['office'])
+        self.assertEqual(DataEntryField.objects.filter(entry=self.entry1, field_name='name').count(), 1)
+
+    def test_non_editable_fields_are_not_written(self):
+        self.post({
+            'geometry_id': self.geometry.id,
+            'entries': [{'id': self.entry1.id, 'fields': {'source': 'manual'}}],
+        })
+        self.assertEqual(self.value(self.entry1, 'source'), 'import')
+
+    def test_invalid_values_reject_the_whole_request(self):
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.post({
+                'geometry_id': self.geometry.id,
+                'entries': [{'id': self.entry1.id, 'fields': {'name': 'Changed', 'floors': 'many', 'bogus': 'x'}}],
+            })
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors'][str(self.entry1.id)]
+        self.assertIn('floors', errors)
+        self.assertIn('bogus', errors)
+        self.assertEqual(self.value(self.entry1, 'name'), 'Old name')
+
+    def test_entries_of_other_geometries_are_rejected(self):
+        other_geometry = DataGeometry.objects.create(
+            dataset=self.dataset, geometry=Point(16.1, 48.1, srid=4326),
+            id_kurz='OTHER', address='Other', user=self.user,
+        )
+        other_entry = DataEntry.objects.create(geometry=other_geometry, name='Other', user=self.user)
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.post({
+                'geometry_id': self.geometry.id,
+                'entries': [{'id': other_entry.id, 'fields': {'name': 'Hijacked'}}],
+            })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DataEntryField.objects.filter(entry=other_entry).exists())
+
+    def test_access_denied_for_other_users(self):
+        stranger = User.objects.create_user(username='stranger', password='pass')
+        self.client.force_login(stranger)
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.post({'geometry_id': self.geometry.id, 'entries': []})
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_json_and_method(self):
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.client.post(self.url, data='not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 405)
+
+    def test_query_count_does_not_grow_with_fields(self):
+        for index in range(30):
+            DatasetField.objects.create(
+                dataset=self.dataset, field_name=f'extra_{index}', label=f'Extra {index}',
+                field_type='text', order=10 + index,
+            )
+
+        def save(field_count):
+            fields = {f'extra_{index}': f'value {index}' for index in range(field_count)}
+            with CaptureQueriesContext(connection) as context:
+                response = self.post({
+                    'geometry_id': self.geometry.id,
+                    'entries': [{'id': self.entry1.id, 'fields': fields}, {'id': self.entry2.id, 'fields': fields}],
+                })
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        self.assertEqual(save(2), save(30))
+        self.assertEqual(self.value(self.entry2, 'extra_29'), 'value 29')
@@ -0,0 +1,273 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+
+from django.contrib.auth.models import User
+from django.contrib.gis.geos import Point
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from datasets.models import DataEntry, DataEntryFile, DataGeometry, DataSet, ExportTask, Job
+from datasets.tasks import ZIP_COPY_CHUNK_SIZE, generate_zip_export, get_zip_compression
+
+
+class ZipExportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username='owner', password='pass')
+        self.dataset = DataSet.objects.create(name='Photos', owner=self.user)
+        geometry = DataGeometry.objects.create(
+            dataset=self.dataset, id_kurz='P1', address='Photo Street',
+            geometry=Point(16.0, 48.0, srid=4326), user=self.user,
+        )
+        entry = DataEntry.objects.create(geometry=geometry, name='P1', user=self.user)
+
+        # Larger than one copy chunk, so the file is streamed in several reads
+        self.photo = os.urandom(ZIP_COPY_CHUNK_SIZE * 2 + 123)
+        DataEntryFile.objects.create(
+            entry=entry, file=SimpleUploadedFile('photo.jpg', self.photo, content_type='image/jpeg'),
+            filename='photo.jpg', file_type='image/jpeg', file_size=len(self.photo), upload_user=self.user,
+        )
+
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def generate(self):
+        task = ExportTask.objects.create(task_id=str(uuid.uuid4()), dataset=self.dataset, user=self.user)
+        generate_zip_export(task.task_id, self.dataset.id, self.user.id, file_types=['all'])
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+        return task
+
+    def download(self, task, **headers):
+        return self.client.get(reverse('download_export_file', args=[task.task_id]), **headers)
+
+    def test_files_are_copied_into_the_archive(self):
+        task = self.generate()
+        with zipfile.ZipFile(os.path.join(self.media_root, task.file_path)) as archive:
+            self.assertEqual(archive.read('geometry_P1_photo.jpg'), self.photo)
+            self.assertIn('files_manifest.json', archive.namelist())
+            info = archive.getinfo('geometry_P1_photo.jpg')
+            self.assertEqual(info.file_size, len(self.photo))
+            self.assertGreater(info.date_time[0], 1980)
+
+    def test_compression_is_chosen_per_file(self):
+        entry = DataEntry.objects.get(name='P1')
+        notes = b'Survey notes\n' * 1000
+        DataEntryFile.objects.create(
+            entry=entry, file=SimpleUploadedFile('notes.txt', notes, content_type='text/plain'),
+            filename='notes.txt', file_type='text/plain', file_size=len(notes), upload_user=self.user,
+        )
+        task = self.generate()
+        with zipfile.ZipFile(os.path.join(self.media_root, task.file_path)) as archive:
+            self.assertEqual(archive.getinfo('geometry_P1_photo.jpg').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(archive.getinfo('geometry_P1_notes.txt').compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(archive.getinfo('files_manifest.json').compress_type, zipfile.ZIP_DEFLATED)
+            self.assertEqual(archive.read('geometry_P1_notes.txt'), notes)
+
+        with override_settings(ZIP_EXPORT_STORE_COMPRESSED=False):
+            task = self.generate()
+        with zipfile.ZipFile(os.path.join(self.media_root, task.file_path)) as archive:
+            self.assertEqual(archive.getinfo('geometry_P1_photo.jpg').compress_type, zipfile.ZIP_DEFLATED)
+
+    def test_get_zip_compression(self):
+        self.assertEqual(get_zip_compression('image/png'), zipfile.ZIP_STORED)
+        self.assertEqual(get_zip_compression('video/mp4'), zipfile.ZIP_STORED)
+        self.assertEqual(
+            get_zip_compression('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+            zipfile.ZIP_STORED,
+        )
+        self.assertEqual(get_zip_compression('audio/wav'), zipfile.ZIP_DEFLATED)
+        self.assertEqual(get_zip_compression('application/pdf'), zipfile.ZIP_DEFLATED)
+        # The file name is used when no MIME type was recorded
+        self.assertEqual(get_zip_compression('', 'scan.JPG'), zipfile.ZIP_STORED)
+
+    def test_download_is_streamed(self):
+        task = self.generate()
+        response = self.download(task)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        content = b''.join(response.streaming_content)
+        self.assertEqual(len(content), task.file_size)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(archive.read('geometry_P1_photo.jpg'), self.photo)
+
+    def test_range_requests_return_partial_content(self):
+        task = self.generate()
+        with open(os.path.join(self.media_root, task.file_path), 'rb') as handle:
+            archive = handle.read()
+
+        response = self.download(task, HTTP_RANGE='bytes=100-1099')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-1099/{len(archive)}')
+        self.assertEqual(response['Content-Length'], '1000')
+        self.assertEqual(b''.join(response.streaming_content), archive[100:1100])
+
+        response = self.download(task, HTTP_RANGE='bytes=-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), archive[-10:])
+
+        response = self.download(task, HTTP_RANGE=f'bytes={len(archive) - 5}-')
+        self.assertEqual(b''.join(response.streaming_content), archive[-5:])
+
+    def test_unsatisfiable_and_unsupported_ranges(self):
+        task = self.generate()
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.download(task, HTTP_RANGE=f'bytes={task.file_size + 10}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{task.file_size}')
+
+        # Multiple ranges are answered with the whole file
+        response = self.download(task, HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content)), task.file_size)
+
+    def add_file(self, name, content=b'new photo'):
+        return DataEntryFile.objects.create(
+            entry=DataEntry.objects.get(name='P1'),
+            file=SimpleUploadedFile(name, content, content_type='image/jpeg'),
+            filename=name, file_type='image/jpeg', file_size=len(content), upload_user=self.user,
+        )
+
+    def generate_incremental(self):
+        task = ExportTask.objects.create(
+            task_id=str(uuid.uuid4()), dataset=self.dataset, user=self.user, incremental=True,
+        )
+        generate_zip_export(task.task_id, self.dataset.id, self.user.id, file_types=['all'], incremental=True)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'completed')
+        return task
+
+    def read_archive(self, task):
+        with zipfile.ZipFile(os.path.join(self.media_root, task.file_path)) as archive:
+            names = [name for name in archive.namelist() if name.startswith('geometry_')]
+            return names, json.loads(archive.read('export_manifest.json'))
+
+    def test_incremental_export_contains_only_new_files(self):
+        full = self.generate()
+        self.assertIsNotNone(full.watermark_file_id)
+
+        new_file = self.add_file('evening.jpg')
+        first = self.generate_incremental()
+        names, manifest = self.read_archive(first)
+        self.assertEqual(names, ['geometry_P1_evening.jpg'])
+        self.assertEqual(first.previous_export, full)
+        self.assertEqual(first.watermark_file_id, new_file.id)
+        self.assertEqual(manifest['previous_export']['task_id'], full.task_id)
+        self.assertEqual(manifest['file_ids'], [new_file.id])
+
+        # Without new uploads the archive is empty but still continues the chain
+        second = self.generate_incremental()
+        names, manifest = self.read_archive(second)
+        self.assertEqual(names, [])
+        self.assertEqual(second.previous_export, first)
+        self.assertEqual(second.watermark_file_id, new_file.id)
+
+    def test_first_incremental_export_contains_all_files(self):
+        task = self.generate_incremental()
+        names, manifest = self.read_archive(task)
+        self.assertEqual(names, ['geometry_P1_photo.jpg'])
+        self.assertIsNone(task.previous_export)
+        self.assertIsNone(manifest['previous_export'])
+
+    def test_watermarks_are_per_file_filter(self):
+        document = self.add_file('notes.txt', b'notes')
+        DataEntryFile.objects.filter(pk=document.pk).update(file_type='text/plain')
+        self.add_file('evening.jpg')
+        images = ExportTask.objects.create(task_id=str(uuid.uuid4()), dataset=self.dataset, user=self.user)
+        generate_zip_export(images.task_id, self.dataset.id, self.user.id, file_types=['image'])
+        images.refresh_from_db()
+        self.assertEqual(images.file_types, ['image'])
+
+        # An incremental export of all files does not continue the images-only export
+        task = self.generate_incremental()
+        self.assertIsNone(task.previous_export)
+        self.assertIn('geometry_P1_notes.txt', self.read_archive(task)[0])
+
+    def test_watermarks_are_per_user(self):
+        self.generate()
+        other = User.objects.create_user(username='other', password='pass')
+        self.dataset.shared_with.add(other)
+        task = ExportTask.objects.create(task_id=str(uuid.uuid4()), dataset=self.dataset, user=other, incremental=True)
+        generate_zip_export(task.task_id, self.dataset.id, other.id, file_types=['all'], incremental=True)
+        task.refresh_from_db()
+        self.assertIsNone(task.previous_export)
+        self.assertEqual(self.read_archive(task)[0], ['geometry_P1_photo.jpg'])
+
+    def request_export(self, user, **extra):
+        self.client.force_login(user)
+        data = {'file_types': ['all'], 'organize_by': 'geometry', 'include_metadata': 'true', 'email_notification': 'false'}
+        data.update(extra)
+        response = self.client.post(reverse('export_files_zip', args=[self.dataset.id]), data)
+        self.assertEqual(response.status_code, 302)
+        return response
+
+    @override_settings(EXPORT_IN_BACKGROUND=True)
+    def test_identical_running_exports_are_joined(self):
+        member = User.objects.create_user(username='member', password='pass')
+        self.dataset.shared_with.add(member)
+
+        first = self.request_export(self.user)
+        second = self.request_export(member)
+        task = ExportTask.objects.get()
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertRedirects(first, reverse('export_task_status', args=[task.task_id]), fetch_redirect_response=False)
+        self.assertRedirects(second, reverse('export_task_status', args=[task.task_id]), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('export_task_status', args=[task.task_id])).status_code, 200)
+
+        # Different parameters start their own export
+        self.request_export(member, organize_by='date')
+        self.assertEqual(ExportTask.objects.count(), 2)
+
+        stranger = User.objects.create_user(username='stranger', password='pass')
+        self.client.force_login(stranger)
+        with self.assertLogs('django.request', level='WARNING'):
+            response = self.client.get(reverse('export_task_status', args=[task.task_id]))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(EXPORT_IN_BACKGROUND=True)
+    def test_everyone_joining_a_running_export_is_emailed(self):
+        self.user.email = 'owner@example.com'
+        self.user.save()
+        member = User.objects.create_user(username='member', password='pass', email='member@example.com')
+        quiet = User.objects.create_user(username='quiet', password='pass', email='quiet@example.com')
+        self.dataset.shared_with.add(member, quiet)
+
+        self.request_export(self.user, email_notification='true')
+        self.request_export(member, email_notification='true')
+        self.request_export(quiet)
+        task = ExportTask.objects.get()
+        self.assertEqual(set(task.notify_users.all()), {self.user, member})
+
+        generate_zip_export(task.task_id, self.dataset.id, self.user.id, file_types=['all'])
+        self.assertEqual(
+            sorted(message.to for message in mail.outbox), [['member@example.com'], ['owner@example.com']]
+        )
+
+    @override_settings(EXPORT_IN_BACKGROUND=False)
+    def test_completed_export_is_reused_until_files_change(self):
+        self.request_export(self.user)
+        task = ExportTask.objects.get()
+        self.assertEqual(task.status, 'completed')
+
+        self.request_export(self.user)
+        self.assertEqual(ExportTask.objects.count(), 1)
+
+        self.add_file('later.jpg')
+        self.request_export(self.user)
+        self.assertEqual(ExportTask.objects.count(), 2)
+        with zipfile.ZipFile(os.path.join(self.media_root, ExportTask.objects.latest('created_at').file_path)) as archive:
+            self.assertIn('geometry_P1_later.jpg', archive.namelist())
@@ -15,10 +15,12 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.core.mail import send_mail
+from django.core.paginator import Paginator
 from datetime import datetime
 
-from ..models import AuditLog, DataSet
+from ..models import AuditLog
 from ..forms import CustomUserCreationForm, EmailAuthenticationForm, GroupForm
+from ..visibility import dataset_list_queryset
 
 
 class EmailLoginView(LoginView):
@@ -116,17 +118,13 @@ def password_reset_complete_view(request):
 @login_required
 def dashboard_view(request):
     """Main dashboard view"""
-    # Get datasets owned by user or shared with user
-    owned_datasets = DataSet.objects.filter(owner=request.user)
-    shared_datasets = DataSet.objects.filter(shared_with=request.user)
-    group_shared_datasets = DataSet.objects.filter(shared_with_groups__in=request.user.groups.all())
-    public_datasets = DataSet.objects.filter(is_public=True)
-    
-    # Combine and deduplicate
-    all_datasets = (owned_datasets | shared_datasets | group_shared_datasets | public_datasets).distinct()
-    
+    # Datasets owned by, shared with or public to the user
+    paginator = Paginator(dataset_list_queryset(request.user, all_for_superusers=False), 10)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
     return render(request, 'datasets/dashboard.html', {
-        'datasets': all_datasets,
+        'datasets': page_obj,
+        'page_obj': page_obj,
         'can_create_datasets': is_manager(request.user)
     })
 
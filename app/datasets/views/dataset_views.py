@@ -3,14 +3,26 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.models import User, Group
 from django.contrib import messages
 from django.urls import reverse
-from django.http import JsonResponse
-from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.db import connection, transaction
 from django.core.paginator import Paginator
-from django.db.models import Q, Max
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.contrib.gis.db.models import Collect, Extent
+from django.contrib.gis.db.models.functions import Centroid, SnapToGrid
+from django.contrib.gis.geos import Polygon
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
+import math
 
+from ..access import get_dataset_access, mapping_access_changed
+from ..bulk_delete import bulk_delete, delete_dataset_geometries
 from ..models import (
     DataSet,
     DataGeometry,
+    DataGeometryTombstone,
     DataEntry,
     DataEntryField,
     DataEntryFile,
@@ -22,6 +34,10 @@ from ..models import (
     DatasetGroupMappingArea,
     MappingArea,
 )
+from ..progress import get_dataset_progress, progress_changed
+from ..revision import bump_dataset_revision
+from ..schema import get_dataset_schema, invalidate_dataset_schema
+from ..visibility import dataset_list_queryset
 from ..forms import DatasetFieldConfigForm, DatasetFieldForm, TransferOwnershipForm
 def _get_typology_categories_map(user=None):
     categories = {}
@@ -59,21 +75,13 @@ def ensure_dataset_field_config(dataset: DataSet) -> DatasetFieldConfig:
 @login_required
 def dataset_list_view(request):
     """List all datasets accessible to the user"""
-    # Superusers can see all datasets regardless of access permissions
-    if request.user.is_superuser:
-        all_datasets = DataSet.objects.all().order_by('-created_at')
-    else:
-        # Get datasets owned by user or shared with user
-        owned_datasets = DataSet.objects.filter(owner=request.user)
-        shared_datasets = DataSet.objects.filter(shared_with=request.user)
-        group_shared_datasets = DataSet.objects.filter(shared_with_groups__in=request.user.groups.all())
-        public_datasets = DataSet.objects.filter(is_public=True)
-        
-        # Combine and deduplicate
-        all_datasets = (owned_datasets | shared_datasets | group_shared_datasets | public_datasets).distinct()
-    
+    # Superusers see all datasets, everyone else their own, shared and public ones
+    paginator = Paginator(dataset_list_queryset(request.user), 24)
+    page_obj = paginator.get_page(request.GET.get('page'))
+
     return render(request, 'datasets/dataset_list.html', {
-        'datasets': all_datasets,
+        'datasets': page_obj,
+        'page_obj': page_obj,
         'can_create_datasets': is_manager(request.user)
     })
 
@@ -105,7 +113,7 @@ def dataset_detail_view(request, dataset_id):
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
 
     # Handle field configuration updates
@@ -151,11 +159,17 @@ def dataset_detail_view(request, dataset_id):
     # Get all fields for this dataset
     all_fields = DatasetField.order_fields(DatasetField.objects.filter(dataset=dataset))
     
+    # Mapping area progress for coordinators, read from the aggregate tables
+    progress = None
+    if dataset.enable_mapping_areas and (dataset.owner_id == request.user.id or request.user.is_superuser):
+        progress = get_dataset_progress(dataset)
+    
     return render(request, 'datasets/dataset_detail.html', {
         'dataset': dataset,
         'geometries_count': geometries_count,
         'data_entries_count': data_entries_count,
-        'all_fields': all_fields
+        'all_fields': all_fields,
+        'progress': progress,
     })
 
 
@@ -172,7 +186,9 @@ def dataset_edit_view(request, dataset_id):
         if 'delete_dataset' in request.POST:
             # Handle dataset deletion
             dataset_name = dataset.name
-            dataset.delete()
+            # Everything depending on the dataset's rows is deleted with it
+            with bulk_delete():
+                dataset.delete()
             messages.success(request, f'Dataset "{dataset_name}" deleted successfully!')
             return redirect('dataset_list')
         
@@ -223,7 +239,7 @@ def dataset_copy_view(request, dataset_id):
     original_dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to the original dataset
-    if not original_dataset.can_access(request.user):
+    if not get_dataset_access(request, original_dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     # Create new dataset with "_Copy" suffix
@@ -614,6 +630,8 @@ def dataset_access_view(request, dataset_id):
         else:
             DatasetUserMappingArea.objects.filter(dataset=dataset).delete()
             DatasetGroupMappingArea.objects.filter(dataset=dataset).delete()
+        # bulk_create skips the signal handlers
+        mapping_access_changed([dataset.pk])
         
         if not (users_to_add or users_to_remove or groups_to_add or groups_to_remove):
             messages.info(request, 'No changes were made to access settings.')
@@ -653,83 +671,40 @@ def dataset_access_view(request, dataset_id):
     })
 
 
+def _get_enabled_fields(dataset):
+    """Enabled fields of a dataset from the schema cache, in display order"""
+    schema = get_dataset_schema(dataset)
+    # If no enabled fields found, enable all fields; otherwise respect the
+    # configuration as-is
+    if schema.fields and not schema.enabled_fields:
+        DatasetField.objects.filter(dataset=dataset).update(enabled=True)
+        # update() skips the signal handlers
+        invalidate_dataset_schema(dataset.pk)
+        progress_changed(datasets=[dataset.pk])
+        bump_dataset_revision([dataset.pk])
+        schema = get_dataset_schema(dataset)
+    return schema.enabled_fields
+
+
 @login_required
 def dataset_data_input_view(request, dataset_id):
     """Data input view with map and entry editing"""
     dataset = get_object_or_404(DataSet, pk=dataset_id)
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
 
-    # Get all geometries for this dataset with their entries, respecting mapping area limits
-    geometries_qs = DataGeometry.objects.filter(dataset=dataset).prefetch_related('entries')
-    geometries = dataset.filter_geometries_for_user(geometries_qs, request.user)
-    geometries = list(geometries)
-    
-    # Prepare map data
-    map_data = []
-    for geometry in geometries:
-        map_point = {
-            'id': geometry.id,
-            'id_kurz': geometry.id_kurz,
-            'address': geometry.address,
-            'lat': geometry.geometry.y,
-            'lng': geometry.geometry.x,
-            'entries_count': geometry.entries.count(),
-            'user': geometry.user.username if geometry.user else 'Unknown',
-            'entries': []
-        }
-        
-        # Add entry data for this geometry
-        for entry in geometry.entries.all():
-            entry_data = {
-                'id': entry.id,
-                'name': entry.name,
-                'year': entry.year,
-                'user': entry.user.username if entry.user else 'Unknown'
-            }
-            
-            # Add dynamic field values
-            for field in entry.fields.all():
-                entry_data[field.field_name] = field.get_typed_value()
-            
-            map_point['entries'].append(entry_data)
-        
-        map_data.append(map_point)
-    
+    # Geometries and entries are loaded lazily by the map data and geometry
+    # details APIs, so the page shell only needs dataset-level information
+    geometries = get_dataset_access(request, dataset).filter_geometries(
+        DataGeometry.objects.filter(dataset=dataset)
+    )
+
     # Typology data is now handled at the field level, not dataset level
     typology_data = None
     
-    # Get all enabled fields for this dataset
-    all_fields = DatasetField.order_fields(DatasetField.objects.filter(dataset=dataset, enabled=True))
-    
-    # If no enabled fields found, get all fields and enable them
-    if not all_fields.exists():
-        all_fields_qs = DatasetField.objects.filter(dataset=dataset)
-        if all_fields_qs.exists():
-            # Enable all fields
-            all_fields_qs.update(enabled=True)
-            # Re-query to get the updated fields
-            all_fields = DatasetField.order_fields(DatasetField.objects.filter(dataset=dataset, enabled=True))
-    # If some enabled fields exist, respect that configuration as-is
     # Prepare fields data for JavaScript with typology choices
-    fields_data = []
-    for field in all_fields:
-        field_data = {
-            'id': field.id,
-            'name': field.label,  # Use label for display
-            'label': field.label,
-            'field_type': field.field_type,
-            'field_name': field.field_name,
-            'required': field.required,
-            'enabled': field.enabled,
-            'non_editable': field.non_editable,
-            'help_text': field.help_text or '',
-            'choices': field.choices or '',
-            'order': field.order,
-            'typology_choices': field.get_choices_list(),
-            'typology_category': field.typology_category or ''
-        }
-        fields_data.append(field_data)
+    all_fields = _get_enabled_fields(dataset)
+    fields_data = [field.as_dict() for field in all_fields]
     
     # Handle case where allow_multiple_entries field might not exist yet (migration not applied)
     try:
@@ -747,16 +722,32 @@ def dataset_data_input_view(request, dataset_id):
     users_for_allocation = []
     if dataset.owner == request.user or request.user.is_superuser:
         users_for_allocation = User.objects.filter(is_active=True).order_by('username')
-    
+
+    # Large datasets are rendered from vector tiles instead of one marker per point.
+    # Probing for the threshold row avoids counting every geometry.
+    threshold = settings.MAP_VECTOR_TILES_MIN_POINTS
+    use_vector_tiles = (
+        threshold <= 0
+        or geometries.order_by().values('id')[threshold - 1:threshold].exists()
+    )
+    map_extent = None
+    if use_vector_tiles:
+        extent = geometries.aggregate(extent=Extent('geometry'))['extent']
+        if extent:
+            # Leaflet bounds order: [[south, west], [north, east]]
+            map_extent = [[extent[1], extent[0]], [extent[3], extent[2]]]
+
     return render(request, 'datasets/dataset_data_input.html', {
         'dataset': dataset,
-        'geometries': geometries,
         'typology_data': typology_data,
         'all_fields': all_fields,
         'fields_data': fields_data,
         'enable_mapping_areas': enable_mapping_areas,
         'allow_multiple_entries': allow_multiple_entries,
-        'users_for_allocation': users_for_allocation
+        'users_for_allocation': users_for_allocation,
+        'use_vector_tiles': use_vector_tiles,
+        'map_extent': map_extent,
+        'map_cluster_max_zoom': settings.MAP_CLUSTER_MAX_ZOOM,
     })
 
 
@@ -766,17 +757,16 @@ def dataset_entries_table_view(request, dataset_id):
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     # Get all entries for this dataset
     entries = DataEntry.objects.filter(geometry__dataset=dataset).select_related('geometry', 'user').prefetch_related('fields')
 
-    mapping_area_ids = dataset.get_user_mapping_area_ids(request.user)
+    mapping_area_ids = get_dataset_access(request, dataset).mapping_area_ids
     if mapping_area_ids is not None:
-        restricted_geometries = dataset.filter_geometries_for_user(
-            DataGeometry.objects.filter(dataset=dataset),
-            request.user,
+        restricted_geometries = get_dataset_access(request, dataset).filter_geometries(
+            DataGeometry.objects.filter(dataset=dataset)
         )
         entries = entries.filter(geometry__in=restricted_geometries)
     
@@ -833,41 +823,11 @@ def dataset_fields_view(request, dataset_id):
     """API endpoint to get dataset fields"""
     try:
         dataset = get_object_or_404(DataSet, pk=dataset_id)
-        if not dataset.can_access(request.user):
+        if not get_dataset_access(request, dataset).can_access:
             return JsonResponse({'error': 'Access denied'}, status=403)
 
-        # Get all enabled fields for this dataset
-        all_fields = DatasetField.order_fields(DatasetField.objects.filter(dataset=dataset, enabled=True))
-        
-        # If no enabled fields found, get all fields and enable them
-        if not all_fields.exists():
-            all_fields_qs = DatasetField.objects.filter(dataset=dataset)
-            if all_fields_qs.exists():
-                # Enable all fields
-                all_fields_qs.update(enabled=True)
-                # Re-query to get the updated fields
-                all_fields = DatasetField.order_fields(DatasetField.objects.filter(dataset=dataset, enabled=True))
-        # If some enabled fields exist, respect that configuration as-is
-        
         # Prepare fields data for JavaScript
-        fields_data = []
-        for field in all_fields:
-            field_data = {
-                'id': field.id,
-                'name': field.label,
-                'label': field.label,
-                'field_type': field.field_type,
-                'field_name': field.field_name,
-                'required': field.required,
-                'enabled': field.enabled,
-                'non_editable': field.non_editable,
-                'help_text': field.help_text or '',
-                'choices': field.choices or '',
-                'order': field.order,
-                'typology_choices': field.get_choices_list(),
-                'typology_category': field.typology_category or ''
-            }
-            fields_data.append(field_data)
+        fields_data = [field.as_dict() for field in _get_enabled_fields(dataset)]
         
         return JsonResponse({'fields': fields_data})
         
@@ -875,12 +835,111 @@ def dataset_fields_view(request, dataset_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+def _cluster_geometries(geometries, zoom):
+    """
+    Aggregate geometries into grid cells sized for the given zoom level.
+
+    Returns one dict per non-empty cell with the point count, the number of
+    entries attached to those points and the centroid of the cell's points.
+    """
+    # Degrees per pixel at this zoom (256px tiles) times the cell size in pixels
+    cell_size = 360.0 / (256 * 2 ** zoom) * settings.MAP_CLUSTER_CELL_PIXELS
+
+    entry_counts = (
+        DataEntry.objects.filter(geometry=OuterRef('pk'))
+        .order_by()
+        .values('geometry')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    cells = (
+        geometries.order_by()
+        .annotate(
+            cell=SnapToGrid('geometry', cell_size),
+            entry_total=Coalesce(Subquery(entry_counts), 0),
+        )
+        .values('cell')
+        .annotate(
+            count=Count('id'),
+            entries_count=Sum('entry_total'),
+            geometry_id=Min('id'),
+            center=Centroid(Collect('geometry')),
+        )
+    )
+
+    clusters = []
+    for cell in cells:
+        cluster = {
+            'lat': cell['center'].y,
+            'lng': cell['center'].x,
+            'count': cell['count'],
+            'entries_count': cell['entries_count'] or 0,
+        }
+        if cell['count'] == 1:
+            # Single points can be selected directly
+            cluster['id'] = cell['geometry_id']
+        clusters.append(cluster)
+    return clusters
+
+
+# Decimal places kept for coordinates in the columnar map data format (~0.1 m)
+COLUMNAR_COORDINATE_PRECISION = 6
+
+# Delta sync windows overlap by this much so rows committed by concurrent
+# transactions around the cursor time are not missed
+MAP_DELTA_OVERLAP = timedelta(seconds=5)
+
+
+def _encode_columnar_map_data(rows):
+    """
+    Encode (id, id_kurz, address, geometry, username) rows as parallel arrays.
+
+    Usernames are replaced by indexes into a ``users`` dictionary and the
+    coordinates are stored as integers (scaled by 10^precision), each one
+    relative to the previous point.
+    """
+    scale = 10 ** COLUMNAR_COORDINATE_PRECISION
+    columns = {
+        'format': 'columnar',
+        'precision': COLUMNAR_COORDINATE_PRECISION,
+        'count': 0,
+        'id': [],
+        'id_kurz': [],
+        'address': [],
+        'lat': [],
+        'lng': [],
+        'user': [],
+        'users': [],
+    }
+    user_index = {}
+    previous_lat = previous_lng = 0
+    for geometry_id, id_kurz, address, point, username in rows:
+        if point is None:
+            continue
+        lat = round(point.y * scale)
+        lng = round(point.x * scale)
+        username = username or 'Unknown'
+        if username not in user_index:
+            user_index[username] = len(columns['users'])
+            columns['users'].append(username)
+
+        columns['id'].append(geometry_id)
+        columns['id_kurz'].append(id_kurz)
+        columns['address'].append(address)
+        columns['lat'].append(lat - previous_lat)
+        columns['lng'].append(lng - previous_lng)
+        columns['user'].append(user_index[username])
+        previous_lat, previous_lng = lat, lng
+    columns['count'] = len(columns['id'])
+    return columns
+
+
 @login_required
 def dataset_map_data_view(request, dataset_id):
     """API endpoint to get lightweight map data for a dataset (coordinates only)"""
     try:
         dataset = get_object_or_404(DataSet, pk=dataset_id)
-        if not dataset.can_access(request.user):
+        if not get_dataset_access(request, dataset).can_access:
             return render(request, 'datasets/403.html', status=403)
         
         # Get map bounds from request parameters
@@ -913,7 +972,59 @@ def dataset_map_data_view(request, dataset_id):
                 'id', 'id_kurz', 'address', 'geometry', 'user__username'
             )
         
-        geometries = dataset.filter_geometries_for_user(geometries, request.user)
+        geometries = get_dataset_access(request, dataset).filter_geometries(geometries)
+
+        # Below the clustering threshold, aggregate points server-side
+        try:
+            zoom = int(request.GET['zoom'])
+        except (KeyError, ValueError):
+            zoom = None
+        if zoom is not None and 0 <= zoom < settings.MAP_CLUSTER_MAX_ZOOM:
+            return JsonResponse({
+                'clustered': True,
+                'zoom': zoom,
+                'clusters': _cluster_geometries(geometries, zoom),
+            })
+
+        # Delta sync: only return geometries changed since the client's cursor
+        cursor = timezone.now()
+        since = None
+        if request.GET.get('since'):
+            since = parse_datetime(request.GET['since'])
+            if since is None:
+                return JsonResponse({'error': 'Invalid cursor'}, status=400)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            # Points hidden by changed mapping area restrictions have no
+            # tombstone, so clients with an older cursor reload everything
+            if dataset.access_changed_at and dataset.access_changed_at >= since - MAP_DELTA_OVERLAP:
+                since = None
+
+        payload = {'clustered': False, 'delta': since is not None, 'cursor': cursor.isoformat()}
+        if since is not None:
+            window_start = since - MAP_DELTA_OVERLAP
+            visible_ids = geometries.values('id')
+            geometries = geometries.filter(updated_at__gte=window_start)
+            deleted_ids = set(
+                DataGeometryTombstone.objects.filter(
+                    dataset=dataset, deleted_at__gte=window_start
+                ).values_list('geometry_id', flat=True)
+            )
+            # Changed geometries the user can no longer see count as deleted
+            deleted_ids.update(
+                DataGeometry.objects.filter(dataset=dataset, updated_at__gte=window_start)
+                .exclude(id__in=visible_ids)
+                .values_list('id', flat=True)
+            )
+            payload['deleted'] = sorted(deleted_ids)
+
+        # Compact encoding for bandwidth-constrained clients
+        if request.GET.get('format') == 'columnar':
+            rows = geometries.order_by('id').values_list(
+                'id', 'id_kurz', 'address', 'geometry', 'user__username'
+            )
+            payload['map_data'] = _encode_columnar_map_data(rows)
+            return JsonResponse(payload)
 
         # Prepare lightweight map data
         map_data = []
@@ -931,12 +1042,90 @@ def dataset_map_data_view(request, dataset_id):
             except Exception as e:
                 continue
         
-        return JsonResponse({'map_data': map_data})
+        payload['map_data'] = map_data
+        return JsonResponse(payload)
         
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
+# Vector tile parameters (see the Mapbox Vector Tile specification)
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+MVT_MAX_ZOOM = 22
+
+
+def _tile_bounds(z, x, y, margin=0.0):
+    """
+    Return the (west, south, east, north) WGS84 bounds of an XYZ tile.
+
+    ``margin`` widens the bounds by a fraction of the tile size so that points
+    inside the tile buffer are not cut off at tile edges.
+    """
+    n = 2 ** z
+
+    def _lng(tile_x):
+        return tile_x / n * 360.0 - 180.0
+
+    def _lat(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    west = _lng(x - margin)
+    east = _lng(x + 1 + margin)
+    north = _lat(max(y - margin, 0))
+    south = _lat(min(y + 1 + margin, n))
+    return max(west, -180.0), south, min(east, 180.0), north
+
+
+@login_required
+def dataset_map_tile_view(request, dataset_id, z, x, y):
+    """API endpoint serving dataset geometries as Mapbox Vector Tiles"""
+    dataset = get_object_or_404(DataSet, pk=dataset_id)
+    if not get_dataset_access(request, dataset).can_access:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+
+    if z > MVT_MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+        return JsonResponse({'error': 'Invalid tile coordinates'}, status=400)
+
+    # Select the tile's geometries (plus buffer) with the ORM so the usual
+    # mapping area restrictions apply, then let PostGIS encode the tile.
+    bbox = Polygon.from_bbox(_tile_bounds(z, x, y, margin=MVT_BUFFER / MVT_EXTENT))
+    geometries = DataGeometry.objects.filter(dataset=dataset, geometry__intersects=bbox)
+    geometries = get_dataset_access(request, dataset).filter_geometries(geometries)
+    subquery, subquery_params = geometries.values('id').query.sql_with_params()
+
+    sql = f"""
+        WITH tile AS (
+            SELECT
+                ST_AsMVTGeom(
+                    ST_Transform(g.geometry, 3857),
+                    ST_TileEnvelope(%s, %s, %s),
+                    %s, %s, true
+                ) AS geom,
+                g.id,
+                g.id_kurz,
+                g.address,
+                ST_Y(g.geometry) AS lat,
+                ST_X(g.geometry) AS lng,
+                COALESCE(u.username, 'Unknown') AS "user"
+            FROM {DataGeometry._meta.db_table} g
+            LEFT JOIN {User._meta.db_table} u ON u.id = g.user_id
+            WHERE g.id IN ({subquery})
+        )
+        SELECT ST_AsMVT(tile.*, 'geometries', %s, 'geom')
+        FROM tile
+        WHERE tile.geom IS NOT NULL
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [z, x, y, MVT_EXTENT, MVT_BUFFER, *subquery_params, MVT_EXTENT])
+        row = cursor.fetchone()
+
+    tile = bytes(row[0]) if row and row[0] else b''
+    response = HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+    response['Cache-Control'] = 'private, max-age=60'
+    return response
+
+
 @login_required
 def dataset_clear_data_view(request, dataset_id):
     """Clear all geometry points and data entries from a dataset"""
@@ -948,8 +1137,7 @@ def dataset_clear_data_view(request, dataset_id):
     
     if request.method == 'POST':
         # Delete all geometries and their related data
-        geometries_count = DataGeometry.objects.filter(dataset=dataset).count()
-        DataGeometry.objects.filter(dataset=dataset).delete()
+        geometries_count = delete_dataset_geometries(dataset.id)
         
         messages.success(request, f'Cleared {geometries_count} geometry points and all related data from dataset "{dataset.name}".')
         return redirect('dataset_detail', dataset_id=dataset.id)
@@ -965,7 +1153,7 @@ def custom_field_create_view(request, dataset_id):
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     if request.method == 'POST':
@@ -1002,7 +1190,7 @@ def custom_field_edit_view(request, dataset_id, field_id):
     field = get_object_or_404(DatasetField, id=field_id, dataset=dataset)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     if request.method == 'POST':
@@ -1038,7 +1226,7 @@ def custom_field_delete_view(request, dataset_id, field_id):
     field = get_object_or_404(DatasetField, id=field_id, dataset=dataset)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     if request.method == 'POST':
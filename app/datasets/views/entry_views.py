@@ -4,8 +4,15 @@ from django.contrib.auth.models import User
 from django.contrib import messages
 from django.http import JsonResponse
 from django.db import transaction
+from django.utils import timezone
+from datetime import datetime
+import json
 
+from ..access import get_dataset_access
 from ..models import DataSet, DataGeometry, DataEntry, DataEntryField, DatasetField
+from ..progress import progress_changed
+from ..revision import bump_dataset_revision
+from ..schema import get_dataset_schema
 
 
 @login_required
@@ -15,9 +22,9 @@ def entry_detail_view(request, entry_id):
     dataset = entry.geometry.dataset
     
     # Check if user has access to this entry's dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
-    if not dataset.user_has_geometry_access(request.user, entry.geometry):
+    if not get_dataset_access(request, dataset).has_geometry_access(entry.geometry):
         return render(request, 'datasets/403.html', status=403)
     
     # Get all fields for this dataset, ordered by display order
@@ -37,9 +44,9 @@ def entry_edit_view(request, entry_id):
     
     # Check if user has access to this entry's dataset
     dataset = entry.geometry.dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
-    if not dataset.user_has_geometry_access(request.user, entry.geometry):
+    if not get_dataset_access(request, dataset).has_geometry_access(entry.geometry):
         return render(request, 'datasets/403.html', status=403)
     
     if request.method == 'POST':
@@ -56,18 +63,14 @@ def entry_edit_view(request, entry_id):
             entry.save()
             
             # Update field values
+            schema = get_dataset_schema(dataset)
             for field in entry.fields.all():
                 field_name = field.field_name
                 if field_name in request.POST:
                     field_value = request.POST[field_name]
                     
-                    # Get field type from DatasetField if it exists
-                    field_type = 'text'  # default
-                    try:
-                        dataset_field = DatasetField.objects.get(dataset=dataset, field_name=field_name)
-                        field_type = dataset_field.field_type
-                    except DatasetField.DoesNotExist:
-                        pass
+                    # Get field type from the dataset schema if the field exists
+                    field_type = schema.field_type(field_name)
                     
                     # Handle multiple_choice fields - validate and store as JSON
                     if field_type == 'multiple_choice':
@@ -77,12 +80,12 @@ def entry_edit_view(request, entry_id):
                             parsed = json.loads(field_value)
                             if isinstance(parsed, list):
                                 # Validate against available choices
-                                try:
-                                    dataset_field = DatasetField.objects.get(dataset=dataset, field_name=field_name)
-                                    available_values = [str(opt.get('value', opt) if isinstance(opt, dict) else opt) for opt in dataset_field.get_choices_list()]
+                                dataset_field = schema.get(field_name)
+                                if dataset_field is not None:
+                                    available_values = dataset_field.choice_values
                                     validated_values = [v for v in parsed if str(v) in available_values]
                                     field_value = json.dumps(validated_values)
-                                except DatasetField.DoesNotExist:
+                                else:
                                     field_value = json.dumps(parsed)
                             else:
                                 field_value = json.dumps([parsed])
@@ -118,11 +121,11 @@ def entry_create_view(request, geometry_id):
     
     # Check if user has access to this geometry's dataset
     dataset = geometry.dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
         return render(request, 'datasets/403.html', status=403)
-    if not dataset.user_has_geometry_access(request.user, geometry):
+    if not get_dataset_access(request, dataset).has_geometry_access(geometry):
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
         return render(request, 'datasets/403.html', status=403)
@@ -146,17 +149,13 @@ def entry_create_view(request, geometry_id):
             )
             
             # Create field values
+            schema = get_dataset_schema(dataset)
             for key, value in request.POST.items():
                 if key not in ['name', 'year', 'geometry_id', 'csrfmiddlewaretoken']:
                     # Skip empty values to avoid creating empty fields
                     if value and value.strip():
-                        # Get field type from DatasetField if it exists
-                        field_type = 'text'  # default
-                        try:
-                            dataset_field = DatasetField.objects.get(dataset=dataset, field_name=key)
-                            field_type = dataset_field.field_type
-                        except DatasetField.DoesNotExist:
-                            pass
+                        # Get field type from the dataset schema if the field exists
+                        field_type = schema.field_type(key)
                         
                         # Handle multiple_choice fields - validate and store as JSON
                         if field_type == 'multiple_choice':
@@ -166,12 +165,12 @@ def entry_create_view(request, geometry_id):
                                 parsed = json.loads(value)
                                 if isinstance(parsed, list):
                                     # Validate against available choices
-                                    try:
-                                        dataset_field = DatasetField.objects.get(dataset=dataset, field_name=key)
-                                        available_values = [str(opt.get('value', opt) if isinstance(opt, dict) else opt) for opt in dataset_field.get_choices_list()]
+                                    dataset_field = schema.get(key)
+                                    if dataset_field is not None:
+                                        available_values = dataset_field.choice_values
                                         validated_values = [v for v in parsed if str(v) in available_values]
                                         value = json.dumps(validated_values)
-                                    except DatasetField.DoesNotExist:
+                                    else:
                                         value = json.dumps(parsed)
                                 else:
                                     value = json.dumps([parsed])
@@ -227,9 +226,9 @@ def save_entries_view(request):
         
         # Check if user has access to this dataset
         dataset = geometry.dataset
-        if not dataset.can_access(request.user):
+        if not get_dataset_access(request, dataset).can_access:
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
-        if not dataset.user_has_geometry_access(request.user, geometry):
+        if not get_dataset_access(request, dataset).has_geometry_access(geometry):
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
         
         # Process entries data
@@ -250,6 +249,7 @@ def save_entries_view(request):
                         entries_data[entry_index]['fields'][field_name] = value
         
         # Update entries
+        schema = get_dataset_schema(dataset)
         updated_count = 0
         for entry_data in entries_data.values():
             if entry_data['id']:
@@ -258,13 +258,8 @@ def save_entries_view(request):
                     
                     # Update field values
                     for field_name, field_value in entry_data['fields'].items():
-                        # Get field type from DatasetField if it exists
-                        field_type = 'text'  # default
-                        try:
-                            dataset_field = DatasetField.objects.get(dataset=dataset, field_name=field_name)
-                            field_type = dataset_field.field_type
-                        except DatasetField.DoesNotExist:
-                            pass
+                        # Get field type from the dataset schema if the field exists
+                        field_type = schema.field_type(field_name)
                         
                         # Handle multiple_choice fields - validate and store as JSON
                         if field_type == 'multiple_choice':
@@ -274,12 +269,12 @@ def save_entries_view(request):
                                 parsed = json.loads(field_value)
                                 if isinstance(parsed, list):
                                     # Validate against available choices
-                                    try:
-                                        dataset_field = DatasetField.objects.get(dataset=dataset, field_name=field_name)
-                                        available_values = [str(opt.get('value', opt) if isinstance(opt, dict) else opt) for opt in dataset_field.get_choices_list()]
+                                    dataset_field = schema.get(field_name)
+                                    if dataset_field is not None:
+                                        available_values = dataset_field.choice_values
                                         validated_values = [v for v in parsed if str(v) in available_values]
                                         field_value = json.dumps(validated_values)
-                                    except DatasetField.DoesNotExist:
+                                    else:
                                         field_value = json.dumps(parsed)
                                 else:
                                     field_value = json.dumps([parsed])
@@ -310,3 +305,167 @@ def save_entries_view(request):
         
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+BULK_SAVE_BOOLEAN_VALUES = {
+    'true': 'true', '1': 'true', 'yes': 'true', 'on': 'true',
+    'false': 'false', '0': 'false', 'no': 'false', 'off': 'false',
+}
+
+
+def _coerce_bulk_field_value(dataset_field, value):
+    """
+    Validate a submitted value against its field definition and return the
+    string stored in DataEntryField.value. Raises ValueError for invalid values.
+    """
+    field_type = dataset_field.field_type
+    if value is None:
+        return '[]' if field_type == 'multiple_choice' else ''
+
+    if field_type == 'multiple_choice':
+        if isinstance(value, str):
+            try:
+                value = json.loads(value) if value.strip() else []
+            except json.JSONDecodeError:
+                # Fallback: treat as comma-separated string
+                value = [v.strip() for v in value.split(',') if v.strip()]
+        if not isinstance(value, list):
+            value = [value]
+        available_values = dataset_field.choice_values
+        if available_values:
+            value = [v for v in value if str(v) in available_values]
+        return json.dumps(value)
+
+    if isinstance(value, (list, dict)):
+        raise ValueError(value)
+    if isinstance(value, bool):
+        value = 'true' if value else 'false'
+    text = str(value).strip()
+    if text == '':
+        return ''
+
+    if field_type == 'integer':
+        return str(int(text))
+    if field_type == 'decimal':
+        float(text)
+        return text
+    if field_type == 'boolean':
+        if text.lower() not in BULK_SAVE_BOOLEAN_VALUES:
+            raise ValueError(text)
+        return BULK_SAVE_BOOLEAN_VALUES[text.lower()]
+    if field_type == 'date':
+        datetime.strptime(text, '%Y-%m-%d')
+        return text
+    # text, textarea, choice
+    return str(value)
+
+
+@login_required
+def save_entries_bulk_view(request):
+    """
+    Save field values of several entries from a JSON payload:
+
+        {"geometry_id": 1, "entries": [{"id": 2, "fields": {"height": 12}}]}
+
+    The dataset's field schema is loaded once and all values are validated
+    before anything is written. Values are stored with a single upsert, so the
+    number of queries does not depend on the number of entries or fields.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Only POST method allowed'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'success': False, 'error': 'Invalid JSON'}, status=400)
+
+    geometry_id = data.get('geometry_id') if isinstance(data, dict) else None
+    entries_data = data.get('entries') if isinstance(data, dict) else None
+    if not geometry_id:
+        return JsonResponse({'success': False, 'error': 'Geometry ID is required'}, status=400)
+    if not isinstance(entries_data, list) or not all(isinstance(item, dict) for item in entries_data):
+        return JsonResponse({'success': False, 'error': 'Entries must be a list'}, status=400)
+
+    try:
+        try:
+            geometry = DataGeometry.objects.select_related('dataset').get(pk=geometry_id)
+        except (DataGeometry.DoesNotExist, ValueError, TypeError):
+            return JsonResponse({'success': False, 'error': 'Geometry not found'}, status=404)
+
+        dataset = geometry.dataset
+        if not get_dataset_access(request, dataset).can_access:
+            return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+        if not get_dataset_access(request, dataset).has_geometry_access(geometry):
+            return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+
+        schema = get_dataset_schema(dataset)
+        entry_ids = {str(item.get('id')) for item in entries_data}
+        entries = {
+            str(entry.id): entry
+            for entry in DataEntry.objects.filter(
+                geometry=geometry, id__in=[i for i in entry_ids if i.isdigit()]
+            )
+        }
+
+        # Validate everything in memory before writing
+        errors = {}
+        field_objects = {}
+        for item in entries_data:
+            entry_key = str(item.get('id'))
+            entry = entries.get(entry_key)
+            if entry is None:
+                errors[entry_key] = {'__all__': 'Entry not found'}
+                continue
+            fields = item.get('fields') or {}
+            if not isinstance(fields, dict):
+                errors[entry_key] = {'__all__': 'Fields must be an object'}
+                continue
+            for field_name, value in fields.items():
+                dataset_field = schema.get(field_name)
+                if dataset_field is None:
+                    errors.setdefault(entry_key, {})[field_name] = 'Unknown field'
+                    continue
+                if dataset_field.non_editable or dataset_field.field_type == 'headline':
+                    continue
+                try:
+                    stored_value = _coerce_bulk_field_value(dataset_field, value)
+                except (ValueError, TypeError):
+                    errors.setdefault(entry_key, {})[field_name] = f'Invalid {dataset_field.field_type} value'
+                    continue
+                # A value submitted twice for the same entry keeps the last one
+                field_objects[(entry.pk, field_name)] = DataEntryField(
+                    entry=entry,
+                    field_name=field_name,
+                    field_type=dataset_field.field_type,
+                    value=stored_value,
+                )
+
+        if errors:
+            return JsonResponse({'success': False, 'error': 'Validation failed', 'errors': errors}, status=400)
+
+        with transaction.atomic():
+            if field_objects:
+                DataEntryField.objects.bulk_create(
+                    list(field_objects.values()),
+                    update_conflicts=True,
+                    unique_fields=['entry', 'field_name'],
+                    update_fields=['value', 'field_type', 'updated_at'],
+                )
+                # bulk_create skips the signal handlers that maintain progress
+                # and the revision
+                progress_changed(entries={entry_id for entry_id, _ in field_objects})
+                bump_dataset_revision([geometry.dataset_id])
+            if entries:
+                DataEntry.objects.filter(pk__in=[entry.pk for entry in entries.values()]).update(
+                    updated_at=timezone.now()
+                )
+
+        return JsonResponse({
+            'success': True,
+            'updated_entries': len(entries),
+            'updated_fields': len(field_objects),
+            'message': f'Successfully updated {len(entries)} entries'
+        })
+
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -5,10 +5,11 @@ This module provides web-based file export functionality with:
 1. ZIP archive downloads with geometry/entry ID prefixes
 2. Email notifications when export is completed
 3. Background task processing
-4. Task status tracking
+4. Task status tracking and downloads, also for cached tabular exports
 """
 
 import os
+import re
 import zipfile
 import csv
 import json
@@ -16,15 +17,20 @@ from datetime import datetime
 from pathlib import Path
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, render, redirect
-from django.http import HttpResponse, JsonResponse, Http404
+from django.http import FileResponse, HttpResponse, JsonResponse, Http404, StreamingHttpResponse
 from django.conf import settings
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Count
 from django.contrib import messages
+from django.db import transaction
 from django.utils import timezone
 from django.core.files.storage import default_storage
+from django.utils.http import content_disposition_header
 
+from ..access import get_dataset_access
+from ..exports import EXPORT_FORMATS, find_cached_export, get_export_cache_key, get_zip_export_cache_key
+from ..file_stats import get_dataset_file_statistics
 from ..models import DataSet, DataEntry, DataEntryFile, ExportTask
-from ..tasks import start_export_task
+from ..tasks import get_previous_zip_export, start_dataset_export_task, start_export_task
 
 
 @login_required
@@ -33,7 +39,7 @@ def dataset_files_export_view(request, dataset_id):
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     # Get file statistics
@@ -41,15 +47,23 @@ def dataset_files_export_view(request, dataset_id):
         entry__geometry__dataset=dataset
     ).select_related('entry', 'entry__geometry', 'upload_user')
     
-    stats = calculate_file_statistics(files_queryset)
+    stats = get_dataset_file_statistics(dataset)
     
     # Get recent files
     recent_files = files_queryset.order_by('-upload_date')[:10]
+
+    # Files added since the last ZIP export are offered as an incremental export
+    last_export = get_previous_zip_export(dataset.id, request.user.id)
+    new_files_count = None
+    if last_export is not None:
+        new_files_count = files_queryset.filter(id__gt=last_export.watermark_file_id).count()
     
     return render(request, 'datasets/dataset_files_export.html', {
         'dataset': dataset,
         'stats': stats,
         'recent_files': recent_files,
+        'last_export': last_export,
+        'new_files_count': new_files_count,
         'file_types': get_file_type_options(),
         'organize_options': get_organize_options(),
     })
@@ -60,7 +74,7 @@ def export_files_zip_view(request, dataset_id):
     """Export files as ZIP archive with email notification"""
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     if request.method == 'POST':
@@ -70,6 +84,7 @@ def export_files_zip_view(request, dataset_id):
         date_to = request.POST.get('date_to')
         organize_by = request.POST.get('organize_by', 'geometry')
         include_metadata = request.POST.get('include_metadata', 'true').lower() == 'true'
+        incremental = request.POST.get('incremental', 'false').lower() in ('true', 'on')
         email_notification = request.POST.get('email_notification', 'true').lower() == 'true'
         
         # Convert date strings to date objects
@@ -97,20 +112,56 @@ def export_files_zip_view(request, dataset_id):
         
         # Start export task
         try:
-            task = start_export_task(
-                dataset_id=dataset_id,
-                user_id=request.user.id,
-                file_types=file_types,
-                date_from=date_from_obj,
-                date_to=date_to_obj,
-                organize_by=organize_by,
-                include_metadata=include_metadata
-            )
-            
-            if email_notification:
-                messages.success(request, f'Export task started! You will receive an email notification when the ZIP file is ready for download.')
-            else:
-                messages.success(request, f'Export task started! Please check back in a few minutes for your download.')
+            with transaction.atomic():
+                # Identical requests for the dataset are handled one at a time,
+                # so concurrent clicks join the same task
+                DataSet.objects.select_for_update().get(pk=dataset.pk)
+                task = None
+                cache_key = ''
+                if not incremental:
+                    cache_key = get_zip_export_cache_key(dataset, {
+                        'file_types': sorted(file_types),
+                        'date_from': date_from_obj.isoformat() if date_from_obj else None,
+                        'date_to': date_to_obj.isoformat() if date_to_obj else None,
+                        'organize_by': organize_by,
+                        'include_metadata': include_metadata,
+                    })
+                    task = find_cached_export(dataset, cache_key)
+                    if task is None:
+                        running = ExportTask.objects.filter(
+                            dataset=dataset, cache_key=cache_key, status__in=['pending', 'processing']
+                        ).order_by('created_at').first()
+                        if running:
+                            # Locked so the task cannot send its emails before this
+                            # user is added to the recipients
+                            task = ExportTask.objects.select_for_update().get(pk=running.pk)
+                
+                if task:
+                    if task.status == 'completed':
+                        messages.success(request, 'An identical export with the current files is ready for download.')
+                    elif email_notification:
+                        task.notify_users.add(request.user)
+                        messages.info(request, 'An identical export is already running. You will receive an email notification when the ZIP file is ready for download.')
+                    else:
+                        messages.info(request, 'An identical export is already running. Please check back in a few minutes for your download.')
+                else:
+                    task = start_export_task(
+                        dataset_id=dataset_id,
+                        user_id=request.user.id,
+                        file_types=file_types,
+                        date_from=date_from_obj,
+                        date_to=date_to_obj,
+                        organize_by=organize_by,
+                        include_metadata=include_metadata,
+                        incremental=incremental,
+                        cache_key=cache_key,
+                        notify=email_notification
+                    )
+                    
+                    if email_notification:
+                        messages.success(request, f'Export task started! You will receive an email notification when the ZIP file is ready for download.')
+                    else:
+                        messages.success(request, f'Export task started! Please check back in a few minutes for your download.')
             
             return redirect('export_task_status', task_id=task.task_id)
             
@@ -122,13 +173,31 @@ def export_files_zip_view(request, dataset_id):
     return redirect('dataset_files_export', dataset_id=dataset_id)
 
 
+def can_access_export_task(request, task):
+    """
+    Whether a user may see and download an export task.
+
+    Cached exports (tasks with a cache key) are shared with every user who
+    can access the dataset, as long as the export was made with the same
+    mapping area restrictions as the user has.
+    """
+    if task.user_id == request.user.id:
+        return True
+    access = get_dataset_access(request, task.dataset)
+    if not task.cache_key or not access.can_access:
+        return False
+    if 'mapping_area_ids' in task.export_options:
+        return task.export_options['mapping_area_ids'] == access.mapping_area_ids
+    return True
+
+
 @login_required
 def export_task_status_view(request, task_id):
     """View export task status and download link"""
     task = get_object_or_404(ExportTask, task_id=task_id)
     
     # Check if user has access to this task
-    if task.user != request.user:
+    if not can_access_export_task(request, task):
         return render(request, 'datasets/403.html', status=403)
     
     # Prepare context
@@ -152,7 +221,7 @@ def download_export_file_view(request, task_id):
     task = get_object_or_404(ExportTask, task_id=task_id)
     
     # Check if user has access to this task
-    if task.user != request.user:
+    if not can_access_export_task(request, task):
         return render(request, 'datasets/403.html', status=403)
     
     # Check if task is completed
@@ -166,48 +235,120 @@ def download_export_file_view(request, task_id):
         messages.error(request, 'Export file not found. Please try exporting again.')
         return redirect('dataset_files_export', dataset_id=task.dataset.id)
     
-    # Create download response
-    response = HttpResponse(content_type='application/zip')
-    response['Content-Disposition'] = f'attachment; filename="{task.dataset.name}_files_{task.task_id[:8]}.zip"'
+    return export_file_response(request, task, file_path)
+
+
+# Bytes sent per chunk of a partial (Range) download
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def _parse_range_header(header, size):
+    """
+    Parse a single-range "bytes=" Range header into (start, end), inclusive.
+
+    Returns None for headers that are not a single byte range, which are
+    answered with the full file, and raises ValueError for ranges that lie
+    outside the file.
+    """
+    match = re.fullmatch(r'bytes=(\d*)-(\d*)', (header or '').strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise ValueError('Range not satisfiable')
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def _iter_file_range(file_path, start, length):
+    with open(file_path, 'rb') as handle:
+        handle.seek(start)
+        while length > 0:
+            chunk = handle.read(min(DOWNLOAD_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def export_file_response(request, task, file_path=None):
+    """
+    Stream the file of a completed export task as a download.
+
+    Single byte ranges are answered with 206 Partial Content, so interrupted
+    downloads of large archives can be resumed.
+    """
+    file_path = file_path or Path(settings.MEDIA_ROOT) / task.file_path
+    if task.export_format in EXPORT_FORMATS:
+        content_type = EXPORT_FORMATS[task.export_format]['content_type']
+        filename = file_path.name
+    else:
+        content_type = 'application/zip'
+        filename = f"{task.dataset.name}_files_{task.task_id[:8]}.zip"
     
-    with open(file_path, 'rb') as f:
-        response.write(f.read())
+    size = file_path.stat().st_size
+    try:
+        byte_range = _parse_range_header(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
     
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _iter_file_range(file_path, start, end - start + 1), status=206, content_type=content_type
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    else:
+        response = FileResponse(open(file_path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
     return response
 
 
-def calculate_file_statistics(files_queryset):
-    """Calculate comprehensive file statistics"""
-    stats = {
-        'total_files': files_queryset.count(),
-        'total_size': files_queryset.aggregate(total=Sum('file_size'))['total'] or 0,
-        'file_types': {},
-        'users': {},
-        'geometries': {},
-        'date_range': {'earliest': None, 'latest': None},
-    }
+def cached_export_response(request, dataset, export_format, options):
+    """
+    Serve a dataset export from the cache, or start generating it.
+
+    Completed exports with the same cache key are served to any user with
+    access; otherwise a running export with the same key is joined or a new
+    export task is started and the user is sent to its status page.
+    """
+    cache_key = get_export_cache_key(dataset, export_format, options)
+    task = find_cached_export(dataset, cache_key)
+    if task:
+        return export_file_response(request, task)
     
-    for file_obj in files_queryset:
-        # File type stats
-        file_type = file_obj.file_type.split('/')[0]
-        stats['file_types'][file_type] = stats['file_types'].get(file_type, 0) + 1
-        
-        # User stats
-        user = file_obj.upload_user.username if file_obj.upload_user else 'Unknown'
-        stats['users'][user] = stats['users'].get(user, 0) + 1
-        
-        # Geometry stats
-        geom_id = file_obj.entry.geometry.id_kurz
-        stats['geometries'][geom_id] = stats['geometries'].get(geom_id, 0) + 1
-        
-        # Date range
-        upload_date = file_obj.upload_date.date()
-        if not stats['date_range']['earliest'] or upload_date < stats['date_range']['earliest']:
-            stats['date_range']['earliest'] = upload_date
-        if not stats['date_range']['latest'] or upload_date > stats['date_range']['latest']:
-            stats['date_range']['latest'] = upload_date
-    
-    return stats
+    task = ExportTask.objects.filter(
+        dataset=dataset, cache_key=cache_key, status__in=['pending', 'processing']
+    ).order_by('created_at').first()
+    if not task:
+        task = start_dataset_export_task(dataset, request.user, export_format, options, cache_key)
+        if task.status == 'completed':
+            return export_file_response(request, task)
+    return redirect('export_task_status', task_id=task.task_id)
+
+
+@login_required
+def dataset_geopackage_export_view(request, dataset_id):
+    """Export the geometries visible to the user as a GeoPackage, generated in the background"""
+    dataset = get_object_or_404(DataSet, id=dataset_id)
+    
+    if not get_dataset_access(request, dataset).can_access:
+        return render(request, 'datasets/403.html', status=403)
+    
+    # Users with the same mapping area restrictions share cached exports
+    options = {'mapping_area_ids': get_dataset_access(request, dataset).mapping_area_ids}
+    return cached_export_response(request, dataset, 'gpkg', options)
 
 
 def get_file_type_options():
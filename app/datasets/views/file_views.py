@@ -7,6 +7,7 @@ from django.conf import settings
 import os
 import mimetypes
 
+from ..access import get_dataset_access
 from ..models import DataSet, DataGeometry, DataEntry, DataEntryFile
 
 
@@ -17,9 +18,9 @@ def file_upload_view(request, entry_id):
     
     # Check if user has access to this entry's dataset
     dataset = entry.geometry.dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
-    if not dataset.user_has_geometry_access(request.user, entry.geometry):
+    if not get_dataset_access(request, dataset).has_geometry_access(entry.geometry):
         return render(request, 'datasets/403.html', status=403)
     
     if request.method == 'POST':
@@ -61,9 +62,9 @@ def file_download_view(request, file_id):
     
     # Check if user has access to this file's dataset
     dataset = file_obj.entry.geometry.dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
-    if not dataset.user_has_geometry_access(request.user, file_obj.entry.geometry):
+    if not get_dataset_access(request, dataset).has_geometry_access(file_obj.entry.geometry):
         return render(request, 'datasets/403.html', status=403)
     
     if os.path.exists(file_obj.file.path):
@@ -82,9 +83,9 @@ def file_delete_view(request, file_id):
     
     # Check if user has access to this file's dataset
     dataset = file_obj.entry.geometry.dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
-    if not dataset.user_has_geometry_access(request.user, file_obj.entry.geometry):
+    if not get_dataset_access(request, dataset).has_geometry_access(file_obj.entry.geometry):
         return render(request, 'datasets/403.html', status=403)
     
     if request.method == 'POST':
@@ -117,9 +118,9 @@ def upload_files_view(request):
         
         # Check if user has access to this dataset
         dataset = geometry.dataset
-        if not dataset.can_access(request.user):
+        if not get_dataset_access(request, dataset).can_access:
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
-        if not dataset.user_has_geometry_access(request.user, geometry):
+        if not get_dataset_access(request, dataset).has_geometry_access(geometry):
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
         
         files = request.FILES.getlist('files')
@@ -178,9 +179,9 @@ def geometry_files_view(request, geometry_id):
         
         # Check if user has access to this dataset
         dataset = geometry.dataset
-        if not dataset.can_access(request.user):
+        if not get_dataset_access(request, dataset).can_access:
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
-        if not dataset.user_has_geometry_access(request.user, geometry):
+        if not get_dataset_access(request, dataset).has_geometry_access(geometry):
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
         
         files = DataEntryFile.objects.filter(entry__geometry=geometry).order_by('-upload_date')
@@ -217,9 +218,9 @@ def delete_file_view(request, file_id):
         
         # Check if user has access to this file's dataset
         dataset = file_obj.entry.geometry.dataset
-        if not dataset.can_access(request.user):
+        if not get_dataset_access(request, dataset).can_access:
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
-        if not dataset.user_has_geometry_access(request.user, file_obj.entry.geometry):
+        if not get_dataset_access(request, dataset).has_geometry_access(file_obj.entry.geometry):
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
         
         filename = file_obj.filename
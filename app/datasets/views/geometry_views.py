@@ -5,7 +5,9 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.contrib.gis.geos import Point
 
-from ..models import DataSet, DataGeometry, DataEntry, DataEntryField, DatasetField
+from ..access import get_dataset_access
+from ..models import DataSet, DataGeometry, DataEntry, DataEntryField
+from ..schema import get_dataset_schema
 
 
 @login_required
@@ -14,7 +16,7 @@ def geometry_create_view(request, dataset_id):
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
         return render(request, 'datasets/403.html', status=403)
@@ -91,24 +93,19 @@ def geometry_create_view(request, dataset_id):
     })
 
 
-@login_required
-def geometry_details_view(request, geometry_id):
-    """API endpoint to get detailed data for a specific geometry point"""
-    try:
-        geometry = get_object_or_404(DataGeometry, pk=geometry_id)
-        if not geometry.dataset.can_access(request.user):
-            return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
-        if not geometry.dataset.user_has_geometry_access(request.user, geometry):
-            return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
-        
-        # Get enabled fields for this dataset in the correct order
-        enabled_fields = DatasetField.order_fields(DatasetField.objects.filter(
-            dataset=geometry.dataset, 
-            enabled=True
-        ))
-        
-        # Prepare detailed geometry data
-        geometry_data = {
+GEOMETRY_DETAILS_BATCH_LIMIT = 100
+
+
+def _serialize_geometry_details(geometries, field_names):
+    """
+    Build the details payload for a list of geometries of one dataset.
+
+    Entries and their field values are fetched with one query each and
+    pivoted in memory, independent of the number of entries and fields.
+    """
+    geometry_data = {}
+    for geometry in geometries:
+        geometry_data[geometry.id] = {
             'id': geometry.id,
             'id_kurz': geometry.id_kurz,
             'address': geometry.address,
@@ -117,27 +114,44 @@ def geometry_details_view(request, geometry_id):
             'user': geometry.user.username if geometry.user else 'Unknown',
             'entries': []
         }
-        
-        # Add entry data for this geometry
-        for entry in geometry.entries.all():
-            entry_data = {
-                'id': entry.id,
-                'name': entry.name,
-                'year': entry.year,
-                'user': entry.user.username if entry.user else 'Unknown'
-            }
-            
-            # Add only enabled field values in the correct order
-            for field_config in enabled_fields:
-                # Find the corresponding field value for this entry
-                field_value = entry.fields.filter(field_name=field_config.field_name).first()
-                if field_value:
-                    entry_data[field_config.field_name] = field_value.get_typed_value()
-                else:
-                    # Field is configured but no data exists yet
-                    entry_data[field_config.field_name] = None
-            
-            geometry_data['entries'].append(entry_data)
+
+    entries = DataEntry.objects.filter(geometry_id__in=geometry_data).select_related('user')
+    entry_data = {}
+    for entry in entries:
+        data = {
+            'id': entry.id,
+            'name': entry.name,
+            'year': entry.year,
+            'user': entry.user.username if entry.user else 'Unknown'
+        }
+        # Fields that are configured but have no data yet stay None
+        for field_name in field_names:
+            data[field_name] = None
+        entry_data[entry.id] = data
+        geometry_data[entry.geometry_id]['entries'].append(data)
+
+    if entry_data and field_names:
+        field_values = DataEntryField.objects.filter(
+            entry_id__in=entry_data, field_name__in=field_names
+        ).only('entry_id', 'field_name', 'field_type', 'value').order_by()
+        for field_value in field_values:
+            entry_data[field_value.entry_id][field_value.field_name] = field_value.get_typed_value()
+
+    return [geometry_data[geometry.id] for geometry in geometries]
+
+
+@login_required
+def geometry_details_view(request, geometry_id):
+    """API endpoint to get detailed data for a specific geometry point"""
+    try:
+        geometry = get_object_or_404(DataGeometry.objects.select_related('dataset', 'user'), pk=geometry_id)
+        if not get_dataset_access(request, geometry.dataset).can_access:
+            return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+        if not get_dataset_access(request, geometry.dataset).has_geometry_access(geometry):
+            return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+
+        field_names = get_dataset_schema(geometry.dataset).enabled_field_names
+        geometry_data = _serialize_geometry_details([geometry], field_names)[0]
         
         return JsonResponse({
             'success': True,
@@ -146,3 +160,50 @@ def geometry_details_view(request, geometry_id):
         
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@login_required
+def geometry_details_batch_view(request):
+    """API endpoint to get detailed data for several geometry points at once (?ids=1,2,3)"""
+    try:
+        geometry_ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid geometry ids'}, status=400)
+    if not geometry_ids:
+        return JsonResponse({'success': False, 'error': 'No geometry ids given'}, status=400)
+    if len(geometry_ids) > GEOMETRY_DETAILS_BATCH_LIMIT:
+        return JsonResponse({
+            'success': False,
+            'error': f'At most {GEOMETRY_DETAILS_BATCH_LIMIT} geometries can be requested at once'
+        }, status=400)
+
+    try:
+        geometries_by_dataset = {}
+        geometries = DataGeometry.objects.filter(id__in=geometry_ids).select_related('dataset', 'user').order_by('id')
+        for geometry in geometries:
+            geometries_by_dataset.setdefault(geometry.dataset_id, []).append(geometry)
+
+        # Geometries that do not exist or are not accessible are reported as missing
+        details = []
+        for dataset_geometries in geometries_by_dataset.values():
+            dataset = dataset_geometries[0].dataset
+            if not get_dataset_access(request, dataset).can_access:
+                continue
+            allowed_ids = set(
+                get_dataset_access(request, dataset).filter_geometries(
+                    DataGeometry.objects.filter(id__in=[geometry.id for geometry in dataset_geometries])
+                ).values_list('id', flat=True)
+            )
+            allowed = [geometry for geometry in dataset_geometries if geometry.id in allowed_ids]
+            if allowed:
+                details.extend(_serialize_geometry_details(allowed, get_dataset_schema(dataset).enabled_field_names))
+
+        found_ids = {data['id'] for data in details}
+        return JsonResponse({
+            'success': True,
+            'geometries': details,
+            'missing': [geometry_id for geometry_id in dict.fromkeys(geometry_ids) if geometry_id not in found_ids]
+        })
+
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
@@ -2,18 +2,26 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.contrib.gis.geos import Point
 import json
 import csv
 import io
+import os
+import uuid
 import logging
 from datetime import datetime
+from pathlib import Path
+from django.conf import settings
 from django.db import connection, IntegrityError
 
-from ..models import DataSet, DataGeometry, DataEntry, DataEntryField, DatasetField
+from ..access import get_dataset_access
+from ..models import DataSet, DataGeometry, DataEntry, DataEntryField, DatasetField, ImportTask
+from ..exports import iter_csv_export_rows, iter_geojson_export, iter_ndjson_export
+from ..tasks import delete_stale_import_uploads, fail_csv_import, iter_csv_lines, start_csv_import_task
+from .export_views import cached_export_response
 
 # Set up logging for import debugging
 logger = logging.getLogger(__name__)
@@ -97,18 +105,93 @@ def detect_csv_delimiter(csv_content, sample_size=1024):
     return best_delimiter
 
 
+def parse_coordinate_system(coordinate_system):
+    """SRID selected for an import ('auto' means WGS84), or None if PostGIS does not know it"""
+    if coordinate_system == 'auto':
+        return 4326
+    try:
+        srid = int(coordinate_system)
+    except (TypeError, ValueError):
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM spatial_ref_sys WHERE srid = %s", [srid])
+        return srid if cursor.fetchone() else None
+
+
+def _get_session_import_task(request, dataset):
+    """Return the uploaded import task stored in the session, if any"""
+    task_id = request.session.get('csv_import_task')
+    if not task_id:
+        return None
+    return ImportTask.objects.filter(
+        task_id=task_id, dataset=dataset, user=request.user, status='uploaded'
+    ).first()
+
+
+def _read_csv_preview(task, max_rows=10):
+    """Read the header and the first rows of an uploaded CSV file"""
+    with open(task.file_path, 'rb') as handle:
+        csv_reader = csv.DictReader(iter_csv_lines(handle, {'bytes': 0}), delimiter=task.delimiter)
+        rows = []
+        for row in csv_reader:
+            if len(rows) >= max_rows:
+                break
+            rows.append(row)
+        return csv_reader.fieldnames or [], rows
+
+
+def _create_import_task(request, dataset, chunks, file_name):
+    """Write an uploaded CSV file to the import directory and create its task"""
+    task_id = str(uuid.uuid4())
+    import_dir = Path(settings.CSV_IMPORT_TEMP_DIR)
+    import_dir.mkdir(parents=True, exist_ok=True)
+    file_path = import_dir / f'{task_id}.csv'
+
+    file_size = 0
+    sample = b''
+    with open(file_path, 'wb') as destination:
+        for chunk in chunks:
+            if len(sample) < 64 * 1024:
+                sample += chunk[:64 * 1024 - len(sample)]
+            destination.write(chunk)
+            file_size += len(chunk)
+
+    # Fail early for files that are not UTF-8 encoded
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character may be cut off at the end of the sample
+        if e.start < len(sample) - 3:
+            os.remove(file_path)
+            raise
+
+    # Detect delimiter
+    delimiter = detect_csv_delimiter(sample)
+    logger.info(f"Detected CSV delimiter: '{delimiter}' for file: {file_name}")
+
+    return ImportTask.objects.create(
+        dataset=dataset,
+        user=request.user,
+        task_id=task_id,
+        file_path=str(file_path),
+        file_name=file_name,
+        file_size=file_size,
+        delimiter=delimiter,
+    )
+
+
 @login_required
 def dataset_csv_column_selection_view(request, dataset_id):
     """CSV column selection view for import"""
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
-    # Get CSV data from session
-    csv_data = request.session.get('csv_data')
-    if not csv_data:
+    # Get the uploaded CSV file from the session's import task
+    task = _get_session_import_task(request, dataset)
+    if not task or not os.path.exists(task.file_path):
         messages.error(request, 'No CSV data found. Please upload a file first.')
         return redirect('dataset_csv_import', dataset_id=dataset.id)
     
@@ -117,31 +200,41 @@ def dataset_csv_column_selection_view(request, dataset_id):
         coordinate_system = request.POST.get('coordinate_system')
         
         if id_column and coordinate_system:
-            # Process the CSV import
-            return process_csv_import(request, dataset, csv_data, 'imported_file.csv', id_column, coordinate_system)
+            srid = parse_coordinate_system(coordinate_system)
+            task.id_column = id_column
+            task.x_column = request.POST.get('x_column', 'X')
+            task.y_column = request.POST.get('y_column', 'Y')
+            task.srid = srid or task.srid
+            task.clear_existing = request.POST.get('clear_existing') == 'on'
+            task.save()
+            del request.session['csv_import_task']
+
+            if srid is None:
+                # Recorded on the task, whose page shows the error
+                fail_csv_import(f'Unknown coordinate system: {coordinate_system}', task.task_id)
+                return redirect('import_task', dataset_id=dataset.id, task_id=task.task_id)
+
+            # Process the CSV import in the background
+            start_csv_import_task(task)
+            return redirect('import_task', dataset_id=dataset.id, task_id=task.task_id)
         else:
             messages.error(request, 'Please select an ID column and coordinate system.')
     
     # Parse CSV to get column names
     try:
-        delimiter = request.session.get('csv_delimiter', ',')
-        logger.info(f"Using delimiter '{delimiter}' for column parsing")
-        csv_reader = csv.DictReader(io.StringIO(csv_data), delimiter=delimiter)
-        columns = csv_reader.fieldnames or []
+        logger.info(f"Using delimiter '{task.delimiter}' for column parsing")
+        columns, sample_rows = _read_csv_preview(task)
         logger.info(f"Detected columns: {columns[:10]}...")  # Log first 10 columns
         
         # Check for potential ID conflicts
         id_conflicts = []
         if columns:
             # Get a sample of IDs from the CSV to check for conflicts
-            csv_reader_sample = csv.DictReader(io.StringIO(csv_data), delimiter=delimiter)
             sample_ids = []
-            for i, row in enumerate(csv_reader_sample):
-                if i >= 10:  # Only check first 10 rows
-                    break
+            for row in sample_rows:
                 # Try common ID column names
                 for id_col in ['id', 'ID', 'id_kurz', 'ID_KURZ', 'geometry_id', 'GEOMETRY_ID']:
-                    if id_col in row and row[id_col].strip():
+                    if id_col in row and row[id_col] and row[id_col].strip():
                         sample_ids.append(row[id_col].strip())
                         break
             
@@ -178,23 +271,18 @@ def dataset_csv_import_view(request, dataset_id):
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     if request.method == 'POST':
         csv_file = request.FILES.get('csv_file')
         if csv_file:
             try:
-                # Read and decode the file
-                decoded_file = csv_file.read().decode('utf-8')
-                
-                # Detect delimiter
-                delimiter = detect_csv_delimiter(decoded_file)
-                logger.info(f"Detected CSV delimiter: '{delimiter}' for file: {csv_file.name}")
-                request.session['csv_delimiter'] = delimiter
-                
-                # Store CSV data in session
-                request.session['csv_data'] = decoded_file
+                # Uploads abandoned before the column selection keep their files
+                delete_stale_import_uploads()
+                # Stream the upload to a temporary file instead of the session
+                task = _create_import_task(request, dataset, csv_file.chunks(), csv_file.name)
+                request.session['csv_import_task'] = task.task_id
                 
                 # Redirect to column selection
                 return redirect('dataset_csv_column_selection', dataset_id=dataset.id)
@@ -209,166 +297,47 @@ def dataset_csv_import_view(request, dataset_id):
     })
 
 
+def _get_import_task_for_user(request, dataset_id, task_id):
+    task = get_object_or_404(ImportTask.objects.select_related('dataset'), task_id=task_id, dataset_id=dataset_id)
+    if task.user != request.user and not request.user.is_superuser:
+        return None
+    return task
+
+
 @login_required
-def process_csv_import(request, dataset, decoded_file, csv_file_name, id_column, coordinate_system):
-    """Process CSV import and create geometries and entries"""
-    try:
-        # Clear existing data if requested
-        if request.POST.get('clear_existing') == 'on':
-            DataGeometry.objects.filter(dataset=dataset).delete()
-            messages.info(request, 'Existing data cleared.')
-        
-        # Parse CSV
-        delimiter = request.session.get('csv_delimiter', ',')
-        csv_reader = csv.DictReader(io.StringIO(decoded_file), delimiter=delimiter)
-        
-        # Get coordinate columns
-        x_column = request.POST.get('x_column', 'X')
-        y_column = request.POST.get('y_column', 'Y')
-        
-        # Process coordinate system
-        if coordinate_system == 'auto':
-            # Try to detect coordinate system from data
-            srid = 4326  # Default to WGS84
-        else:
-            srid = int(coordinate_system)
-        
-        imported_count = 0
-        errors = []
-        processed_ids = set()  # Track processed IDs within this dataset
-        
-        # First pass: collect all IDs and check for duplicates
-        all_ids = []
-        for row_num, row in enumerate(csv_reader, start=2):
-            geometry_id = row.get(id_column, '').strip()
-            if geometry_id:
-                all_ids.append((row_num, geometry_id))
-        
-        # Check for duplicates within the CSV
-        id_counts = {}
-        for row_num, geometry_id in all_ids:
-            if geometry_id in id_counts:
-                errors.append(f'Row {row_num}: Duplicate ID "{geometry_id}" within CSV (first occurrence at row {id_counts[geometry_id]})')
-            else:
-                id_counts[geometry_id] = row_num
-        
-        # Check for existing geometries in the current dataset only
-        existing_ids = set(DataGeometry.objects.filter(
-            dataset=dataset,
-            id_kurz__in=[id for _, id in all_ids]
-        ).values_list('id_kurz', flat=True))
-        
-        # Filter out problematic IDs
-        valid_ids = set()
-        for row_num, geometry_id in all_ids:
-            if geometry_id in existing_ids:
-                errors.append(f'Row {row_num}: ID "{geometry_id}" already exists in this dataset')
-            else:
-                valid_ids.add(geometry_id)
-        
-        
-        # Reset CSV reader for second pass
-        csv_reader = csv.DictReader(io.StringIO(decoded_file), delimiter=delimiter)
-        
-        with transaction.atomic():
-            for row_num, row in enumerate(csv_reader, start=2):  # Start at 2 for header
-                try:
-                    # Get ID and coordinates
-                    geometry_id = row.get(id_column, '').strip()
-                    x_coord = row.get(x_column, '').strip()
-                    y_coord = row.get(y_column, '').strip()
-                    
-                    if not geometry_id or not x_coord or not y_coord:
-                        errors.append(f'Row {row_num}: Missing required data')
-                        continue
-                    
-                    # Skip if ID is not valid
-                    if geometry_id not in valid_ids:
-                        continue
-                    
-                    # Convert coordinates
-                    try:
-                        x = float(x_coord)
-                        y = float(y_coord)
-                    except ValueError:
-                        errors.append(f'Row {row_num}: Invalid coordinates')
-                        continue
-                    
-                    # Create geometry point
-                    geometry = DataGeometry.objects.create(
-                        dataset=dataset,
-                        id_kurz=geometry_id,
-                        address=f'Unknown Address ({geometry_id})',
-                        geometry=Point(x, y, srid=srid),
-                        user=request.user
-                    )
-                    
-                    # Create entry
-                    entry = DataEntry.objects.create(
-                        geometry=geometry,
-                        name=geometry_id,
-                        user=request.user
-                    )
-                    
-                    # Create field values for all other columns
-                    for column, value in row.items():
-                        if column not in [id_column, x_column, y_column] and value.strip():
-                            # Get or create dataset field
-                            field, created = DatasetField.objects.get_or_create(
-                                dataset=dataset,
-                                field_name=column,
-                                defaults={
-                                    'label': column,
-                                    'field_type': 'text',
-                                    'enabled': True
-                                }
-                            )
-                            
-                            # Handle multiple_choice fields - convert comma-separated to JSON
-                            field_value = value.strip()
-                            if field.field_type == 'multiple_choice':
-                                import json
-                                # Parse comma-separated values from CSV
-                                values_list = [v.strip() for v in field_value.split(',') if v.strip()]
-                                # Validate against available choices
-                                available_values = [str(opt.get('value', opt) if isinstance(opt, dict) else opt) for opt in field.get_choices_list()]
-                                validated_values = [v for v in values_list if v in available_values]
-                                # Store as JSON
-                                field_value = json.dumps(validated_values)
-                            
-                            # Create entry field
-                            DataEntryField.objects.create(
-                                entry=entry,
-                                field_name=column,
-                                field_type=field.field_type,
-                                value=field_value
-                            )
-                    
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f'Row {row_num}: {str(e)}')
-                    logger.error(f"Error importing row {row_num}: {str(e)}", exc_info=True)
-        
-        # Clear session data
-        if 'csv_data' in request.session:
-            del request.session['csv_data']
-        if 'csv_delimiter' in request.session:
-            del request.session['csv_delimiter']
-        
-        if errors:
-            messages.warning(request, f'Imported {imported_count} geometries with {len(errors)} errors.')
-            for error in errors[:10]:  # Show first 10 errors
-                messages.error(request, error)
-        else:
-            messages.success(request, f'Successfully imported {imported_count} geometries.')
-        
-        return redirect('dataset_detail', dataset_id=dataset.id)
-        
-    except Exception as e:
-        logger.error(f"Critical error during CSV import: {str(e)}", exc_info=True)
-        messages.error(request, f'Error processing CSV file: {str(e)}')
-        return render(request, 'datasets/dataset_csv_import.html', {'dataset': dataset})
+def import_task_view(request, dataset_id, task_id):
+    """Progress page of a background CSV import"""
+    task = _get_import_task_for_user(request, dataset_id, task_id)
+    if task is None:
+        return render(request, 'datasets/403.html', status=403)
+    
+    return render(request, 'datasets/import_task_status.html', {
+        'task': task,
+        'dataset': task.dataset,
+    })
+
+
+@login_required
+def import_task_status_view(request, dataset_id, task_id):
+    """API endpoint reporting the progress of a background CSV import"""
+    task = _get_import_task_for_user(request, dataset_id, task_id)
+    if task is None:
+        return JsonResponse({'error': 'Access denied'}, status=403)
+    
+    return JsonResponse({
+        'task_id': task.task_id,
+        'status': task.status,
+        'file_name': task.file_name,
+        'file_size': task.file_size,
+        'bytes_processed': task.bytes_processed,
+        'progress_percent': task.progress_percent,
+        'rows_processed': task.rows_processed,
+        'rows_imported': task.rows_imported,
+        'error_count': task.error_count,
+        'errors': task.errors[:10],
+        'error_message': task.error_message,
+        'finished': task.status in ('completed', 'failed'),
+    })
 
 
 @login_required
@@ -377,7 +346,7 @@ def import_summary_view(request, dataset_id):
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     # Calculate current dataset statistics
@@ -407,8 +376,15 @@ def debug_import_view(request, dataset_id):
 test_001,Test Address 1,656610,3399131,870,999,999,999,870,999,999,999
 test_002,Test Address 2,656620,3399141,640,0,0,0,640,0,0,0"""
         
-        # Process the sample CSV
-        return process_csv_import(request, dataset, sample_csv, 'sample.csv', 'ID', 'auto')
+        # Process the sample CSV as a regular import task
+        task = _create_import_task(request, dataset, [sample_csv.encode('utf-8')], 'sample.csv')
+        task.id_column = 'ID'
+        task.x_column = request.POST.get('x_column', 'X')
+        task.y_column = request.POST.get('y_column', 'Y')
+        task.clear_existing = request.POST.get('clear_existing') == 'on'
+        task.save()
+        start_csv_import_task(task)
+        return redirect('import_task', dataset_id=dataset.id, task_id=task.task_id)
     
     return render(request, 'datasets/debug_import.html', {
         'dataset': dataset
@@ -421,7 +397,7 @@ def dataset_export_options_view(request, dataset_id):
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     # Get counts for geometries and data entries
@@ -471,107 +447,72 @@ def dataset_export_options_view(request, dataset_id):
     })
 
 
+class _Echo:
+    """File-like object that returns what is written, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def _export_in_background(dataset):
+    """
+    Whether an export of the dataset is large enough to be generated once
+    per dataset revision by a background task and served from disk until the
+    dataset changes.
+    """
+    threshold = settings.EXPORT_BACKGROUND_MIN_ROWS
+    entries = DataEntry.objects.filter(geometry__dataset=dataset).order_by().values('id')
+    return threshold <= 0 or entries[threshold - 1:threshold].exists()
+
+
 @login_required
 def dataset_csv_export_view(request, dataset_id):
-    """Export dataset as CSV"""
+    """Export dataset as CSV, streamed row by row or from a cached export file"""
     dataset = get_object_or_404(DataSet, id=dataset_id)
     
     # Check if user has access to this dataset
-    if not dataset.can_access(request.user):
+    if not get_dataset_access(request, dataset).can_access:
         return render(request, 'datasets/403.html', status=403)
     
     # Get export options
     include_coordinates = request.GET.get('include_coordinates', 'true').lower() == 'true'
-    include_empty_years = request.GET.get('include_empty_years', 'true').lower() == 'true'
     
-    # Get all geometries and their entries
-    geometries = DataGeometry.objects.filter(dataset=dataset).prefetch_related('entries__fields')
+    if _export_in_background(dataset):
+        return cached_export_response(request, dataset, 'csv', {'include_coordinates': include_coordinates})
     
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
+    writer = csv.writer(_Echo())
+    rows = iter_csv_export_rows(dataset, include_coordinates=include_coordinates)
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="{dataset.name}_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    return response
+
+
+def _geojson_export_response(request, dataset_id, rows, content_type, extension, export_format=None):
+    dataset = get_object_or_404(DataSet, id=dataset_id)
     
-    writer = csv.writer(response)
-    
-    # Build header based on options
-    header = ['ID', 'Address']
-    
-    if include_coordinates:
-        header.extend(['X', 'Y'])
-    
-    header.extend(['User', 'Entry_Name', 'Year'])
-    
-    # Get all unique field names from enabled fields (exclude headline - display-only, no data)
-    enabled_field_names = set(DatasetField.objects.filter(
-        dataset=dataset, 
-        enabled=True
-    ).exclude(field_type='headline').values_list('field_name', flat=True))
-    
-    # Also get field names from actual data
-    data_field_names = set()
-    for geometry in geometries:
-        for entry in geometry.entries.all():
-            for field in entry.fields.all():
-                data_field_names.add(field.field_name)
-    
-    # Combine field names (prioritize enabled fields)
-    all_field_names = enabled_field_names.union(data_field_names)
-    
-    # Add field names to header
-    header.extend(sorted(all_field_names))
-    writer.writerow(header)
+    # Check if user has access to this dataset
+    access = get_dataset_access(request, dataset)
+    if not access.can_access:
+        return render(request, 'datasets/403.html', status=403)
     
-    # Write data
-    for geometry in geometries:
-        for entry in geometry.entries.all():
-            row = [
-                geometry.id_kurz,
-                geometry.address
-            ]
-            
-            if include_coordinates:
-                row.extend([
-                    geometry.geometry.x,
-                    geometry.geometry.y
-                ])
-            
-            row.extend([
-                geometry.user.username if geometry.user else 'Unknown',
-                entry.name or '',
-                entry.year or ''
-            ])
-            
-            # Add field values
-            field_values = {field.field_name: field.value for field in entry.fields.all()}
-            # Get field types for all fields
-            field_types = {}
-            for field_name in all_field_names:
-                try:
-                    dataset_field = DatasetField.objects.get(dataset=dataset, field_name=field_name)
-                    field_types[field_name] = dataset_field.field_type
-                except DatasetField.DoesNotExist:
-                    field_types[field_name] = 'text'
-            
-            for field_name in sorted(all_field_names):
-                value = field_values.get(field_name, '')
-                
-                # Handle multiple choice fields - convert JSON to comma-separated
-                if field_types.get(field_name) == 'multiple_choice':
-                    import json
-                    try:
-                        if value and value.strip().startswith('['):
-                            values_list = json.loads(value)
-                            value = ', '.join(str(v) for v in values_list)
-                        elif value:
-                            # Already comma-separated or single value
-                            value = str(value)
-                        else:
-                            value = ''
-                    except (json.JSONDecodeError, TypeError):
-                        value = str(value) if value else ''
-                
-                row.append(value)
-            
-            writer.writerow(row)
+    if export_format and _export_in_background(dataset):
+        # Users with the same mapping area restrictions share cached exports
+        return cached_export_response(request, dataset, export_format, {'mapping_area_ids': access.mapping_area_ids})
     
+    response = StreamingHttpResponse(rows(dataset, request.user), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{dataset.name}_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}"'
     return response
+
+
+@login_required
+def dataset_geojson_export_view(request, dataset_id):
+    """Export the geometries visible to the user as a GeoJSON FeatureCollection, streamed or from a cached export file"""
+    return _geojson_export_response(
+        request, dataset_id, iter_geojson_export, 'application/geo+json', 'geojson', export_format='geojson'
+    )
+
+
+@login_required
+def dataset_ndjson_export_view(request, dataset_id):
+    """Export the geometries visible to the user as streamed newline-delimited GeoJSON"""
+    return _geojson_export_response(request, dataset_id, iter_ndjson_export, 'application/x-ndjson', 'ndjson')
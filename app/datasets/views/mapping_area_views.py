@@ -7,7 +7,9 @@ from django.db import OperationalError, ProgrammingError
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 
+from ..membership import get_mapping_area_point_counts
 from ..models import DataSet, MappingArea
+from ..progress import get_dataset_progress
 
 
 logger = logging.getLogger(__name__)
@@ -23,7 +25,13 @@ def mapping_area_list_view(request, dataset_id):
         return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
     
     try:
-        mapping_areas = list(MappingArea.objects.filter(dataset=dataset))
+        mapping_areas = list(
+            MappingArea.objects.filter(dataset=dataset)
+            .select_related('created_by')
+            .prefetch_related('allocated_users')
+        )
+        # Points of all areas in one grouped query (cached)
+        point_counts = get_mapping_area_point_counts(dataset)
     except (ProgrammingError, OperationalError) as db_exc:
         logger.warning(
             "Database error while loading mapping areas for dataset %s: %s",
@@ -52,14 +60,15 @@ def mapping_area_list_view(request, dataset_id):
                 # Convert polygon to GeoJSON format
                 geojson = area.geometry.geojson
                 geometry_data = json.loads(geojson)
+                allocated_users = area.allocated_users.all()
                 
                 areas_data.append({
                     'id': area.id,
                     'name': area.name,
                     'geometry': geometry_data,
-                    'point_count': area.get_point_count(),
-                    'allocated_users': [user.id for user in area.allocated_users.all()],
-                    'allocated_user_names': [user.username for user in area.allocated_users.all()],
+                    'point_count': point_counts.get(area.id, 0),
+                    'allocated_users': [user.id for user in allocated_users],
+                    'allocated_user_names': [user.username for user in allocated_users],
                     'created_at': area.created_at.isoformat(),
                     'created_by': area.created_by.username if area.created_by else None
                 })
@@ -281,3 +290,15 @@ def mapping_area_delete_view(request, dataset_id, area_id):
     
     return JsonResponse({'success': False, 'error': 'Method not allowed'}, status=405)
 
+
+
+@login_required
+def mapping_area_progress_view(request, dataset_id):
+    """Progress of data collection per mapping area and user"""
+    dataset = get_object_or_404(DataSet, id=dataset_id)
+    
+    # Only dataset owner or superuser can follow the progress of field workers
+    if dataset.owner_id != request.user.id and not request.user.is_superuser:
+        return JsonResponse({'success': False, 'error': 'Access denied'}, status=403)
+    
+    return JsonResponse({'success': True, **get_dataset_progress(dataset)})
@@ -0,0 +1,96 @@
+"""
+Precomputed visibility of private datasets per user.
+
+Dataset listings used to OR owned, shared, group-shared and public datasets
+together and deduplicate the result, which joins through every group of
+the user. The DatasetVisibility table stores one row per user who owns a
+dataset or has it shared directly or through a group, so a listing is an
+indexed lookup on that table plus the is_public flag.
+
+Rows are refreshed by the signal handlers in signals.py when a dataset's
+owner, its sharing or a user's groups change. Deleting a user, group or
+dataset cascades.
+"""
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Exists, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import DataEntry, DataGeometry, DataSet, DatasetVisibility
+
+
+def _tables():
+    return {
+        'visibility': DatasetVisibility._meta.db_table,
+        'dataset': DataSet._meta.db_table,
+        'shared_users': DataSet.shared_with.through._meta.db_table,
+        'shared_groups': DataSet.shared_with_groups.through._meta.db_table,
+        'user_groups': User.groups.through._meta.db_table,
+    }
+
+
+def _refresh(column, ids):
+    """Recompute the rows whose user_id or dataset_id is in ids."""
+    tables = _tables()
+    owner_column = 'owner_id' if column == 'user_id' else 'id'
+    group_column = f"{'ug' if column == 'user_id' else 'sg'}.{column}"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tables['visibility']} WHERE {column} = ANY(%s)", [ids])
+        cursor.execute(
+            f"INSERT INTO {tables['visibility']} (user_id, dataset_id) "
+            f"SELECT owner_id, id FROM {tables['dataset']} WHERE {owner_column} = ANY(%s) "
+            f"UNION SELECT user_id, dataset_id FROM {tables['shared_users']} WHERE {column} = ANY(%s) "
+            f"UNION SELECT ug.user_id, sg.dataset_id FROM {tables['shared_groups']} sg "
+            f"JOIN {tables['user_groups']} ug ON ug.group_id = sg.group_id WHERE {group_column} = ANY(%s) "
+            f"ON CONFLICT DO NOTHING",
+            [ids, ids, ids]
+        )
+
+
+def refresh_dataset_visibility(*dataset_ids):
+    """Recompute the users who can see the given datasets."""
+    if dataset_ids:
+        _refresh('dataset_id', list(dataset_ids))
+
+
+def refresh_user_visibility(*user_ids):
+    """Recompute the private datasets the given users can see."""
+    if user_ids:
+        _refresh('user_id', list(user_ids))
+
+
+def visible_datasets(user, all_for_superusers=True):
+    """Datasets listed for a user: own, shared and public ones (everything for superusers)."""
+    datasets = DataSet.objects.all()
+    if not (all_for_superusers and user.is_superuser):
+        datasets = datasets.filter(
+            Q(is_public=True)
+            | Q(Exists(DatasetVisibility.objects.filter(user_id=user.pk, dataset_id=OuterRef('pk'))))
+        )
+    return datasets
+
+
+def _count(queryset, dataset_field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{dataset_field: OuterRef('pk')}).order_by()
+            .values(dataset_field).annotate(count=Count('pk')).values('count'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def dataset_list_queryset(user, all_for_superusers=True):
+    """
+    Visible datasets for listings, newest first, with the owner, geometry
+    and entry counts and whether the dataset is shared with anyone.
+    """
+    return visible_datasets(user, all_for_superusers).select_related('owner').annotate(
+        geometry_count=_count(DataGeometry.objects.all(), 'dataset_id'),
+        entry_count=_count(DataEntry.objects.all(), 'geometry__dataset_id'),
+        is_shared=Exists(
+            DatasetVisibility.objects.filter(dataset_id=OuterRef('pk')).exclude(user_id=OuterRef('owner_id'))
+        ),
+    ).order_by('-created_at', '-pk')
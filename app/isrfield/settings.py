@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -94,6 +95,20 @@ DATABASES = {
     }
 }
 
+# Cache
+# Defaults to the per-process memory cache. The web and worker containers
+# must share one cache, otherwise a process keeps serving cached dataset
+# schemas, file statistics and point counts that another process has
+# invalidated. The compose files therefore use the database cache
+# (django.core.cache.backends.db.DatabaseCache, table created by
+# createcachetable); a Redis cache works as well.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,6 +175,73 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024 * 1024  # 50MB
 # Default is 100
 FILE_UPLOAD_MAX_NUMBER_FIELDS = 1000
 
+# CSV import settings
+# Uploaded CSV files are kept in CSV_IMPORT_TEMP_DIR until the background
+# import has processed them. Rows are committed in chunks of
+# CSV_IMPORT_CHUNK_SIZE. Set CSV_IMPORT_IN_BACKGROUND to false to run imports
+# inside the request. CSV_IMPORT_ENGINE selects how chunks are written: 'copy'
+# stages rows with PostgreSQL COPY, 'orm' uses bulk_create and 'row' saves
+# one object at a time (the original import, for benchmarks). Uploads whose
+# columns are not selected within CSV_IMPORT_UPLOAD_MAX_AGE hours are
+# removed.
+CSV_IMPORT_TEMP_DIR = os.environ.get('CSV_IMPORT_TEMP_DIR', os.path.join(tempfile.gettempdir(), 'isrfield-imports'))
+CSV_IMPORT_CHUNK_SIZE = int(os.environ.get('CSV_IMPORT_CHUNK_SIZE', 1000))
+CSV_IMPORT_IN_BACKGROUND = os.environ.get('CSV_IMPORT_IN_BACKGROUND', 'true').lower() == 'true'
+CSV_IMPORT_ENGINE = os.environ.get('CSV_IMPORT_ENGINE', 'copy')
+CSV_IMPORT_UPLOAD_MAX_AGE = int(os.environ.get('CSV_IMPORT_UPLOAD_MAX_AGE', 24))
+
+# Dataset export settings
+# CSV and GeoJSON exports of datasets with at least EXPORT_BACKGROUND_MIN_ROWS entries
+# are written to MEDIA_ROOT/exports by a background job and served from
+# there until the dataset changes; smaller exports are streamed directly.
+# Set EXPORT_IN_BACKGROUND to false to run export jobs inside the request.
+EXPORT_BACKGROUND_MIN_ROWS = int(os.environ.get('EXPORT_BACKGROUND_MIN_ROWS', 10000))
+EXPORT_IN_BACKGROUND = os.environ.get('EXPORT_IN_BACKGROUND', 'true').lower() == 'true'
+
+# Job queue settings
+# Exports and imports are queued as jobs and run by `manage.py run_workers`
+# with JOB_WORKER_PROCESSES processes polling every JOB_POLL_INTERVAL seconds.
+# Running jobs send a heartbeat every JOB_HEARTBEAT_INTERVAL seconds; jobs
+# without one for JOB_HEARTBEAT_TIMEOUT seconds are picked up again. Failed
+# jobs are retried after JOB_RETRY_DELAY seconds (doubling each time) until
+# JOB_MAX_ATTEMPTS is reached. Finished jobs are deleted after
+# JOB_RETENTION_DAYS days.
+JOB_WORKER_PROCESSES = int(os.environ.get('JOB_WORKER_PROCESSES', 2))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+JOB_HEARTBEAT_INTERVAL = int(os.environ.get('JOB_HEARTBEAT_INTERVAL', 30))
+JOB_HEARTBEAT_TIMEOUT = int(os.environ.get('JOB_HEARTBEAT_TIMEOUT', 300))
+JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', 60))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', 30))
+
+# Files with already-compressed content (JPEG, PNG, video, archives, ...) are
+# stored in ZIP exports without deflating them again.
+ZIP_EXPORT_STORE_COMPRESSED = os.environ.get('ZIP_EXPORT_STORE_COMPRESSED', 'true').lower() == 'true'
+
+# Map settings
+# Datasets with at least this many (visible) points are rendered on the data
+# input map from vector tiles instead of individual markers.
+MAP_VECTOR_TILES_MIN_POINTS = int(os.environ.get('MAP_VECTOR_TILES_MIN_POINTS', 5000))
+
+# Map data requests for zoom levels below this value return server-side
+# clusters (grid cells of MAP_CLUSTER_CELL_PIXELS screen pixels) instead of
+# individual points.
+MAP_CLUSTER_MAX_ZOOM = int(os.environ.get('MAP_CLUSTER_MAX_ZOOM', 15))
+MAP_CLUSTER_CELL_PIXELS = int(os.environ.get('MAP_CLUSTER_CELL_PIXELS', 60))
+
+# Seconds a dataset's compiled field schema stays in the cache. Changes to
+# fields and typologies invalidate it immediately.
+DATASET_SCHEMA_CACHE_TIMEOUT = int(os.environ.get('DATASET_SCHEMA_CACHE_TIMEOUT', 3600))
+
+# Seconds a dataset's file statistics stay in the cache. Uploading or
+# deleting files invalidates them immediately; renamed users or geometries
+# show up once they expire.
+DATASET_FILE_STATS_CACHE_TIMEOUT = int(os.environ.get('DATASET_FILE_STATS_CACHE_TIMEOUT', 3600))
+
+# Seconds the number of points per mapping area stays in the cache. Adding,
+# moving or deleting points or mapping areas invalidates it immediately.
+MAPPING_AREA_POINT_COUNT_CACHE_TIMEOUT = int(os.environ.get('MAPPING_AREA_POINT_COUNT_CACHE_TIMEOUT', 3600))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -55,9 +55,14 @@ urlpatterns = [
     path('datasets/<int:dataset_id>/import/columns/', datasets_views.dataset_csv_column_selection_view, name='dataset_csv_column_selection'),
     path('datasets/<int:dataset_id>/import/', datasets_views.dataset_csv_import_view, name='dataset_csv_import'),
     path('datasets/<int:dataset_id>/import/summary/', datasets_views.import_summary_view, name='import_summary'),
+    path('datasets/<int:dataset_id>/import/tasks/<str:task_id>/', datasets_views.import_task_view, name='import_task'),
+    path('datasets/<int:dataset_id>/import/tasks/<str:task_id>/status/', datasets_views.import_task_status_view, name='import_task_status'),
     path('datasets/<int:dataset_id>/debug-import/', datasets_views.debug_import_view, name='debug_import'),
     path('datasets/<int:dataset_id>/export/', datasets_views.dataset_export_options_view, name='dataset_export_options'),
     path('datasets/<int:dataset_id>/export/csv/', datasets_views.dataset_csv_export_view, name='dataset_csv_export'),
+    path('datasets/<int:dataset_id>/export/geojson/', datasets_views.dataset_geojson_export_view, name='dataset_geojson_export'),
+    path('datasets/<int:dataset_id>/export/ndjson/', datasets_views.dataset_ndjson_export_view, name='dataset_ndjson_export'),
+    path('datasets/<int:dataset_id>/export/gpkg/', export_views.dataset_geopackage_export_view, name='dataset_geopackage_export'),
     # File export URLs
     path('datasets/<int:dataset_id>/export-files/', export_views.dataset_files_export_view, name='dataset_files_export'),
     path('datasets/<int:dataset_id>/export-files/zip/', export_views.export_files_zip_view, name='export_files_zip'),
@@ -67,6 +72,8 @@ urlpatterns = [
     path('datasets/<int:dataset_id>/entries/', datasets_views.dataset_entries_table_view, name='dataset_entries_table'),
     path('datasets/<int:dataset_id>/fields/', datasets_views.dataset_fields_view, name='dataset_fields'),
     path('datasets/<int:dataset_id>/map-data/', datasets_views.dataset_map_data_view, name='dataset_map_data'),
+    path('datasets/<int:dataset_id>/tiles/<int:z>/<int:x>/<int:y>.mvt', datasets_views.dataset_map_tile_view, name='dataset_map_tile'),
+    path('datasets/geometry/details/', datasets_views.geometry_details_batch_view, name='geometry_details_batch'),
     path('datasets/geometry/<int:geometry_id>/details/', datasets_views.geometry_details_view, name='geometry_details'),
     path('datasets/<int:dataset_id>/clear-data/', datasets_views.dataset_clear_data_view, name='dataset_clear_data'),
     path('datasets/<int:dataset_id>/geometries/create/', datasets_views.geometry_create_view, name='geometry_create'),
@@ -86,9 +93,11 @@ urlpatterns = [
     path('datasets/geometry/<int:geometry_id>/files/', datasets_views.geometry_files_view, name='geometry_files'),
     path('datasets/files/<int:file_id>/delete/', datasets_views.delete_file_view, name='delete_file'),
     path('entries/save/', datasets_views.save_entries_view, name='save_entries'),
+    path('entries/bulk-save/', datasets_views.save_entries_bulk_view, name='save_entries_bulk'),
     # Mapping area URLs
     path('datasets/<int:dataset_id>/mapping-areas/', mapping_area_views.mapping_area_list_view, name='mapping_area_list'),
     path('datasets/<int:dataset_id>/mapping-areas/create/', mapping_area_views.mapping_area_create_view, name='mapping_area_create'),
+    path('datasets/<int:dataset_id>/mapping-areas/progress/', mapping_area_views.mapping_area_progress_view, name='mapping_area_progress'),
     path('datasets/<int:dataset_id>/mapping-areas/<int:area_id>/update/', mapping_area_views.mapping_area_update_view, name='mapping_area_update'),
     path('datasets/<int:dataset_id>/mapping-areas/<int:area_id>/delete/', mapping_area_views.mapping_area_delete_view, name='mapping_area_delete'),
     path('health/', datasets_views.health_check_view, name='health_check'),
@@ -5,6 +5,12 @@ var allFields = [];
 var uploadedFiles = [];
 var typologyData = null;
 var markers = [];
+var vectorTileLayer = null;
+var mapDataClustered = false;
+var mapDataCursor = null;
+var selectedTileFeatureId = null;
+var geometryDetailsCache = {};
+var GEOMETRY_DETAILS_PREFETCH = 10;
 var addPointMode = false;
 var addPointMarker = null;
 var lastAddedLatLng = null;
@@ -110,12 +116,39 @@ function initializeMap() {
         }
     });
 
+    // Clusters are computed per zoom level, so reload when zooming through them
+    map.on('zoomend', function() {
+        if (window.useVectorTiles) return;
+        if (mapDataClustered || map.getZoom() < getClusterMaxZoom()) {
+            loadMapData(true);
+        }
+    });
+
     loadMapData();
 }
 
+// Zoom level from which individual points are loaded instead of clusters
+function getClusterMaxZoom() {
+    return typeof window.mapClusterMaxZoom === 'number' ? window.mapClusterMaxZoom : 0;
+}
+
 // Load map data via AJAX
 function loadMapData(preserveView) {
-    var url = window.location.origin + '/datasets/' + getDatasetId() + '/map-data/';
+    // Map data is reloaded after edits, so prefetched details may be stale
+    geometryDetailsCache = {};
+    if (window.useVectorTiles) {
+        loadVectorTiles(preserveView);
+        return;
+    }
+    var params = new URLSearchParams({ format: 'columnar' });
+    var clustered = map && map.getZoom() < getClusterMaxZoom();
+    if (clustered) {
+        params.set('zoom', map.getZoom());
+    } else if (preserveView && mapDataCursor && !mapDataClustered) {
+        // Points are already on the map: only fetch what changed since
+        params.set('since', mapDataCursor);
+    }
+    var url = window.location.origin + '/datasets/' + getDatasetId() + '/map-data/?' + params.toString();
     fetch(url, {
         method: 'GET',
         credentials: 'same-origin',
@@ -123,11 +156,85 @@ function loadMapData(preserveView) {
     })
     .then(response => response.json())
     .then(data => {
-        if (data.map_data) addMarkersToMap(data.map_data, preserveView);
+        if (data.clustered) {
+            mapDataCursor = null;
+            addClustersToMap(data.clusters, preserveView);
+        } else if (data.map_data) {
+            mapDataCursor = data.cursor || null;
+            if (data.delta) {
+                mergeMarkerChanges(data.map_data, data.deleted || []);
+            } else {
+                addMarkersToMap(data.map_data, preserveView);
+            }
+        }
     })
     .catch(() => {});
 }
 
+// Style of geometry points rendered from vector tiles
+function tilePointStyle(selected) {
+    return {
+        radius: 8,
+        fill: true,
+        fillColor: selected ? '#FFB81C' : '#0047BB',
+        color: selected ? '#FFB81C' : '#001A70',
+        weight: 2,
+        opacity: 1,
+        fillOpacity: 0.8
+    };
+}
+
+// Render geometry points from server-side vector tiles (large datasets)
+function loadVectorTiles(preserveView) {
+    if (!L.vectorGrid) {
+        // Plugin unavailable: fall back to loading individual markers
+        window.useVectorTiles = false;
+        loadMapData(preserveView);
+        return;
+    }
+
+    if (vectorTileLayer) {
+        map.removeLayer(vectorTileLayer);
+        vectorTileLayer = null;
+    }
+
+    // Cache-busting version so edits show up after a reload
+    var url = window.location.origin + '/datasets/' + getDatasetId() + '/tiles/{z}/{x}/{y}.mvt?v=' + Date.now();
+    vectorTileLayer = L.vectorGrid.protobuf(url, {
+        interactive: true,
+        maxNativeZoom: 22,
+        fetchOptions: { credentials: 'same-origin' },
+        getFeatureId: function(feature) { return feature.properties.id; },
+        vectorTileLayerStyles: {
+            geometries: function() { return tilePointStyle(false); }
+        }
+    });
+    vectorTileLayer.on('click', function(e) {
+        var props = e.layer.properties;
+        selectPoint({
+            id: props.id,
+            id_kurz: props.id_kurz,
+            address: props.address,
+            lat: props.lat,
+            lng: props.lng,
+            user: props.user
+        });
+    });
+    vectorTileLayer.on('load', function() {
+        if (selectedTileFeatureId !== null) {
+            vectorTileLayer.setFeatureStyle(selectedTileFeatureId, tilePointStyle(true));
+        }
+    });
+    vectorTileLayer.addTo(map);
+
+    // Newly added points cannot be looked up client-side; the tiles will show them
+    lastAddedLatLng = null;
+
+    if (!preserveView) {
+        focusOnAllPoints();
+    }
+}
+
 // Load fields from API when window.allFields is empty
 function loadFieldsFromAPI() {
     var pathParts = window.location.pathname.split('/');
@@ -175,6 +282,12 @@ function loadFieldsFromAPI() {
 
 // Load detailed data for a specific geometry point
 function loadGeometryDetails(geometryId) {
+    // Prefetched details are used once so a later selection reloads fresh data
+    if (geometryDetailsCache[geometryId]) {
+        var cached = geometryDetailsCache[geometryId];
+        delete geometryDetailsCache[geometryId];
+        return Promise.resolve(cached);
+    }
     var url = window.location.origin + '/datasets/geometry/' + geometryId + '/details/';
     return fetch(url, {
         method: 'GET',
@@ -188,8 +301,66 @@ function loadGeometryDetails(geometryId) {
     });
 }
 
+// Prefetch the details of the points nearest to the selected one in one request
+function prefetchNearbyGeometryDetails(point) {
+    var candidates = [];
+    markers.forEach(function(marker) {
+        var data = marker.pointData || marker.geometryData;
+        if (!data || data.id === point.id || geometryDetailsCache[data.id]) return;
+        var dLat = data.lat - point.lat;
+        var dLng = data.lng - point.lng;
+        candidates.push({ id: data.id, dist: dLat * dLat + dLng * dLng });
+    });
+    if (candidates.length === 0) return;
+    candidates.sort(function(a, b) { return a.dist - b.dist; });
+    var ids = candidates.slice(0, GEOMETRY_DETAILS_PREFETCH).map(function(c) { return c.id; });
+
+    var url = window.location.origin + '/datasets/geometry/details/?ids=' + ids.join(',');
+    fetch(url, {
+        method: 'GET',
+        credentials: 'same-origin',
+        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (!data.success || !data.geometries) return;
+        data.geometries.forEach(function(geometry) {
+            geometryDetailsCache[geometry.id] = geometry;
+        });
+    })
+    .catch(error => {
+        console.error('Error prefetching geometry details:', error);
+    });
+}
+
+// Decode the columnar map data format into a list of point objects
+function decodeColumnarMapData(columns) {
+    var points = [];
+    var scale = Math.pow(10, columns.precision);
+    var lat = 0;
+    var lng = 0;
+    for (var i = 0; i < columns.count; i++) {
+        // Coordinates are delta-encoded integers
+        lat += columns.lat[i];
+        lng += columns.lng[i];
+        points.push({
+            id: columns.id[i],
+            id_kurz: columns.id_kurz[i],
+            address: columns.address[i],
+            lat: lat / scale,
+            lng: lng / scale,
+            user: columns.users[columns.user[i]]
+        });
+    }
+    return points;
+}
+
 // Add markers to the map
 function addMarkersToMap(mapData, preserveView) {
+    if (mapData && mapData.format === 'columnar') {
+        mapData = decodeColumnarMapData(mapData);
+    }
+
     // Save current map view if preserveView is true
     var savedView = null;
     if (preserveView && map) {
@@ -201,21 +372,11 @@ function addMarkersToMap(mapData, preserveView) {
     
     markers.forEach(marker => map.removeLayer(marker));
     markers = [];
+    mapDataClustered = false;
     if (!Array.isArray(mapData) || mapData.length === 0) return;
 
     mapData.forEach(function(point) {
-        var marker = L.circleMarker([point.lat, point.lng], {
-            radius: 8,
-            fillColor: '#0047BB',
-            color: '#001A70',
-            weight: 2,
-            opacity: 1,
-            fillOpacity: 0.8
-        });
-        marker.pointData = point;
-        marker.on('click', function() { selectPoint(point); });
-        marker.addTo(map);
-        markers.push(marker);
+        createPointMarker(point);
     });
 
     // Only focus on all points if we're not preserving the view
@@ -226,7 +387,64 @@ function addMarkersToMap(mapData, preserveView) {
         map.setView(savedView.center, savedView.zoom);
     }
 
-    // Auto-select newly added marker if we have a cached location
+    selectLastAddedMarker();
+}
+
+// Create a marker for a geometry point and add it to the map
+function createPointMarker(point) {
+    var marker = L.circleMarker([point.lat, point.lng], {
+        radius: 8,
+        fillColor: '#0047BB',
+        color: '#001A70',
+        weight: 2,
+        opacity: 1,
+        fillOpacity: 0.8
+    });
+    marker.pointData = point;
+    marker.on('click', function() { selectPoint(marker.pointData); });
+    marker.addTo(map);
+    markers.push(marker);
+    return marker;
+}
+
+// Find the marker of a geometry point by its id
+function findMarkerById(geometryId) {
+    for (var i = 0; i < markers.length; i++) {
+        var data = markers[i].pointData || markers[i].geometryData;
+        if (data && data.id === geometryId) return markers[i];
+    }
+    return null;
+}
+
+// Merge incremental map data (changed and deleted points) into the markers
+function mergeMarkerChanges(mapData, deletedIds) {
+    if (mapData && mapData.format === 'columnar') {
+        mapData = decodeColumnarMapData(mapData);
+    }
+
+    deletedIds.forEach(function(geometryId) {
+        var marker = findMarkerById(geometryId);
+        if (!marker) return;
+        map.removeLayer(marker);
+        markers.splice(markers.indexOf(marker), 1);
+    });
+
+    (mapData || []).forEach(function(point) {
+        var marker = findMarkerById(point.id);
+        if (marker) {
+            marker.setLatLng([point.lat, point.lng]);
+            marker.pointData = point;
+            marker.geometryData = null;
+        } else {
+            createPointMarker(point);
+        }
+    });
+
+    selectLastAddedMarker();
+}
+
+// Auto-select newly added marker if we have a cached location
+function selectLastAddedMarker() {
     if (lastAddedLatLng && markers.length > 0) {
         var nearest = null;
         var bestDist = Infinity;
@@ -243,17 +461,57 @@ function addMarkersToMap(mapData, preserveView) {
     }
 }
 
-// Focus on all points on the map
-function focusOnAllPoints() {
-    if (!map || markers.length === 0) return;
-    var group = new L.featureGroup(markers);
-    map.fitBounds(group.getBounds().pad(0.1));
+// Add server-side clusters to the map (low zoom levels)
+function addClustersToMap(clusters, preserveView) {
+    markers.forEach(marker => map.removeLayer(marker));
+    markers = [];
+    mapDataClustered = true;
+    if (!Array.isArray(clusters) || clusters.length === 0) return;
+
+    clusters.forEach(function(cluster) {
+        var marker;
+        if (cluster.count === 1) {
+            // Single points behave like regular markers
+            var point = { id: cluster.id, lat: cluster.lat, lng: cluster.lng };
+            marker = L.circleMarker([cluster.lat, cluster.lng], {
+                radius: 8,
+                fillColor: '#0047BB',
+                color: '#001A70',
+                weight: 2,
+                opacity: 1,
+                fillOpacity: 0.8
+            });
+            marker.pointData = point;
+            marker.on('click', function() { selectPoint(point); });
+        } else {
+            var size = cluster.count < 100 ? 32 : (cluster.count < 1000 ? 40 : 48);
+            marker = L.marker([cluster.lat, cluster.lng], {
+                icon: L.divIcon({
+                    className: 'map-cluster-marker',
+                    html: '<div>' + cluster.count + '</div>',
+                    iconSize: [size, size]
+                }),
+                title: cluster.count + ' points, ' + cluster.entries_count + ' entries'
+            });
+            marker.on('click', function() {
+                map.setView([cluster.lat, cluster.lng], Math.min(map.getZoom() + 2, getClusterMaxZoom()));
+            });
+        }
+        marker.clusterData = cluster;
+        marker.addTo(map);
+        markers.push(marker);
+    });
+
+    if (!preserveView) {
+        focusOnAllPoints();
+    }
 }
 
 // Select a point and show its details
 function selectPoint(point) {
     currentPoint = point;
     markers.forEach(marker => {
+        if (!marker.setStyle) return;
         var markerId = null;
         if (marker.pointData && marker.pointData.id) markerId = marker.pointData.id;
         else if (marker.geometryData && marker.geometryData.id) markerId = marker.geometryData.id;
@@ -263,9 +521,17 @@ function selectPoint(point) {
             marker.setStyle({ fillColor: '#0047BB', color: '#001A70' });
         }
     });
+    if (vectorTileLayer) {
+        if (selectedTileFeatureId !== null) vectorTileLayer.resetFeatureStyle(selectedTileFeatureId);
+        selectedTileFeatureId = point.id;
+        vectorTileLayer.setFeatureStyle(point.id, tilePointStyle(true));
+    }
 
     loadGeometryDetails(point.id)
-        .then(detailedPoint => { showGeometryDetails(detailedPoint); })
+        .then(detailedPoint => {
+            showGeometryDetails(detailedPoint);
+            prefetchNearbyGeometryDetails(detailedPoint);
+        })
         .catch(() => { showGeometryDetails(point); });
 }
 
@@ -1475,28 +1741,28 @@ function saveEntries() {
         return;
     }
     
-    var formData = new FormData();
-    formData.append('geometry_id', currentPoint.id);
-    formData.append('csrfmiddlewaretoken', document.querySelector('[name=csrfmiddlewaretoken]').value);
+    var payload = { geometry_id: currentPoint.id, entries: [] };
+    var csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
     
     // Add field values for each entry
     if (window.allFields && window.allFields.length > 0) {
         for (var i = 0; i < currentPoint.entries.length; i++) {
             var entry = currentPoint.entries[i];
-            formData.append('entries[' + i + '][id]', entry.id);
+            var entryFields = {};
             
             window.allFields.forEach(function(field) {
-                if (field.enabled && field.field_type !== 'headline') {
+                if (field.enabled && !field.non_editable && field.field_type !== 'headline') {
                     var fieldElement = document.getElementById('field_' + field.field_name + '_' + i);
                     // For multiple_choice, check for hidden input
                     if (field.field_type === 'multiple_choice') {
                         fieldElement = document.getElementById('field_' + field.field_name + '_' + i + '_hidden');
                     }
                     if (fieldElement) {
-                        formData.append('entries[' + i + '][fields][' + field.field_name + ']', fieldElement.value);
+                        entryFields[field.field_name] = fieldElement.value;
                     }
                 }
             });
+            payload.entries.push({ id: entry.id, fields: entryFields });
         }
     }
     
@@ -1506,11 +1772,11 @@ function saveEntries() {
     saveBtn.innerHTML = '<i class="bi bi-hourglass-split"></i> Saving...';
     saveBtn.disabled = true;
     
-    fetch(window.location.origin + '/entries/save/', {
+    fetch(window.location.origin + '/entries/bulk-save/', {
         method: 'POST',
-        body: formData,
+        body: JSON.stringify(payload),
         credentials: 'same-origin',
-        headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        headers: { 'X-CSRFToken': csrfToken, 'Content-Type': 'application/json', 'X-Requested-With': 'XMLHttpRequest' }
     })
     .then(response => response.json())
     .then(data => {
@@ -1518,7 +1784,15 @@ function saveEntries() {
             // Reload map data to show updated entries, but preserve current view
             loadMapData(true);
         } else {
-            alert('Error saving entries: ' + (data.error || 'Unknown error'));
+            var message = data.error || 'Unknown error';
+            if (data.errors) {
+                Object.keys(data.errors).forEach(function(entryId) {
+                    Object.keys(data.errors[entryId]).forEach(function(fieldName) {
+                        message += '\n' + fieldName + ': ' + data.errors[entryId][fieldName];
+                    });
+                });
+            }
+            alert('Error saving entries: ' + message);
         }
     })
     .catch(error => {
@@ -1593,7 +1867,12 @@ function setupEventListeners() {
 
 // Focus on all points
 function focusOnAllPoints() {
-    if (!map || markers.length === 0) return;
+    if (!map) return;
+    if (window.useVectorTiles && window.mapExtent) {
+        map.fitBounds(L.latLngBounds(window.mapExtent).pad(0.1));
+        return;
+    }
+    if (markers.length === 0) return;
     var group = new L.featureGroup(markers);
     map.fitBounds(group.getBounds().pad(0.1));
 }
@@ -1698,8 +1977,12 @@ function clearSelection() {
     
     // Reset all markers to default blue style
     markers.forEach(marker => {
-        marker.setStyle({ fillColor: '#0047BB', color: '#001A70' });
+        if (marker.setStyle) marker.setStyle({ fillColor: '#0047BB', color: '#001A70' });
     });
+    if (vectorTileLayer && selectedTileFeatureId !== null) {
+        vectorTileLayer.resetFeatureStyle(selectedTileFeatureId);
+    }
+    selectedTileFeatureId = null;
     
     // Clear geometry info (only if elements exist)
     var geometryId = document.getElementById('geometryId');
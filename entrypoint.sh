@@ -13,5 +13,6 @@ fi
 # Switch to appuser and run Django commands
 python manage.py collectstatic --noinput
 python manage.py migrate
+python manage.py createcachetable
 
 exec "$@"
\ No newline at end of file